@@ -2,14 +2,18 @@ from .auth import auth_bp
 from .profile import profile_bp
 from .posts import posts_bp
 from .feed import feed_bp
+from .connections import connections_bp
 from .jobs import jobs_bp
 from .messaging import messaging_bp
+from .notifications import notifications_bp
 
 __all__ = [
     'auth_bp',
     'profile_bp',
     'posts_bp',
     'feed_bp',
+    'connections_bp',
     'jobs_bp',
-    'messaging_bp'
+    'messaging_bp',
+    'notifications_bp'
 ] 
\ No newline at end of file
@@ -0,0 +1,115 @@
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import IntegrityError
+from models.user import db, User
+from models.connection import UserConnection, FollowerStat, CONNECTION_PENDING, CONNECTION_ACCEPTED
+from utils.jwt_utils import token_required
+from models.counters import ChangeCounter
+from utils.timeline import backfill_follow, remove_follow
+from utils.follow_graph import suggest_connections, record_follow_change, FOLLOW_GRAPH_VERSION
+
+connections_bp = Blueprint('connections', __name__)
+
+@connections_bp.route('/api/connections', methods=['GET'])
+@token_required
+def get_connections(user_id):
+    """Who the user follows, who follows them, and requests awaiting their answer"""
+    try:
+        following = UserConnection.query.filter_by(follower_id=user_id).order_by(UserConnection.id).all()
+        followers = UserConnection.query.filter_by(following_id=user_id).order_by(UserConnection.id).all()
+        return jsonify({
+            'following': [c.to_dict() for c in following],
+            'followers': [c.to_dict() for c in followers if c.status == CONNECTION_ACCEPTED],
+            'pending': [c.to_dict() for c in followers if c.status == CONNECTION_PENDING]
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting connections: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@connections_bp.route('/api/connections/suggestions', methods=['GET'])
+@token_required
+def get_suggestions(user_id):
+    """People you may know: accounts followed by the people you follow,
+    ranked by how many of them follow each one"""
+    try:
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        pending = [following_id for following_id, in db.session.query(UserConnection.following_id).filter(
+            UserConnection.follower_id == user_id,
+            UserConnection.status == CONNECTION_PENDING
+        )]
+        ranked = suggest_connections(user_id, limit, exclude=pending)
+        users = {user.id: user for user in User.query.filter(User.id.in_([uid for uid, _ in ranked]))}
+        suggestions = [{
+            'user': {
+                'id': uid,
+                'username': users[uid].username,
+                'first_name': users[uid].first_name,
+                'last_name': users[uid].last_name,
+                'image_url': users[uid].image_url
+            },
+            'mutual_connections': mutual
+        } for uid, mutual in ranked if uid in users]
+        return jsonify({'suggestions': suggestions}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting connection suggestions: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@connections_bp.route('/api/connections/<int:target_id>', methods=['POST'])
+@token_required
+def follow_user(user_id, target_id):
+    """Ask to follow a user; the request stays pending until they accept it"""
+    if target_id == user_id:
+        return jsonify({'error': 'You cannot follow yourself'}), 400
+    if not db.session.get(User, target_id):
+        return jsonify({'error': 'User not found'}), 404
+
+    existing = UserConnection.query.filter_by(follower_id=user_id, following_id=target_id).first()
+    if existing:
+        return jsonify({'message': 'Already requested', 'connection': existing.to_dict()}), 200
+
+    connection = UserConnection(user_id, target_id)
+    db.session.add(connection)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request created the same pair first
+        db.session.rollback()
+        connection = UserConnection.query.filter_by(follower_id=user_id, following_id=target_id).first()
+        return jsonify({'message': 'Already requested', 'connection': connection.to_dict()}), 200
+    return jsonify({'message': 'Follow request sent', 'connection': connection.to_dict()}), 201
+
+@connections_bp.route('/api/connections/<int:follower_id>/accept', methods=['POST'])
+@token_required
+def accept_follower(user_id, follower_id):
+    """Accept a pending request and seed the follower's timeline with recent posts"""
+    connection = UserConnection.query.filter_by(
+        follower_id=follower_id, following_id=user_id, status=CONNECTION_PENDING
+    ).with_for_update().first()
+    if not connection:
+        return jsonify({'error': 'Follow request not found'}), 404
+
+    connection.status = CONNECTION_ACCEPTED
+    FollowerStat.adjust(user_id, 1)
+    backfill_follow(follower_id, user_id)
+    ChangeCounter.bump(FOLLOW_GRAPH_VERSION)
+    db.session.commit()
+    record_follow_change(follower_id, user_id, accepted=True)
+    return jsonify({'message': 'Follow request accepted', 'connection': connection.to_dict()}), 200
+
+@connections_bp.route('/api/connections/<int:target_id>', methods=['DELETE'])
+@token_required
+def unfollow_user(user_id, target_id):
+    """Unfollow a user (or withdraw a pending request)"""
+    connection = UserConnection.query.filter_by(follower_id=user_id, following_id=target_id).first()
+    if not connection:
+        return jsonify({'error': 'Connection not found'}), 404
+
+    was_accepted = connection.status == CONNECTION_ACCEPTED
+    if was_accepted:
+        FollowerStat.adjust(target_id, -1)
+        remove_follow(user_id, target_id)
+        ChangeCounter.bump(FOLLOW_GRAPH_VERSION)
+    db.session.delete(connection)
+    db.session.commit()
+    if was_accepted:
+        record_follow_change(user_id, target_id, accepted=False)
+    return jsonify({'message': 'Unfollowed'}), 200
@@ -1,5 +1,285 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from datetime import datetime
+import json
+import threading
+import time
+from models.user import db, User
+from models.post import Post, POST_LISTING_COLUMNS, post_listing_json
+from models.timeline import TimelineEntry
+from sqlalchemy import select, union_all
+from utils.jwt_utils import token_required
+from utils.pagination import encode_cursor, decode_cursor, keyset_condition
+from utils.timeline import (
+    pull_authors, followed_authors, merge_feed_sources, feed_version, reaches_feed,
+    PRIVATE_VISIBILITY, NEW_POSTS_CHANNEL
+)
+from utils.pubsub import pubsub
+from utils.ranking import rank_rows
+from utils.etag import conditional_get
+from utils.view_counter import record_views
+
+DEFAULT_RANK_CANDIDATES = 1000
+DEFAULT_NEW_POSTS_LIMIT = 100
+DEFAULT_LONG_POLL_MAX_SECONDS = 30
+DEFAULT_SSE_MAX_SECONDS = 300
+DEFAULT_SSE_HEARTBEAT_SECONDS = 15
+DEFAULT_MAX_WAITERS = 16
+WAITER_RETRY_SECONDS = 5
 
 feed_bp = Blueprint('feed', __name__)
- 
-# Routes will be implemented here 
\ No newline at end of file
+
+def _fetch_source(query, columns, after, limit):
+    """Up to limit rows of an ordered feed source, with its (created_at, id) key appended"""
+    if after:
+        query = query.filter(keyset_condition(columns, after))
+    return query.add_columns(*columns).limit(limit).all()
+
+def _fetch_pulled_sources(author_ids, after, limit):
+    """Newest posts of each pulled author, one list per author, from a single
+    UNION ALL of per-author (user_id, created_at) index reads"""
+    if not author_ids:
+        return []
+    per_author = []
+    for author_id in author_ids:
+        query = select(
+            *POST_LISTING_COLUMNS, Post.created_at.label('sort_created_at'), Post.id.label('sort_id')
+        ).select_from(Post).join(User).where(
+            Post.user_id == author_id,
+            Post.visibility != PRIVATE_VISIBILITY
+        )
+        if after:
+            query = query.where(keyset_condition((Post.created_at, Post.id), after))
+        per_author.append(query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit).subquery().select())
+
+    sources = {}
+    for row in db.session.execute(union_all(*per_author)):
+        sources.setdefault(row.user_id, []).append(row)
+    # UNION ALL does not promise to keep each branch's order
+    return [sorted(rows, key=lambda row: (row[-2], row[-1]), reverse=True) for rows in sources.values()]
+
+@feed_bp.route('/api/feed', methods=['GET'])
+@token_required
+@conditional_get(feed_version, cache_first_page=True)
+def get_feed(user_id):
+    """Home timeline: the user's own posts and those of people they follow.
+
+    Most entries are pushed in on post creation (see utils/timeline.py), so
+    that part of a page is one range read on the user's timeline. Posts by
+    high-follower authors are pulled from each author's post index and
+    merged in. Paginate with ``cursor`` (empty or absent for the first page).
+
+    ``sort=ranked`` instead scores the newest FEED_RANK_CANDIDATES feed posts
+    (see utils/ranking.py) and pages through them with ``page``.
+    """
+    try:
+        cursor = request.args.get('cursor')
+        per_page = max(1, min(request.args.get('per_page', 10, type=int), 50))
+        ranked = request.args.get('sort', 'recent') == 'ranked'
+        try:
+            after = decode_cursor(cursor, datetime, int) if cursor and not ranked else None
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        if ranked:
+            page = max(1, request.args.get('page', 1, type=int))
+            limit = current_app.config.get('FEED_RANK_CANDIDATES', DEFAULT_RANK_CANDIDATES)
+        else:
+            # Every source is read one row past the page, so the merge can
+            # tell whether a next page exists
+            limit = per_page + 1
+
+        timeline = db.session.query(*POST_LISTING_COLUMNS).select_from(TimelineEntry).join(
+            Post, Post.id == TimelineEntry.post_id
+        ).join(User, User.id == Post.user_id).filter(
+            TimelineEntry.user_id == user_id
+        ).order_by(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())
+        sources = [_fetch_source(timeline, (TimelineEntry.created_at, TimelineEntry.post_id), after, limit)]
+        sources += _fetch_pulled_sources(pull_authors(user_id), after, limit)
+        rows = merge_feed_sources(sources, limit)
+
+        if ranked:
+            rows = rank_rows(rows, user_id, (page - 1) * per_page, per_page + 1)
+            record_views(row.id for row in rows[:per_page])
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'has_next': len(rows) > per_page
+            }
+            return current_app.response_class(
+                post_listing_json(rows[:per_page], pagination), mimetype='application/json'
+            ), 200
+
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        record_views(row.id for row in rows)
+
+        pagination = {
+            'per_page': per_page,
+            'next_cursor': encode_cursor(*rows[-1][-2:]) if has_next else None,
+            'has_next': has_next
+        }
+        if not after and rows:
+            # Where /api/feed/new should start looking for newer posts
+            pagination['newest_cursor'] = encode_cursor(*rows[0][-2:])
+        return current_app.response_class(post_listing_json(rows, pagination), mimetype='application/json'), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error getting feed: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+def _newer_post_keys(user_id, since, limit):
+    """(created_at, id) of up to limit feed posts newer than since, newest first"""
+    newer = keyset_condition((TimelineEntry.created_at, TimelineEntry.post_id), since, descending=False)
+    sources = [db.session.query(TimelineEntry.created_at, TimelineEntry.post_id).filter(
+        TimelineEntry.user_id == user_id, newer
+    ).order_by(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc()).limit(limit).all()]
+    authors = pull_authors(user_id)
+    if authors:
+        sources.append(db.session.query(Post.created_at, Post.id).filter(
+            Post.user_id.in_(authors),
+            Post.visibility != PRIVATE_VISIBILITY,
+            keyset_condition((Post.created_at, Post.id), since, descending=False)
+        ).order_by(Post.created_at.desc(), Post.id.desc()).limit(limit).all())
+    keys = merge_feed_sources(sources, limit)
+    # Nothing is held open while the caller waits for the next post
+    db.session.rollback()
+    return keys
+
+def _new_posts_payload(keys, cursor, limit, count_only):
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+    payload = {
+        'count': len(keys),
+        'has_more': has_more,
+        'cursor': encode_cursor(*keys[0]) if keys else cursor
+    }
+    if not count_only:
+        payload['post_ids'] = [post_id for _, post_id in keys]
+    return payload
+
+def _waiter_slots():
+    """This process's semaphore bounding the /api/feed/new requests held open
+    at once; without it enough open tabs would take every worker thread"""
+    slots = current_app.extensions.get('feed_waiters')
+    if slots is None:
+        slots = current_app.extensions.setdefault('feed_waiters', threading.BoundedSemaphore(
+            current_app.config.get('FEED_MAX_WAITERS', DEFAULT_MAX_WAITERS)))
+    return slots
+
+def _concerns_feed(subscription, messages, user_id, authors):
+    """Whether any published post may have reached the user's feed"""
+    overflowed, subscription.overflowed = subscription.overflowed, False
+    return overflowed or any(reaches_feed(message, user_id, authors) for message in messages)
+
+@feed_bp.route('/api/feed/new', methods=['GET'])
+@token_required
+def get_new_posts(user_id):
+    """Feed posts newer than ``since`` (a cursor: ``newest_cursor`` from the
+    first feed page, or ``cursor`` from an earlier call).
+
+    Returns up to FEED_NEW_POSTS_LIMIT ``post_ids`` newest first (only the
+    count with ``count_only=true``), ``has_more`` when there were even more,
+    and the ``cursor`` to pass next time.
+
+    With ``wait=<seconds>`` (capped at FEED_LONG_POLL_MAX_SECONDS) an empty
+    answer is held until a relevant post is created or the wait runs out.
+    ``stream=sse`` (or ``Accept: text/event-stream``) instead keeps sending
+    ``new_posts`` events, each covering the posts since the previous one;
+    the event id is the cursor, so a reconnecting EventSource resumes from
+    Last-Event-ID.
+
+    Waiting is woken by create_post's in-process publish (utils/pubsub.py).
+    Posts created by other worker processes are found by re-reading the
+    database when a wait ends and on every SSE heartbeat.
+
+    A waiting request holds a worker thread, so at most FEED_MAX_WAITERS
+    wait at once per process (run gthread workers with more threads than
+    that, see the Procfile). Beyond it a long-poll is answered right away
+    with ``Retry-After``, and a stream sends what is new with a ``retry:``
+    delay and closes, so EventSource reconnects later.
+    """
+    cursor = request.args.get('since') or request.headers.get('Last-Event-ID')
+    if not cursor:
+        return jsonify({'error': 'since is required'}), 400
+    try:
+        since = decode_cursor(cursor, datetime, int)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    limit = current_app.config.get('FEED_NEW_POSTS_LIMIT', DEFAULT_NEW_POSTS_LIMIT)
+    count_only = request.args.get('count_only', 'false').lower() == 'true'
+
+    if request.args.get('stream') == 'sse' or request.accept_mimetypes.best == 'text/event-stream':
+        return _stream_new_posts(user_id, since, limit, count_only)
+
+    max_wait = current_app.config.get('FEED_LONG_POLL_MAX_SECONDS', DEFAULT_LONG_POLL_MAX_SECONDS)
+    wait = max(0.0, min(request.args.get('wait', 0, type=float), max_wait))
+    if not wait:
+        keys = _newer_post_keys(user_id, since, limit + 1)
+        return jsonify(_new_posts_payload(keys, cursor, limit, count_only)), 200
+    slots = _waiter_slots()
+    if not slots.acquire(blocking=False):
+        keys = _newer_post_keys(user_id, since, limit + 1)
+        response = jsonify(_new_posts_payload(keys, cursor, limit, count_only))
+        response.headers['Retry-After'] = str(WAITER_RETRY_SECONDS)
+        return response, 200
+    try:
+        # Subscribe before the first read, so a post committed in between still wakes us
+        with pubsub().subscribe(NEW_POSTS_CHANNEL) as subscription:
+            keys = _newer_post_keys(user_id, since, limit + 1)
+            if not keys:
+                authors = followed_authors(user_id)
+                deadline = time.monotonic() + wait
+                while not keys and time.monotonic() < deadline:
+                    messages = subscription.get(deadline - time.monotonic())
+                    if not messages or _concerns_feed(subscription, messages, user_id, authors):
+                        keys = _newer_post_keys(user_id, since, limit + 1)
+    finally:
+        slots.release()
+    return jsonify(_new_posts_payload(keys, cursor, limit, count_only)), 200
+
+def _stream_new_posts(user_id, since, limit, count_only):
+    max_seconds = current_app.config.get('FEED_SSE_MAX_SECONDS', DEFAULT_SSE_MAX_SECONDS)
+    heartbeat = current_app.config.get('FEED_SSE_HEARTBEAT_SECONDS', DEFAULT_SSE_HEARTBEAT_SECONDS)
+    slots = _waiter_slots()
+    # Follows made while the stream is open take effect when it reconnects
+    authors = followed_authors(user_id)
+
+    def new_posts_event(keys):
+        payload = _new_posts_payload(keys, None, limit, count_only)
+        return f'id: {payload["cursor"]}\nevent: new_posts\ndata: {json.dumps(payload)}\n\n'
+
+    def generate(since):
+        # The slot and subscription are taken here rather than before the
+        # response, so a client gone before the first chunk holds neither
+        if not slots.acquire(blocking=False):
+            keys = _newer_post_keys(user_id, since, limit + 1)
+            yield f'retry: {WAITER_RETRY_SECONDS * 1000}\n\n'
+            if keys:
+                yield new_posts_event(keys)
+            return
+        subscription = pubsub().subscribe(NEW_POSTS_CHANNEL)
+        try:
+            deadline = time.monotonic() + max_seconds
+            check, idle = True, False
+            while True:
+                keys = _newer_post_keys(user_id, since, limit + 1) if check else []
+                if keys:
+                    since = tuple(keys[0])
+                    yield new_posts_event(keys)
+                elif idle:
+                    yield ': keep-alive\n\n'
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                messages = subscription.get(min(heartbeat, remaining))
+                idle = not messages
+                check = idle or _concerns_feed(subscription, messages, user_id, authors)
+        finally:
+            subscription.close()
+            slots.release()
+
+    response = current_app.response_class(stream_with_context(generate(since)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies (nginx) from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
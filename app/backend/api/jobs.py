@@ -1,5 +1,400 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify, current_app
+from datetime import datetime
+import json
+from werkzeug.datastructures import MultiDict
+from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
+from models.user import db, User
+from models.job import (
+    Company, Job, JobApplication, SavedJobSearch, JOB_LISTING_COLUMNS, job_row_to_dict, JOB_TYPES, JOB_STATUSES,
+    JOB_FACETS, JOBS_VERSION, MAX_SAVED_SEARCHES
+)
+from models.counters import ChangeCounter
+from utils.jwt_utils import token_required
+from utils.pagination import keyset_page
+from utils.search_index import search_jobs_subquery
+from utils.job_search import facet_filters, filter_conditions, facet_counts, facet_match_ids, facet_index_version
+from utils.skill_match import jobs_for_users, candidates_for_jobs, job_text
+from utils.percolator import index_saved_search, notify_job_matches
+from utils.geo import search_area, nearest
+from utils.etag import conditional_get
 
 jobs_bp = Blueprint('jobs', __name__)
- 
-# Routes will be implemented here 
\ No newline at end of file
+
+COMPANY_FIELDS = ('name', 'description', 'website', 'industry', 'company_size', 'location', 'logo')
+JOB_FIELDS = ('title', 'description', 'location', 'job_type', 'salary_range', 'status')
+REQUIRED_JOB_FIELDS = ('title', 'description', 'location', 'job_type')
+
+def jobs_version(user_id):
+    return ChangeCounter.current(JOBS_VERSION)
+
+def job_search_version(user_id):
+    # Facets come from an index that can lag the jobs table while it rebuilds
+    return ChangeCounter.current(JOBS_VERSION) + (facet_index_version(),)
+
+def _job_field_errors(fields):
+    """Validation error message for job fields, or None"""
+    for field in REQUIRED_JOB_FIELDS:
+        if field in fields and not (fields[field] or '').strip():
+            return f'{field} is required'
+    if 'job_type' in fields and fields['job_type'] not in JOB_TYPES:
+        return f"job_type must be one of: {', '.join(JOB_TYPES)}"
+    if 'status' in fields and fields['status'] not in JOB_STATUSES:
+        return f"status must be one of: {', '.join(JOB_STATUSES)}"
+    return None
+
+def _owned_job(user_id, job_id):
+    """(job, error response) for a job the user's company posted"""
+    job = db.session.get(Job, job_id)
+    if not job:
+        return None, (jsonify({'error': 'Job not found'}), 404)
+    if job.company.user_id != user_id:
+        return None, (jsonify({'error': 'Unauthorized'}), 403)
+    return job, None
+
+@jobs_bp.route('/api/companies', methods=['POST'])
+@token_required
+def create_company(user_id):
+    data = request.get_json() or {}
+    if not (data.get('name') or '').strip():
+        return jsonify({'error': 'name is required'}), 400
+    company = Company(user_id=user_id, **{field: data.get(field) for field in COMPANY_FIELDS})
+    company.name = company.name.strip()
+    db.session.add(company)
+    db.session.commit()
+    return jsonify({'message': 'Company created', 'company': company.to_dict()}), 201
+
+@jobs_bp.route('/api/companies/<int:company_id>', methods=['GET'])
+@token_required
+def get_company(user_id, company_id):
+    company = db.session.get(Company, company_id)
+    if not company:
+        return jsonify({'error': 'Company not found'}), 404
+    return jsonify({'company': company.to_dict()}), 200
+
+@jobs_bp.route('/api/jobs', methods=['GET'])
+@token_required
+@conditional_get(job_search_version, cache_first_page=True)
+def get_jobs(user_id):
+    """Search jobs, newest first or by relevance when ``search`` is given.
+
+    ``search`` matches title, description and location through the job
+    full-text index (every term, prefix-matched). ``job_type``, ``location``,
+    ``company_id`` and ``status`` filter by exact value and may be repeated
+    to select several values. Pages are keyset-paginated with ``cursor``
+    (absent for the first page); the first page also carries ``facets``
+    (see utils/job_search.py), unless ``facets=false``, with
+    ``facets_approximate`` set when a search matched more jobs than the
+    facets were counted over.
+    """
+    try:
+        cursor = request.args.get('cursor')
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 50))
+        search = request.args.get('search', '').strip()
+        try:
+            filters = facet_filters(request.args)
+        except ValueError:
+            return jsonify({'error': 'company_id must be a number'}), 400
+
+        query = db.session.query(*JOB_LISTING_COLUMNS).select_from(Job).join(Company)
+        search_results = search_jobs_subquery(search) if search else None
+        if search_results is not None:
+            query = query.join(search_results, search_results.c.job_id == Job.id)
+        elif search:
+            # Nothing searchable in the text (e.g. only punctuation)
+            query = query.filter(db.false())
+
+        sort_key = [(Job.created_at, datetime), (Job.id, int)]
+        if search_results is not None and request.args.get('sort_by', 'relevance') == 'relevance':
+            sort_key.insert(0, (search_results.c.score, float))
+        listing = query.filter(*filter_conditions(filters)).order_by(*[desc(column) for column, _ in sort_key])
+        try:
+            rows, next_cursor = keyset_page(listing, cursor, per_page, sort_key)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        response = {
+            'jobs': [job_row_to_dict(row) for row in rows],
+            'pagination': {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+        }
+        if not cursor and request.args.get('facets', 'true').lower() == 'true':
+            job_ids, approximate = None, False
+            if search_results is not None:
+                job_ids, approximate = facet_match_ids(search_results)
+            elif search:
+                job_ids = []
+            response['facets'] = facet_counts(filters, job_ids)
+            response['facets_approximate'] = approximate
+        return jsonify(response), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error searching jobs: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@jobs_bp.route('/api/jobs/recommended', methods=['GET'])
+@token_required
+def get_recommended_jobs(user_id):
+    """Open jobs best matching the user's skills (see utils/skill_match.py),
+    leaving out jobs they applied to or posted"""
+    try:
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        skip = {job_id for job_id, in db.session.query(JobApplication.job_id).filter_by(user_id=user_id)}
+        skip.update(job_id for job_id, in db.session.query(Job.id).join(Company).filter(Company.user_id == user_id))
+        ranked = jobs_for_users([user_id], limit, exclude=[skip])[0]
+        rows = {row.id: row for row in db.session.query(*JOB_LISTING_COLUMNS).select_from(Job).join(Company).filter(
+            Job.id.in_([job_id for job_id, _, _ in ranked]), Job.status == 'open'
+        )}
+        jobs = [{**job_row_to_dict(rows[job_id]), 'match_score': round(score, 4), 'matched_skills': skills}
+                for job_id, score, skills in ranked if job_id in rows]
+        return jsonify({'jobs': jobs}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error recommending jobs: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@jobs_bp.route('/api/jobs/nearby', methods=['GET'])
+@token_required
+def get_nearby_jobs(user_id):
+    """Open jobs nearest first, each with ``distance_km``.
+
+    The area is ``bbox=min_lon,min_lat,max_lon,max_lat`` or a circle of
+    ``radius_km`` (default 25, at most 500) around ``lat``/``lon``, the place
+    named by ``near`` or, by default, the user's own location. Facet filters
+    work as in ``GET /api/jobs``; pages are keyset-paginated with ``cursor``.
+    """
+    try:
+        user = db.session.get(User, user_id)
+        home = (user.latitude, user.longitude) if user and user.geohash else None
+        try:
+            center, bbox, radius_km = search_area(request.args, home)
+            filters = facet_filters(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 50))
+        conditions = [Job.status == 'open'] + filter_conditions(filters)
+        try:
+            page, next_cursor = nearest(Job, conditions, center, bbox, radius_km,
+                                        request.args.get('cursor'), per_page)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        rows = {row.id: row for row in db.session.query(*JOB_LISTING_COLUMNS).select_from(Job).join(Company).filter(
+            Job.id.in_([job_id for job_id, _ in page])
+        )}
+        return jsonify({
+            'jobs': [{**job_row_to_dict(rows[job_id]), 'distance_km': round(distance, 2)}
+                     for job_id, distance in page if job_id in rows],
+            'center': {'lat': center[0], 'lon': center[1]},
+            'pagination': {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error finding nearby jobs: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@jobs_bp.route('/api/jobs', methods=['POST'])
+@token_required
+def create_job(user_id):
+    """Post a job for a company the user owns"""
+    data = request.get_json() or {}
+    company = db.session.get(Company, data.get('company_id') or 0)
+    if not company:
+        return jsonify({'error': 'Company not found'}), 404
+    if company.user_id != user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    fields = {field: data[field] for field in JOB_FIELDS if field in data}
+    fields.setdefault('status', 'open')
+    missing = [field for field in REQUIRED_JOB_FIELDS if field not in fields]
+    error = f'{missing[0]} is required' if missing else _job_field_errors(fields)
+    if error:
+        return jsonify({'error': error}), 400
+
+    job = Job(company_id=company.id, **fields)
+    db.session.add(job)
+    db.session.flush()
+    # Saved-search alerts commit (or roll back) with the job itself
+    notify_job_matches(job)
+    ChangeCounter.bump(JOBS_VERSION)
+    db.session.commit()
+    return jsonify({'message': 'Job created', 'job': job.to_dict()}), 201
+
+@jobs_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+@token_required
+@conditional_get(jobs_version)
+def get_job(user_id, job_id):
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job': job.to_dict()}), 200
+
+@jobs_bp.route('/api/jobs/<int:job_id>', methods=['PUT'])
+@token_required
+def update_job(user_id, job_id):
+    """Edit a job, e.g. close it"""
+    job, error_response = _owned_job(user_id, job_id)
+    if error_response:
+        return error_response
+    data = request.get_json() or {}
+    fields = {field: data[field] for field in JOB_FIELDS if field in data}
+    error = _job_field_errors(fields)
+    if error:
+        return jsonify({'error': error}), 400
+
+    for field, value in fields.items():
+        setattr(job, field, value)
+    ChangeCounter.bump(JOBS_VERSION)
+    db.session.commit()
+    return jsonify({'message': 'Job updated', 'job': job.to_dict()}), 200
+
+@jobs_bp.route('/api/jobs/<int:job_id>', methods=['DELETE'])
+@token_required
+def delete_job(user_id, job_id):
+    job, error_response = _owned_job(user_id, job_id)
+    if error_response:
+        return error_response
+    JobApplication.query.filter_by(job_id=job_id).delete(synchronize_session=False)
+    ChangeCounter.bump(JOBS_VERSION)
+    db.session.delete(job)
+    db.session.commit()
+    return jsonify({'message': 'Job deleted'}), 200
+
+@jobs_bp.route('/api/jobs/<int:job_id>/apply', methods=['POST'])
+@token_required
+def apply_to_job(user_id, job_id):
+    """Apply to an open job (once); name and email default to the account's"""
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status != 'open':
+        return jsonify({'error': 'Job is closed'}), 400
+
+    user = db.session.get(User, user_id)
+    data = request.get_json() or {}
+    application = JobApplication(
+        job_id=job_id,
+        user_id=user_id,
+        applicant_name=data.get('applicant_name') or ' '.join(
+            part for part in (user.first_name, user.last_name) if part
+        ) or user.username,
+        applicant_email=data.get('applicant_email') or user.email,
+        resume_link=data.get('resume_link')
+    )
+    db.session.add(application)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Already applied'}), 409
+    return jsonify({'message': 'Application submitted', 'application': application.to_dict()}), 201
+
+@jobs_bp.route('/api/jobs/<int:job_id>/applications', methods=['GET'])
+@token_required
+def get_job_applications(user_id, job_id):
+    """Applications to the user's job, newest first, keyset-paginated with ``cursor``"""
+    job, error_response = _owned_job(user_id, job_id)
+    if error_response:
+        return error_response
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 50))
+    query = JobApplication.query.filter_by(job_id=job_id)
+    status = request.args.get('status')
+    if status:
+        query = query.filter_by(status=status)
+    sort_key = [(JobApplication.created_at, datetime), (JobApplication.id, int)]
+    query = query.order_by(JobApplication.created_at.desc(), JobApplication.id.desc())
+    try:
+        rows, next_cursor = keyset_page(query, request.args.get('cursor'), per_page, sort_key)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify({
+        'applications': [row[0].to_dict() for row in rows],
+        'pagination': {
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None
+        }
+    }), 200
+
+@jobs_bp.route('/api/jobs/<int:job_id>/candidates', methods=['GET'])
+@token_required
+def get_job_candidates(user_id, job_id):
+    """Public profiles whose skills best match the user's job"""
+    job, error_response = _owned_job(user_id, job_id)
+    if error_response:
+        return error_response
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    ranked = candidates_for_jobs([job_text(job.title, job.description)], limit, exclude=[{user_id}])[0]
+    users = {user.id: user for user in User.query.filter(User.id.in_([uid for uid, _, _ in ranked]))}
+    candidates = [{
+        'user': {
+            'id': uid,
+            'username': users[uid].username,
+            'first_name': users[uid].first_name,
+            'last_name': users[uid].last_name,
+            'job_title': users[uid].job_title,
+            'image_url': users[uid].image_url
+        },
+        'match_score': round(score, 4),
+        'matched_skills': skills
+    } for uid, score, skills in ranked if uid in users]
+    return jsonify({'candidates': candidates}), 200
+
+@jobs_bp.route('/api/jobs/saved-searches', methods=['POST'])
+@token_required
+def create_saved_search(user_id):
+    """Save a job search (``search`` text and ``filters`` as {facet: [values]});
+    the user is notified of new jobs matching it (see utils/percolator.py)"""
+    data = request.get_json() or {}
+    name = (data.get('name') or '').strip()
+    search = (data.get('search') or '').strip()
+    raw_filters = data.get('filters') or {}
+    if not name or len(name) > 100:
+        return jsonify({'error': 'name is required (max 100 characters)'}), 400
+    if len(search) > 200:
+        return jsonify({'error': 'search is too long (max 200 characters)'}), 400
+    if not isinstance(raw_filters, dict) or not all(isinstance(values, list) for values in raw_filters.values()):
+        return jsonify({'error': 'filters must map facets to lists of values'}), 400
+    unknown = sorted(set(raw_filters) - set(JOB_FACETS))
+    if unknown:
+        return jsonify({'error': f"Unknown facet: {unknown[0]}"}), 400
+    try:
+        filters = facet_filters(MultiDict([
+            (facet, str(value)) for facet, values in raw_filters.items() for value in values
+        ]))
+    except ValueError:
+        return jsonify({'error': 'company_id must be a number'}), 400
+    if not search and not filters:
+        return jsonify({'error': 'A saved search needs search text or a filter'}), 400
+    if SavedJobSearch.query.filter_by(user_id=user_id).count() >= MAX_SAVED_SEARCHES:
+        return jsonify({'error': f'At most {MAX_SAVED_SEARCHES} saved searches allowed'}), 400
+
+    saved_search = SavedJobSearch(
+        user_id=user_id, name=name, search=search,
+        filters=json.dumps({facet: sorted(values) for facet, values in filters.items()})
+    )
+    index_saved_search(saved_search)
+    db.session.add(saved_search)
+    db.session.commit()
+    return jsonify({'message': 'Search saved', 'saved_search': saved_search.to_dict()}), 201
+
+@jobs_bp.route('/api/jobs/saved-searches', methods=['GET'])
+@token_required
+def get_saved_searches(user_id):
+    saved_searches = SavedJobSearch.query.filter_by(user_id=user_id).order_by(SavedJobSearch.id).all()
+    return jsonify({'saved_searches': [saved_search.to_dict() for saved_search in saved_searches]}), 200
+
+@jobs_bp.route('/api/jobs/saved-searches/<int:saved_search_id>', methods=['DELETE'])
+@token_required
+def delete_saved_search(user_id, saved_search_id):
+    saved_search = db.session.get(SavedJobSearch, saved_search_id)
+    if not saved_search or saved_search.user_id != user_id:
+        return jsonify({'error': 'Saved search not found'}), 404
+    db.session.delete(saved_search)
+    db.session.commit()
+    return jsonify({'message': 'Saved search deleted'}), 200
@@ -1,5 +1,151 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+from models.user import db, User
+from models.message import Conversation, ConversationSummary, Message, MAX_MESSAGE_LENGTH
+from utils.jwt_utils import token_required
+from utils.pagination import keyset_page
+from utils.message_gateway import publish_message
+from utils.write_queue import write_queue
 
 messaging_bp = Blueprint('messaging', __name__)
- 
-# Routes will be implemented here 
\ No newline at end of file
+
+def _message_content(data):
+    """(content, error) from a request body"""
+    content = data.get('content')
+    if not isinstance(content, str) or not content.strip():
+        return None, 'content is required'
+    if len(content) > MAX_MESSAGE_LENGTH:
+        return None, f'content must be at most {MAX_MESSAGE_LENGTH} characters'
+    return content, None
+
+def _own_conversation(user_id, conversation_id):
+    """(conversation, error_response) for a conversation the user is part of"""
+    conversation = db.session.get(Conversation, conversation_id)
+    if not conversation or not conversation.has_participant(user_id):
+        return None, (jsonify({'error': 'Conversation not found'}), 404)
+    return conversation, None
+
+def _write_message(conversation_id, sender_id, recipient_id, content):
+    """Write job: insert a message (starting the pair's conversation when
+    ``conversation_id`` is None) and move the conversation's last-message
+    pointer and both inbox summaries; returns the message as a dict"""
+    if conversation_id is None:
+        conversation = Conversation.between(sender_id, recipient_id)
+    else:
+        conversation = db.session.get(Conversation, conversation_id)
+    message = Message(conversation_id=conversation.id, sender_id=sender_id,
+                      recipient_id=recipient_id, content=content)
+    db.session.add(message)
+    db.session.flush()
+    conversation.record_message(message)
+    ConversationSummary.record_message(message)
+    return message.to_dict()
+
+def _send(conversation_id, sender_id, recipient_id, content):
+    """Commit the message, batched with other writes when the write queue is
+    enabled, then push it to open streams"""
+    sent = write_queue().run(_write_message, conversation_id, sender_id, recipient_id, content)
+    publish_message(sent)
+    return jsonify({'message': 'Message sent', 'sent': sent}), 201
+
+@messaging_bp.route('/api/messaging/messages', methods=['POST'])
+@token_required
+def send_message(user_id):
+    """Send ``content`` to ``recipient_id``, starting their conversation if needed"""
+    data = request.get_json() or {}
+    recipient_id = data.get('recipient_id')
+    if not isinstance(recipient_id, int) or recipient_id == user_id or not db.session.get(User, recipient_id):
+        return jsonify({'error': 'Recipient not found'}), 404
+    content, error = _message_content(data)
+    if error:
+        return jsonify({'error': error}), 400
+    return _send(None, user_id, recipient_id, content)
+
+@messaging_bp.route('/api/messaging/conversations/<int:conversation_id>/messages', methods=['POST'])
+@token_required
+def reply(user_id, conversation_id):
+    """Send ``content`` in an existing conversation"""
+    conversation, error_response = _own_conversation(user_id, conversation_id)
+    if error_response:
+        return error_response
+    content, error = _message_content(request.get_json() or {})
+    if error:
+        return jsonify({'error': error}), 400
+    return _send(conversation.id, user_id, conversation.other_user_id(user_id), content)
+
+@messaging_bp.route('/api/messaging/conversations', methods=['GET'])
+@token_required
+def get_conversations(user_id):
+    """The user's conversations, most recently active first, each with the
+    other user, the last message and the unread count; keyset-paginated with
+    ``cursor`` over the user's conversation summaries"""
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 50))
+    query = db.session.query(ConversationSummary, Message, User).join(
+        Message, Message.id == ConversationSummary.last_message_id
+    ).join(
+        User, User.id == ConversationSummary.other_user_id
+    ).filter(
+        ConversationSummary.user_id == user_id
+    ).order_by(ConversationSummary.last_message_at.desc(), ConversationSummary.conversation_id.desc())
+    sort_key = [(ConversationSummary.last_message_at, datetime), (ConversationSummary.conversation_id, int)]
+    try:
+        rows, next_cursor = keyset_page(query, request.args.get('cursor'), per_page, sort_key)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify({
+        'conversations': [{
+            'id': summary.conversation_id,
+            'other_user': {
+                'id': other.id,
+                'username': other.username,
+                'first_name': other.first_name,
+                'last_name': other.last_name,
+                'image_url': other.image_url
+            },
+            'last_message': message.to_dict(),
+            'last_message_at': summary.last_message_at.isoformat(),
+            'unread_count': summary.unread_count
+        } for summary, message, other, *_ in rows],
+        'pagination': {
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None
+        }
+    }), 200
+
+@messaging_bp.route('/api/messaging/conversations/<int:conversation_id>/read', methods=['PUT'])
+@token_required
+def mark_conversation_read(user_id, conversation_id):
+    """Mark every message the user received in a conversation read"""
+    conversation, error_response = _own_conversation(user_id, conversation_id)
+    if error_response:
+        return error_response
+    marked = write_queue().run(ConversationSummary.mark_read, user_id, conversation.id)
+    return jsonify({'message': 'Conversation marked read', 'updated': marked}), 200
+
+@messaging_bp.route('/api/messaging/conversations/<int:conversation_id>/messages', methods=['GET'])
+@token_required
+def get_thread(user_id, conversation_id):
+    """Messages of one conversation, newest first, keyset-paginated with
+    ``cursor`` straight off the (conversation_id, created_at, id) index"""
+    conversation, error_response = _own_conversation(user_id, conversation_id)
+    if error_response:
+        return error_response
+    per_page = max(1, min(request.args.get('per_page', 50, type=int), 100))
+    query = Message.query.filter_by(conversation_id=conversation.id).order_by(
+        Message.created_at.desc(), Message.id.desc())
+    sort_key = [(Message.created_at, datetime), (Message.id, int)]
+    try:
+        rows, next_cursor = keyset_page(query, request.args.get('cursor'), per_page, sort_key)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify({
+        'conversation_id': conversation.id,
+        'other_user_id': conversation.other_user_id(user_id),
+        'messages': [row[0].to_dict() for row in rows],
+        'pagination': {
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None
+        }
+    }), 200
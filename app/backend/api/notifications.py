@@ -0,0 +1,48 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+from models.user import db
+from models.notification import Notification
+from utils.jwt_utils import token_required
+from utils.pagination import keyset_page
+
+notifications_bp = Blueprint('notifications', __name__)
+
+@notifications_bp.route('/api/notifications', methods=['GET'])
+@token_required
+def get_notifications(user_id):
+    """The user's notifications, newest first, keyset-paginated with ``cursor``;
+    ``unread=true`` lists only unread ones"""
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 50))
+    query = Notification.query.filter_by(user_id=user_id)
+    if request.args.get('unread', 'false').lower() == 'true':
+        query = query.filter_by(is_read=False)
+    sort_key = [(Notification.created_at, datetime), (Notification.id, int)]
+    query = query.order_by(Notification.created_at.desc(), Notification.id.desc())
+    try:
+        rows, next_cursor = keyset_page(query, request.args.get('cursor'), per_page, sort_key)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify({
+        'notifications': [row[0].to_dict() for row in rows],
+        'unread_count': Notification.query.filter_by(user_id=user_id, is_read=False).count(),
+        'pagination': {
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None
+        }
+    }), 200
+
+@notifications_bp.route('/api/notifications/read', methods=['PUT'])
+@token_required
+def mark_notifications_read(user_id):
+    """Mark the notifications in ``ids`` read, or all of them with ``all: true``"""
+    data = request.get_json() or {}
+    query = Notification.query.filter_by(user_id=user_id, is_read=False)
+    if not data.get('all'):
+        ids = data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({'error': 'ids must be a list of notification ids'}), 400
+        query = query.filter(Notification.id.in_(ids))
+    updated = query.update({Notification.is_read: True}, synchronize_session=False)
+    db.session.commit()
+    return jsonify({'message': 'Notifications marked read', 'updated': updated}), 200
@@ -1,12 +1,25 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 from models.user import db, User
-from models.post import Post
-from datetime import datetime
-from sqlalchemy import desc, asc, func, and_, or_
+from models.post import (
+    Post, PostLike, PostCategoryStat, PostTag, TagStat,
+    POST_LISTING_COLUMNS, post_row_to_json, post_listing_json, extract_hashtags,
+    POSTS_VERSION, POST_CATEGORIES_VERSION
+)
+from models.counters import ChangeCounter
+from datetime import datetime, timezone
+from sqlalchemy import desc, asc, func, and_
+from sqlalchemy.exc import IntegrityError
 import re
 from utils.jwt_utils import token_required
+from utils.pagination import encode_cursor, decode_cursor, keyset_condition, keyset_page
+from utils.search_index import search_posts_subquery
+from utils.etag import conditional_get
+from utils.page_cache import staleness_bucket
+from utils.timeline import fan_out_post, remove_post, publish_new_post
+from utils.view_counter import record_views
+from utils.write_queue import write_queue
 
 posts_bp = Blueprint('posts', __name__)
 
@@ -15,6 +28,8 @@ ALLOWED_EXTENSIONS = None
 POSTS_UPLOAD_FOLDER = None
 IMAGE_MAX_SIZE = 5 * 1024 * 1024  # 5MB
 VIDEO_MAX_SIZE = 20 * 1024 * 1024  # 20MB
+EXPORT_BATCH_SIZE = 500
+EXPORT_MAX_BATCH_SIZE = 5000
 
 def allowed_file(filename):
     if not filename or '.' not in filename:
@@ -22,46 +37,61 @@ def allowed_file(filename):
     ext = filename.rsplit('.', 1)[1].lower()
     return ext in (ALLOWED_EXTENSIONS or [])
 
+def posts_version(user_id):
+    # Like and view counts are not versioned, so they may lag by up to the page cache TTL
+    return ChangeCounter.current(POSTS_VERSION), staleness_bucket()
+
+def categories_version(user_id):
+    return ChangeCounter.current(POST_CATEGORIES_VERSION)
+
 @posts_bp.route('/api/posts', methods=['GET'])
 @token_required
+@conditional_get(posts_version, cache_first_page=True)
 def get_posts(user_id):
-    """Get posts with advanced filtering, sorting, and pagination"""
+    """Get posts with advanced filtering, sorting, and pagination.
+
+    Passing ``cursor`` (empty for the first page) switches to keyset pagination
+    over the sort key: the response carries ``next_cursor`` and the total
+    count is only computed when ``include_total=true``.
+
+    ``search`` goes through the full-text index and, unless another
+    ``sort_by`` is given, results are ranked by relevance.
+    """
     try:
         # Get query parameters
         page = request.args.get('page', 1, type=int)
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
         per_page = min(request.args.get('per_page', 10, type=int), 50)  # Max 50 per page
         search = request.args.get('search', '').strip()
         category = request.args.get('category', '').strip()
         visibility = request.args.get('visibility', '').strip()
         tags = request.args.get('tags', '').strip()
-        sort_by = request.args.get('sort_by', 'created_at')
+        sort_by = request.args.get('sort_by', 'relevance' if search else 'created_at')
         sort_order = request.args.get('sort_order', 'desc')
         
         # Validate sort parameters
-        valid_sort_fields = ['created_at', 'likes_count', 'views_count', 'comments_count']
+        valid_sort_fields = ['created_at', 'relevance', 'likes_count', 'views_count', 'comments_count']
         if sort_by not in valid_sort_fields:
             sort_by = 'created_at'
         
         if sort_order not in ['asc', 'desc']:
             sort_order = 'desc'
         
-        # Build query
-        query = Post.query.join(User)
+        # Build query; only the columns the response needs are selected, as plain
+        # rows, so authors come from the join and nothing is ORM-hydrated
+        query = db.session.query(*POST_LISTING_COLUMNS).select_from(Post).join(User)
         
         # Apply search filter
-        if search:
-            search_terms = search.split()
-            search_conditions = []
-            for term in search_terms:
-                search_conditions.append(
-                    or_(
-                        Post.content.ilike(f'%{term}%'),
-                        User.username.ilike(f'%{term}%'),
-                        User.first_name.ilike(f'%{term}%'),
-                        User.last_name.ilike(f'%{term}%')
-                    )
-                )
-            query = query.filter(or_(*search_conditions))
+        search_results = search_posts_subquery(search) if search else None
+        if search_results is not None:
+            query = query.join(search_results, search_results.c.post_id == Post.id)
+        else:
+            if search:
+                # Nothing searchable in the text (e.g. only punctuation)
+                query = query.filter(db.false())
+            if sort_by == 'relevance':
+                sort_by = 'created_at'
         
         # Apply category filter
         if category:
@@ -70,27 +100,27 @@ def get_posts(user_id):
         if visibility:
             query = query.filter(Post.visibility == visibility)
         
-        # Apply tags filter (if implemented)
+        # Apply tags filter (posts with any of the tags, looked up in post_tags)
         if tags:
-            tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
-            # This would need to be implemented based on your tagging system
-            pass
+            tag_list = [tag.strip().lstrip('#').lower() for tag in tags.split(',') if tag.strip()]
+            query = query.filter(Post.id.in_(
+                db.session.query(PostTag.post_id).filter(PostTag.tag.in_(tag_list))
+            ))
         
-        # Apply sorting
-        if sort_by == 'likes_count':
-            # This would need likes_count field in Post model
-            query = query.order_by(desc(Post.created_at))
-        elif sort_by == 'views_count':
-            # This would need views_count field in Post model
-            query = query.order_by(desc(Post.created_at))
-        elif sort_by == 'comments_count':
-            # This would need comments_count field in Post model
-            query = query.order_by(desc(Post.created_at))
-        else:  # created_at
-            if sort_order == 'desc':
-                query = query.order_by(desc(Post.created_at))
-            else:
-                query = query.order_by(asc(Post.created_at))
+        # Apply sorting; (created_at, id) always ends the key so the order is total
+        descending = sort_order == 'desc'
+        sort_key = []
+        if sort_by == 'relevance':
+            sort_key.append((search_results.c.score, float))
+            descending = True
+        elif sort_by in ('likes_count', 'views_count', 'comments_count'):
+            sort_key.append((getattr(Post, sort_by), int))
+        sort_key += [(Post.created_at, datetime), (Post.id, int)]
+        order = desc if descending else asc
+        query = query.order_by(*[order(column) for column, _ in sort_key])
+        
+        if cursor is not None:
+            return _get_posts_by_cursor(query, cursor, per_page, sort_key, descending, include_total)
         
         # Apply pagination
         pagination = query.paginate(
@@ -100,40 +130,53 @@ def get_posts(user_id):
         )
         
         # Prepare response
-        posts_data = []
-        for post in pagination.items:
-            post_dict = post.to_dict()
-            # Add additional fields if needed
-            post_dict['likes_count'] = 0  # Placeholder
-            post_dict['views_count'] = 0  # Placeholder
-            post_dict['comments_count'] = 0  # Placeholder
-            posts_data.append(post_dict)
-        
-        return jsonify({
-            'posts': posts_data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
-        }), 200
+        return _listing_response(pagination.items, {
+            'page': page,
+            'per_page': per_page,
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'has_next': pagination.has_next,
+            'has_prev': pagination.has_prev
+        })
         
     except Exception as e:
         current_app.logger.error(f"Error getting posts: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def _listing_response(rows, pagination):
+    """JSON response for POST_LISTING_COLUMNS rows, serialized straight to bytes.
+    Each listed post counts as a view."""
+    record_views(row.id for row in rows)
+    return current_app.response_class(post_listing_json(rows, pagination), mimetype='application/json'), 200
+
+def _get_posts_by_cursor(query, cursor, per_page, sort_key, descending, include_total):
+    """Keyset pagination: page N costs the same as page 1 (no OFFSET scan)"""
+    total = query.order_by(None).count() if include_total else None
+    try:
+        rows, next_cursor = keyset_page(query, cursor, per_page, sort_key, descending)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    pagination = {
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None
+    }
+    if total is not None:
+        pagination['total'] = total
+    
+    return _listing_response(rows, pagination)
+
 @posts_bp.route('/api/posts/categories', methods=['GET'])
 @token_required
+@conditional_get(categories_version)
 def get_categories(user_id):
     """Get all available post categories with real post counts"""
     try:
-        from models.post import Post
-        from models.user import db
-        # Query all categories and their counts
-        results = db.session.query(Post.category, db.func.count(Post.id)).group_by(Post.category).all()
+        # Counts are maintained on create/delete, so this reads one row per category
+        results = db.session.query(PostCategoryStat.category, PostCategoryStat.post_count).filter(
+            PostCategoryStat.post_count > 0
+        ).order_by(PostCategoryStat.category).all()
         categories = []
         for idx, (cat, count) in enumerate(results, 1):
             categories.append({'id': idx, 'name': cat or 'Uncategorized', 'count': count})
@@ -145,16 +188,10 @@ def get_categories(user_id):
 @posts_bp.route('/api/posts/popular-tags', methods=['GET'])
 @token_required
 def get_popular_tags(user_id):
-    """Get most popular tags"""
+    """Get most popular tags from the running per-tag counters"""
     try:
-        # This is a placeholder - implement based on your tagging system
-        popular_tags = [
-            {'name': 'javascript', 'count': 0},
-            {'name': 'react', 'count': 0},
-            {'name': 'python', 'count': 0},
-            {'name': 'design', 'count': 0},
-            {'name': 'startup', 'count': 0},
-        ]
+        limit = min(request.args.get('limit', 10, type=int), 50)
+        popular_tags = [{'name': stat.tag, 'count': stat.post_count} for stat in TagStat.top(limit)]
         
         return jsonify({'tags': popular_tags}), 200
         
@@ -162,12 +199,58 @@ def get_popular_tags(user_id):
         current_app.logger.error(f"Error getting popular tags: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-@posts_bp.route('/api/posts/debug', methods=['GET'])
-def debug_get_all_posts():
-    from models.post import Post
-    from models.user import db
-    posts = db.session.query(Post).all()
-    return jsonify({'posts': [p.to_dict() for p in posts]}), 200
+def _naive_utc(value):
+    """A parsed timestamp as naive UTC, like created_at; naive input is taken as UTC"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+@posts_bp.route('/api/posts/export', methods=['GET'])
+@token_required
+def export_posts(user_id):
+    """Stream every post as NDJSON, oldest first, in fixed-size batches.
+
+    Each line is ``{"cursor": ..., "post": {...}}``. Pass the last cursor
+    received as ``after`` to resume an interrupted export. ``since`` and
+    ``until`` (ISO 8601, ``until`` exclusive, UTC unless they carry an
+    offset) bound ``created_at``.
+    """
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        after = request.args.get('after')
+        since = _naive_utc(datetime.fromisoformat(since)) if since else None
+        until = _naive_utc(datetime.fromisoformat(until)) if until else None
+        after = decode_cursor(after, datetime, int) if after else None
+    except ValueError:
+        return jsonify({'error': 'Invalid export parameters'}), 400
+    batch_size = max(1, min(request.args.get('batch_size', EXPORT_BATCH_SIZE, type=int), EXPORT_MAX_BATCH_SIZE))
+    
+    query = db.session.query(*POST_LISTING_COLUMNS).select_from(Post).join(User)
+    if since:
+        query = query.filter(Post.created_at >= since)
+    if until:
+        query = query.filter(Post.created_at < until)
+    query = query.order_by(Post.created_at, Post.id)
+    
+    def generate(last_key):
+        # Each batch is its own short keyset query, so only one batch is ever
+        # in memory and no transaction stays open while a slow client reads
+        while True:
+            batch = query
+            if last_key:
+                batch = batch.filter(keyset_condition((Post.created_at, Post.id), last_key, descending=False))
+            rows = batch.limit(batch_size).all()
+            db.session.rollback()
+            if not rows:
+                return
+            lines = []
+            for row in rows:
+                last_key = (row.created_at, row.id)
+                lines.append(f'{{"cursor":"{encode_cursor(*last_key)}","post":{post_row_to_json(row)}}}\n')
+            yield ''.join(lines).encode('ascii')
+            if len(rows) < batch_size:
+                return
+    
+    return current_app.response_class(stream_with_context(generate(after)), mimetype='application/x-ndjson')
 
 @posts_bp.route('/api/posts', methods=['POST'])
 @token_required
@@ -247,19 +330,66 @@ def create_post(user_id):
 
     post = Post(user_id, content, media_url, visibility, category)
     db.session.add(post)
+    db.session.flush()
+    PostCategoryStat.adjust(category, 1)
+    for tag in extract_hashtags(content):
+        db.session.add(PostTag(post.id, tag))
+        TagStat.adjust(tag, 1)
+    fan_out_post(post)
+    ChangeCounter.bump(POSTS_VERSION, POST_CATEGORIES_VERSION)
     db.session.commit()
+    publish_new_post(post)
     return jsonify({'message': 'Post created', 'post': post.to_dict()}), 201
 
+def _write_like(user_id, post_id):
+    """Write job: the like row and the counter, in one transaction. Likes
+    do not bump the posts version (one hot row behind every like, and any
+    like would invalidate every listing); listings catch up within the page
+    cache TTL, see posts_version."""
+    db.session.add(PostLike(user_id, post_id))
+    Post.query.filter_by(id=post_id).update(
+        {Post.likes_count: Post.likes_count + 1}, synchronize_session=False
+    )
+
+def _write_unlike(user_id, post_id):
+    """Write job: delete the like; the counter only moves if a row was deleted"""
+    deleted = PostLike.query.filter_by(user_id=user_id, post_id=post_id).delete(synchronize_session=False)
+    if deleted:
+        Post.query.filter_by(id=post_id).update(
+            {Post.likes_count: Post.likes_count - deleted}, synchronize_session=False
+        )
+
 @posts_bp.route('/api/posts/<int:post_id>/like', methods=['POST'])
 @token_required
 def like_post(user_id, post_id):
+    """Like a post (idempotent); the counter moves in the same transaction as the like row"""
+    post = Post.query.get(post_id)
+    
+    if not post:
+        return jsonify({'error': 'Post not found'}), 404
+    
+    try:
+        write_queue().run(_write_like, user_id, post_id)
+    except IntegrityError:
+        # Already liked - the unique (user_id, post_id) constraint kept the counter honest
+        pass
+    
+    db.session.refresh(post)
+    return jsonify({'message': 'Post liked', 'liked': True, 'likes_count': post.likes_count}), 200
+
+@posts_bp.route('/api/posts/<int:post_id>/like', methods=['DELETE'])
+@token_required
+def unlike_post(user_id, post_id):
+    """Remove a like"""
     post = Post.query.get(post_id)
     
     if not post:
         return jsonify({'error': 'Post not found'}), 404
     
-    # This is a placeholder - implement like functionality
-    return jsonify({'message': 'Post liked', 'likes_count': 0}), 200 
+    write_queue().run(_write_unlike, user_id, post_id)
+    
+    db.session.refresh(post)
+    return jsonify({'message': 'Post unliked', 'liked': False, 'likes_count': post.likes_count}), 200
 
 @posts_bp.route('/api/posts/<int:post_id>', methods=['DELETE'])
 @token_required
@@ -269,6 +399,13 @@ def delete_post(user_id, post_id):
         return jsonify({'error': 'Post not found'}), 404
     if post.user_id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
+    PostLike.query.filter_by(post_id=post_id).delete(synchronize_session=False)
+    PostCategoryStat.adjust(post.category, -1)
+    for post_tag in PostTag.query.filter_by(post_id=post_id):
+        TagStat.adjust(post_tag.tag, -1)
+    PostTag.query.filter_by(post_id=post_id).delete(synchronize_session=False)
+    remove_post(post)
+    ChangeCounter.bump(POSTS_VERSION, POST_CATEGORIES_VERSION)
     db.session.delete(post)
     db.session.commit()
     return jsonify({'message': 'Post deleted'}), 200 
\ No newline at end of file
@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify, current_app, send_from_directory
 from models.user import User, db
+from models.counters import ChangeCounter
 from utils.jwt_utils import token_required
+from utils.etag import conditional_get
+from utils.skill_match import record_skills_change, SKILL_PROFILES_VERSION
+from utils.geo import search_area, nearest
 import os
 import time
 import json
@@ -79,6 +83,10 @@ def process_image(filepath, filename):
         logger.error(f"Image processing error: {str(e)}")
         return False, str(e)
 
+def profile_version(user_id):
+    # One indexed column instead of the whole row; bumped on every user update
+    return db.session.query(User.version).filter_by(id=int(user_id)).scalar()
+
 def validate_profile_data(data):
     """Validate profile update data"""
     errors = []
@@ -150,6 +158,7 @@ def validate_profile_data(data):
 
 @profile_bp.route('/api/profile', methods=['GET'])
 @token_required
+@conditional_get(profile_version)
 def get_profile(user_id):
     """Get user profile - returns full profile for owner, public profile for others"""
     try:
@@ -199,7 +208,12 @@ def update_profile(user_id):
         # Update profile using the model method
         try:
             user.update_profile(data)
+            matching_changed = 'skills' in data or 'is_public' in data
+            if matching_changed:
+                ChangeCounter.bump(SKILL_PROFILES_VERSION)
             db.session.commit()
+            if matching_changed:
+                record_skills_change(user)
             logger.info(f"Profile updated for user {user_id}")
             
             # Return updated profile with computed fields
@@ -218,6 +232,46 @@ def update_profile(user_id):
         logger.error(f"Error updating profile: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@profile_bp.route('/api/profile/nearby', methods=['GET'])
+@token_required
+def get_nearby_profiles(user_id):
+    """Public profiles nearest first, each with ``distance_km``.
+
+    Takes the same area parameters as ``GET /api/jobs/nearby`` and defaults
+    to the user's own location. Coordinates of other users are never
+    returned, only their distance.
+    """
+    try:
+        user = User.query.get(int(user_id))
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        home = (user.latitude, user.longitude) if user.geohash else None
+        try:
+            center, bbox, radius_km = search_area(request.args, home)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 50))
+        try:
+            page, next_cursor = nearest(User, [User.is_public.is_(True), User.id != user.id],
+                                        center, bbox, radius_km, request.args.get('cursor'), per_page)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        users = {other.id: other for other in User.query.filter(User.id.in_([uid for uid, _ in page]))}
+        return jsonify({
+            'users': [{**users[uid].to_public_dict(), 'distance_km': round(distance, 2)}
+                      for uid, distance in page if uid in users],
+            'pagination': {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error finding nearby profiles: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @profile_bp.route('/api/profile/image', methods=['POST'])
 @token_required
 def upload_profile_image(user_id):
@@ -389,7 +443,9 @@ def update_skills(user_id):
             return jsonify({'error': 'At least 3 skills are required'}), 400
         # Update skills
         user.set_skills_list(skills_list)
+        ChangeCounter.bump(SKILL_PROFILES_VERSION)
         db.session.commit()
+        record_skills_change(user)
         
         logger.info(f"Skills updated for user {user_id}")
         return jsonify({'skills': skills_list}), 200
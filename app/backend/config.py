@@ -71,6 +71,49 @@ class Config:
     MAX_LOCATION_LENGTH = 120
     MAX_WEBSITE_LENGTH = 255
     
+    # Feed Configuration
+    TIMELINE_MAX_LENGTH = 800  # Entries kept per home timeline
+    FEED_PULL_FOLLOWER_THRESHOLD = 5000  # Authors with this many followers are pulled at read time, not pushed
+    FEED_RANK_CANDIDATES = 1000  # Newest feed posts scored per ranked request
+    FEED_RANK_HALF_LIFE_HOURS = 24.0
+    FEED_RANK_WEIGHTS = {'recency': 1.0, 'engagement': 0.5, 'affinity': 0.3, 'category': 0.2}
+    FEED_NEW_POSTS_LIMIT = 100  # Most post ids returned by /api/feed/new
+    FEED_LONG_POLL_MAX_SECONDS = 30  # Longest ?wait= a long-poll may hold a worker
+    FEED_SSE_MAX_SECONDS = 300  # Event streams close after this; EventSource reconnects
+    FEED_SSE_HEARTBEAT_SECONDS = 15
+    FEED_MAX_WAITERS = 16  # Long-polls and streams held open per process; keep below gunicorn --threads
+    
+    # Page cache (first pages of /api/posts and /api/feed, per worker)
+    PAGE_CACHE_MAX_ENTRIES = 1024
+    PAGE_CACHE_TTL_SECONDS = 30
+    
+    # Post view counts are buffered per worker and written in batches
+    VIEW_COUNTER_FLUSH_INTERVAL_SECONDS = 5.0  # Also the most a hard crash can lose
+    VIEW_COUNTER_FLUSH_SIZE = 1000  # Flush early once this many posts are pending
+    
+    # Job search facets (per-worker in-memory index, see utils/job_search.py)
+    JOB_FACETS_MAX_STALENESS_SECONDS = 30
+    JOB_FACETS_MAX_MATCHES = 5000  # Search facets count only the best-scoring matches beyond this
+    
+    # Skill matching (per-worker sparse TF-IDF matrices, see utils/skill_match.py)
+    SKILL_MATCH_MAX_STALENESS_SECONDS = 60
+    
+    # Rebuild per-worker indexes (facets, skill matching, follow graph) off the
+    # request path, serving the old copy meanwhile
+    INDEX_REBUILD_IN_BACKGROUND = True
+    
+    # Message push gateway (asyncio WebSocket/SSE server per web process, see
+    # utils/message_gateway.py); disabled unless a port is set
+    MESSAGE_GATEWAY_PORT = int(os.environ['MESSAGE_GATEWAY_PORT']) if os.environ.get('MESSAGE_GATEWAY_PORT') else None
+    MESSAGE_GATEWAY_HOST = os.environ.get('MESSAGE_GATEWAY_HOST', '0.0.0.0')
+    MESSAGE_GATEWAY_HEARTBEAT_SECONDS = 25
+    
+    # Group commit for message and like writes (see utils/write_queue.py); off
+    # unless WRITE_QUEUE_ENABLED=true, never with an in-memory SQLite database
+    WRITE_QUEUE_ENABLED = os.environ.get('WRITE_QUEUE_ENABLED', 'False').lower() == 'true'
+    WRITE_QUEUE_MAX_DELAY_MS = 2.0  # How long the first write of a batch waits for others
+    WRITE_QUEUE_MAX_BATCH = 256
+    
     # Database Configuration
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
@@ -138,6 +181,12 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    VIEW_COUNTER_FLUSH_INTERVAL_SECONDS = 0  # Tests flush explicitly
+    JOB_FACETS_MAX_STALENESS_SECONDS = 0
+    SKILL_MATCH_MAX_STALENESS_SECONDS = 0
+    INDEX_REBUILD_IN_BACKGROUND = False  # The in-memory database has one shared connection
+    MESSAGE_GATEWAY_PORT = None  # Tests start the gateway themselves
+    WRITE_QUEUE_ENABLED = False  # The in-memory database has one shared connection
 
 config = {
     'development': DevelopmentConfig,
@@ -1,11 +1,14 @@
 from main import create_app
 from models.user import db
+from utils.search_index import drop_search_index, init_search_index
 
 if __name__ == "__main__":
     app = create_app()
     with app.app_context():
         print("Dropping all tables...")
         db.drop_all()
+        drop_search_index()
         print("Creating all tables...")
         db.create_all()
+        init_search_index()
         print("Database reset complete.") 
\ No newline at end of file
@@ -1,19 +1,33 @@
 from flask import Flask, jsonify, send_from_directory, make_response, request
 from flask_cors import CORS
+from flask_migrate import Migrate
 from config import config
 import os
 import logging
+import click
 
 # Import models
 from models.user import db
+from models.post import PostCategoryStat
+from models.geo import GazetteerPlace
+from utils.search_index import init_search_index
+from utils.timeline import trim_timelines
+from utils.page_cache import init_page_cache, page_cache
+from utils.view_counter import init_view_counter, view_counter
+from utils.pubsub import init_pubsub
+from utils.geo import geocode_existing
+from utils.message_gateway import init_message_gateway, message_gateway
+from utils.write_queue import init_write_queue, write_queue
 
 # Import blueprints
 from api.auth import auth_bp
 from api.profile import profile_bp
 from api.posts import posts_bp
 from api.feed import feed_bp
+from api.connections import connections_bp
 from api.jobs import jobs_bp
 from api.messaging import messaging_bp
+from api.notifications import notifications_bp
 
 def create_app(config_name=None):
     """Application factory pattern"""
@@ -28,6 +42,11 @@ def create_app(config_name=None):
 
     # Initialize extensions
     db.init_app(app)
+    Migrate(app, db)
+    init_page_cache(app)
+    init_view_counter(app)
+    init_pubsub(app)
+    init_write_queue(app)
     
     # Configure CORS - allow production origins
     ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:5173,http://127.0.0.1:5173,https://your-frontend-url.onrender.com').split(',')
@@ -35,9 +54,11 @@ def create_app(config_name=None):
     CORS(app,
          origins=ALLOWED_ORIGINS,
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-         allow_headers=['Content-Type', 'Authorization', 'X-Requested-With'],
+         allow_headers=['Content-Type', 'Authorization', 'X-Requested-With', 'If-None-Match'],
+         expose_headers=['ETag'],
          supports_credentials=True,
          max_age=3600)
+    init_message_gateway(app, ALLOWED_ORIGINS)
     
     # Static file serving for uploaded images
     @app.route('/static/profile_images/<filename>', methods=['GET', 'OPTIONS'])
@@ -100,8 +121,31 @@ def create_app(config_name=None):
     app.register_blueprint(profile_bp)
     app.register_blueprint(posts_bp)
     app.register_blueprint(feed_bp)
+    app.register_blueprint(connections_bp)
     app.register_blueprint(jobs_bp)
     app.register_blueprint(messaging_bp)
+    app.register_blueprint(notifications_bp)
+    
+    # Maintenance commands (schedule these with cron or the platform's job runner)
+    @app.cli.command('reconcile-category-stats')
+    def reconcile_category_stats():
+        """Correct drift in the maintained per-category post counts"""
+        corrected = PostCategoryStat.reconcile()
+        print(f"Category stats reconciled, {corrected} categories corrected")
+    
+    @app.cli.command('trim-timelines')
+    def trim_timelines_command():
+        """Cap every home timeline at TIMELINE_MAX_LENGTH entries"""
+        removed = trim_timelines()
+        print(f"Timelines trimmed, {removed} entries removed")
+    
+    @app.cli.command('load-gazetteer')
+    @click.argument('path', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer_cities.tsv'))
+    def load_gazetteer(path):
+        """Load a GeoNames cities dump and geocode existing jobs and profiles"""
+        loaded = GazetteerPlace.load_geonames(path)
+        located = geocode_existing()
+        print(f"Gazetteer loaded, {loaded} places; {located} jobs and profiles located")
     
     # Error handlers
     @app.errorhandler(400)
@@ -138,6 +182,26 @@ def create_app(config_name=None):
             'version': '1.0.0'
         })
     
+    # First-page cache metrics (per worker process)
+    @app.route('/health/page-cache')
+    def page_cache_stats():
+        return jsonify(page_cache().stats())
+    
+    # Buffered post view counts (per worker process)
+    @app.route('/health/view-counter')
+    def view_counter_stats():
+        return jsonify(view_counter().stats())
+    
+    # Message push gateway connections (per worker process)
+    @app.route('/health/message-gateway')
+    def message_gateway_stats():
+        return jsonify(message_gateway().stats())
+    
+    # Group-commit batches (per worker process)
+    @app.route('/health/write-queue')
+    def write_queue_stats():
+        return jsonify(write_queue().stats())
+    
     # Root endpoint
     @app.route('/')
     def root():
@@ -150,7 +214,8 @@ def create_app(config_name=None):
                 'posts': '/api/posts/*',
                 'feed': '/api/feed/*',
                 'jobs': '/api/jobs/*',
-                'messaging': '/api/messaging/*'
+                'messaging': '/api/messaging/*',
+                'notifications': '/api/notifications/*'
             }
         })
     
@@ -158,6 +223,7 @@ def create_app(config_name=None):
     with app.app_context():
         try:
             db.create_all()
+            init_search_index()
             app.logger.info("Database tables created successfully")
         except Exception as e:
             app.logger.error(f"Error creating database tables: {e}")
@@ -0,0 +1,60 @@
+from datetime import datetime
+from .user import db
+from .counters import upsert_increment
+
+CONNECTION_PENDING = 'pending'
+CONNECTION_ACCEPTED = 'accepted'
+
+class UserConnection(db.Model):
+    """Follow edge from follower to following, live once the request is accepted.
+
+    Mirrors the user_connections table described in db.sql.
+    """
+    __tablename__ = 'user_connections'
+    __table_args__ = (
+        db.UniqueConstraint('follower_id', 'following_id', name='uq_user_connections_pair'),
+        db.CheckConstraint("status IN ('pending', 'accepted')", name='ck_user_connections_status'),
+        # Fan-out reads "accepted followers of an author" straight off this index
+        db.Index('ix_user_connections_following_status', 'following_id', 'status', 'follower_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    follower_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    following_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20), default=CONNECTION_PENDING, server_default=CONNECTION_PENDING, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __init__(self, follower_id, following_id, status=CONNECTION_PENDING):
+        self.follower_id = follower_id
+        self.following_id = following_id
+        self.status = status
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'follower_id': self.follower_id,
+            'following_id': self.following_id,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class FollowerStat(db.Model):
+    """Accepted follower count per user, maintained as connections are accepted
+    and removed so the feed can tell push authors from pull authors cheaply.
+    """
+    __tablename__ = 'follower_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    follower_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    @classmethod
+    def adjust(cls, user_id, delta):
+        """Add delta to a user's follower count inside the caller's transaction"""
+        upsert_increment(cls.__table__, 'user_id', user_id, 'follower_count', delta)
+
+    @classmethod
+    def count(cls, user_id):
+        count = db.session.query(cls.follower_count).filter(cls.user_id == user_id).scalar()
+        return count or 0
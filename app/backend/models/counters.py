@@ -0,0 +1,72 @@
+from sqlalchemy import select, literal, true
+from sqlalchemy.dialects import postgresql, sqlite
+from .user import db
+
+def upsert_increment(table, key_name, key, count_name, delta, connection=None):
+    """Add delta to table.count_name for key, creating the row if needed.
+
+    Runs on the session (or the given connection, e.g. inside a flush event)
+    so it commits or rolls back with the caller's transaction.
+    """
+    executor = connection if connection is not None else db.session
+    key_column, count_column = table.c[key_name], table.c[count_name]
+    dialect = (connection or db.session.get_bind()).dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        executor.execute(
+            insert(table).values({key_name: key, count_name: delta}).on_conflict_do_update(
+                index_elements=[key_column],
+                set_={count_name: count_column + delta}
+            )
+        )
+        return
+    updated = executor.execute(
+        table.update().where(key_column == key).values({count_name: count_column + delta})
+    ).rowcount
+    if not updated:
+        executor.execute(table.insert().values({key_name: key, count_name: delta}))
+
+class ChangeCounter(db.Model):
+    """Named version counters bumped in the same transaction as the data they cover.
+
+    Readers compare versions instead of re-running queries (ETags, caches).
+    Kept in the database so every worker process sees the same versions.
+    """
+    __tablename__ = 'change_counters'
+
+    name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    @classmethod
+    def bump(cls, *names, connection=None):
+        for name in names:
+            upsert_increment(cls.__table__, 'name', name, 'version', 1, connection=connection)
+
+    @classmethod
+    def bump_selected(cls, names):
+        """Bump every counter named by a one-column SELECT, in one statement.
+
+        Used where the set of names comes from the database (e.g. one
+        timeline counter per follower) so the cost does not grow with a
+        round trip per name.
+        """
+        table = cls.__table__
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            # The WHERE keeps SQLite from parsing ON CONFLICT as a join constraint
+            names = select(names.subquery().c[0], literal(1))
+            db.session.execute(
+                insert(table).from_select(['name', 'version'], names.where(true())).on_conflict_do_update(
+                    index_elements=[table.c.name],
+                    set_={'version': table.c.version + 1}
+                )
+            )
+            return
+        cls.bump(*db.session.execute(names).scalars().all())
+
+    @classmethod
+    def current(cls, *names):
+        """Versions for names as a tuple (0 for counters never bumped)"""
+        versions = dict(db.session.query(cls.name, cls.version).filter(cls.name.in_(names)).all())
+        return tuple(versions.get(name, 0) for name in names)
@@ -0,0 +1,65 @@
+import unicodedata
+from .user import db
+
+def normalize_place_name(name):
+    """Lookup form of a place name: accents stripped, lower case, single spaces"""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+    return ' '.join(folded.replace('.', ' ').split())
+
+class GazetteerPlace(db.Model):
+    """A populated place from an offline gazetteer (GeoNames cities format)"""
+    __tablename__ = 'gazetteer_places'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    country_code = db.Column(db.String(2), nullable=False)
+    admin1_code = db.Column(db.String(20), default='', nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    population = db.Column(db.BigInteger, default=0, nullable=False)
+
+    @classmethod
+    def load_geonames(cls, path, batch_size=5000):
+        """Replace the gazetteer with a GeoNames cities dump (tab-separated,
+        e.g. cities15000.txt; lines starting with '#' are skipped). Every
+        place is findable by its name, ASCII name and alternate names.
+        Returns the number of places loaded."""
+        GazetteerName.query.delete()
+        cls.query.delete()
+        places, names, loaded = [], [], 0
+
+        def flush():
+            db.session.execute(cls.__table__.insert(), places)
+            if names:
+                db.session.execute(GazetteerName.__table__.insert(), names)
+            places.clear()
+            names.clear()
+
+        with open(path, encoding='utf-8') as dump:
+            for line in dump:
+                if line.startswith('#') or not line.strip():
+                    continue
+                fields = line.rstrip('\n').split('\t')
+                place_id = int(fields[0])
+                places.append({
+                    'id': place_id, 'name': fields[1], 'country_code': fields[8], 'admin1_code': fields[10],
+                    'latitude': float(fields[4]), 'longitude': float(fields[5]),
+                    'population': int(fields[14] or 0)
+                })
+                lookup_names = {normalize_place_name(name) for name in [fields[1], fields[2]] + fields[3].split(',')}
+                names.extend({'name': name, 'place_id': place_id} for name in lookup_names if name)
+                loaded += 1
+                if len(places) >= batch_size:
+                    flush()
+        if places:
+            flush()
+        db.session.commit()
+        return loaded
+
+class GazetteerName(db.Model):
+    """Normalized name (or alternate name) of a gazetteer place"""
+    __tablename__ = 'gazetteer_names'
+
+    name = db.Column(db.String(200), primary_key=True)
+    place_id = db.Column(db.Integer, db.ForeignKey('gazetteer_places.id', ondelete='CASCADE'), primary_key=True)
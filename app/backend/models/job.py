@@ -0,0 +1,197 @@
+import json
+from datetime import datetime
+from .user import db
+
+# ChangeCounter name covering job listings, facets and job details
+JOBS_VERSION = 'jobs'
+
+JOB_TYPES = ('full-time', 'part-time', 'contract', 'internship')
+JOB_STATUSES = ('open', 'closed')
+APPLICATION_STATUSES = ('pending', 'reviewed', 'accepted', 'rejected')
+
+# Facets shown next to job search results, in response order
+JOB_FACETS = ('job_type', 'location', 'company_id', 'status')
+
+class Company(db.Model):
+    """Employer profile owned by a user; mirrors the companies table in db.sql"""
+    __tablename__ = 'companies'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    website = db.Column(db.String(255), nullable=True)
+    industry = db.Column(db.String(100), nullable=True)
+    company_size = db.Column(db.String(50), nullable=True)
+    location = db.Column(db.String(120), nullable=True)
+    logo = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'name': self.name,
+            'description': self.description,
+            'website': self.website,
+            'industry': self.industry,
+            'company_size': self.company_size,
+            'location': self.location,
+            'logo': self.logo,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class Job(db.Model):
+    """Job posting; mirrors the jobs table in db.sql"""
+    __tablename__ = 'jobs'
+    # Every listing orders by (created_at, id) and each facet filter has an
+    # index with that suffix, so a filtered page is one index range read
+    __table_args__ = (
+        db.CheckConstraint(
+            "job_type IN ('full-time', 'part-time', 'contract', 'internship')", name='ck_jobs_job_type'
+        ),
+        db.CheckConstraint("status IN ('open', 'closed')", name='ck_jobs_status'),
+        db.Index('ix_jobs_created_at_id', 'created_at', 'id'),
+        db.Index('ix_jobs_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_jobs_job_type_created_at_id', 'job_type', 'created_at', 'id'),
+        db.Index('ix_jobs_location_created_at_id', 'location', 'created_at', 'id'),
+        db.Index('ix_jobs_company_id_created_at_id', 'company_id', 'created_at', 'id'),
+        # Nearby searches read one (status, geohash) range per covering cell
+        db.Index('ix_jobs_status_geohash', 'status', 'geohash'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id', ondelete='CASCADE'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    location = db.Column(db.String(120), nullable=False)
+    job_type = db.Column(db.String(20), nullable=False)
+    salary_range = db.Column(db.String(100), nullable=True)
+    status = db.Column(db.String(20), default='open', server_default='open', nullable=False)
+    # Geocoded from location when it is written (see utils/geo.py); NULL if unknown
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    company = db.relationship('Company', backref=db.backref('jobs', lazy=True, passive_deletes=True))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'company': {
+                'id': self.company.id,
+                'name': self.company.name,
+                'logo': self.company.logo
+            } if self.company else None,
+            'title': self.title,
+            'description': self.description,
+            'location': self.location,
+            'job_type': self.job_type,
+            'salary_range': self.salary_range,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+# Columns needed by listing responses; descriptions are cut to a preview
+JOB_PREVIEW_LENGTH = 300
+JOB_LISTING_COLUMNS = (
+    Job.id, Job.title, db.func.substr(Job.description, 1, JOB_PREVIEW_LENGTH).label('description'),
+    Job.location, Job.job_type, Job.salary_range, Job.status, Job.created_at,
+    Company.id.label('company_id'), Company.name.label('company_name'), Company.logo.label('company_logo')
+)
+
+def job_row_to_dict(row):
+    """Listing shape of a row selected with JOB_LISTING_COLUMNS"""
+    return {
+        'id': row.id,
+        'company': {'id': row.company_id, 'name': row.company_name, 'logo': row.company_logo},
+        'title': row.title,
+        'description': row.description,
+        'location': row.location,
+        'job_type': row.job_type,
+        'salary_range': row.salary_range,
+        'status': row.status,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+class JobApplication(db.Model):
+    """A user's application to a job; mirrors the job_applications table in db.sql"""
+    __tablename__ = 'job_applications'
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'user_id', name='uq_job_applications_job_user'),
+        db.CheckConstraint(
+            "status IN ('pending', 'reviewed', 'accepted', 'rejected')", name='ck_job_applications_status'
+        ),
+        # The employer's view lists a job's applications newest first
+        db.Index('ix_job_applications_job_id_created_at_id', 'job_id', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    applicant_name = db.Column(db.String(100), nullable=False)
+    applicant_email = db.Column(db.String(120), nullable=False)
+    resume_link = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), default='pending', server_default='pending', nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_id': self.job_id,
+            'user_id': self.user_id,
+            'applicant_name': self.applicant_name,
+            'applicant_email': self.applicant_email,
+            'resume_link': self.resume_link,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+# Saved job searches per user; each is an alert for new matching jobs
+MAX_SAVED_SEARCHES = 20
+
+class SavedJobSearch(db.Model):
+    """A user's saved /api/jobs search: free text plus facet filters"""
+    __tablename__ = 'saved_job_searches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    search = db.Column(db.String(200), default='', nullable=False)
+    filters = db.Column(db.Text, default='{}', nullable=False)  # JSON {facet: [values]}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    keys = db.relationship('SavedSearchKey', backref='saved_search', lazy=True,
+                           cascade='all, delete-orphan', passive_deletes=True)
+
+    def get_filters(self):
+        return self.parse_filters(self.filters)
+
+    @staticmethod
+    def parse_filters(filters):
+        """{facet: set of values} from the stored JSON"""
+        return {facet: set(values) for facet, values in json.loads(filters or '{}').items()}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'search': self.search,
+            'filters': json.loads(self.filters or '{}'),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class SavedSearchKey(db.Model):
+    """Reverse index from a percolation key to the saved searches it may
+    match (see utils/percolator.py)"""
+    __tablename__ = 'saved_search_keys'
+
+    key = db.Column(db.String(140), primary_key=True)
+    saved_search_id = db.Column(
+        db.Integer, db.ForeignKey('saved_job_searches.id', ondelete='CASCADE'), primary_key=True, index=True
+    )
@@ -0,0 +1,170 @@
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from .user import db
+
+MAX_MESSAGE_LENGTH = 5000
+
+class Conversation(db.Model):
+    """Direct-message thread between two users, stored with the lower user
+    id first so each pair has exactly one conversation.
+
+    ``last_message_id``/``last_message_at`` point at the newest message and
+    are moved in the same transaction that inserts it. Inboxes are listed
+    from ConversationSummary, so nothing indexes them here.
+    """
+    __tablename__ = 'conversations'
+    __table_args__ = (
+        db.UniqueConstraint('first_user_id', 'second_user_id', name='uq_conversations_pair'),
+        db.CheckConstraint('first_user_id < second_user_id', name='ck_conversations_pair_order'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    first_user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    second_user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    # Not a foreign key: messages already reference conversations, and
+    # messages are never deleted on their own
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def other_user_id(self, user_id):
+        return self.second_user_id if user_id == self.first_user_id else self.first_user_id
+
+    def has_participant(self, user_id):
+        return user_id in (self.first_user_id, self.second_user_id)
+
+    @classmethod
+    def between(cls, user_id, other_id):
+        """The pair's conversation, created if it does not exist yet inside
+        the caller's transaction"""
+        first, second = sorted((user_id, other_id))
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            db.session.execute(
+                insert(cls.__table__).values(first_user_id=first, second_user_id=second,
+                                             created_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=['first_user_id', 'second_user_id'])
+            )
+        elif not cls.query.filter_by(first_user_id=first, second_user_id=second).first():
+            db.session.add(cls(first_user_id=first, second_user_id=second))
+            db.session.flush()
+        return cls.query.filter_by(first_user_id=first, second_user_id=second).one()
+
+    def record_message(self, message):
+        """Move the last-message pointer to ``message`` (already flushed).
+        Conditional on the id, so concurrent senders can only move it forward."""
+        db.session.execute(
+            Conversation.__table__.update()
+            .where(Conversation.id == self.id)
+            .where(db.or_(Conversation.last_message_id.is_(None), Conversation.last_message_id < message.id))
+            .values(last_message_id=message.id, last_message_at=message.created_at)
+        )
+
+class Message(db.Model):
+    """A direct message; mirrors the messages table in db.sql, partitioned by
+    conversation so a thread is one range of (conversation_id, created_at, id)"""
+    __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_conversation_created_at_id', 'conversation_id', 'created_at', 'id'),
+        # A recipient's unread messages in one conversation, for marking a thread read
+        db.Index('ix_messages_conversation_recipient_unread', 'conversation_id', 'recipient_id', 'is_read'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    recipient_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'conversation_id': self.conversation_id,
+            'sender_id': self.sender_id,
+            'recipient_id': self.recipient_id,
+            'content': self.content,
+            'is_read': self.is_read,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class ConversationSummary(db.Model):
+    """One row per conversation per participant: what that user's inbox
+    shows for it, kept current by the send and mark-read paths.
+
+    Replaces reading both pair indexes of ``conversations`` and counting
+    unread messages per page view: an inbox page is one range of
+    (user_id, last_message_at, conversation_id), and ``unread_count`` moves
+    by exactly the number of messages a send or a mark-read changed, in the
+    same transaction. The partner's profile is joined by primary key rather
+    than copied, so profile edits never have to rewrite summaries.
+    """
+    __tablename__ = 'conversation_summaries'
+    __table_args__ = (
+        db.Index('ix_conversation_summaries_user_last_message', 'user_id', 'last_message_at', 'conversation_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id', ondelete='CASCADE'), primary_key=True)
+    other_user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+    unread_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    @classmethod
+    def record_message(cls, message):
+        """Move both participants' summaries to ``message`` (already flushed)
+        and count it unread for the recipient. Like
+        Conversation.record_message, the pointer only moves forward."""
+        table = cls.__table__
+        rows = [
+            {'user_id': user_id, 'conversation_id': message.conversation_id, 'other_user_id': other_id,
+             'last_message_id': message.id, 'last_message_at': message.created_at, 'unread_count': unread}
+            for user_id, other_id, unread in [(message.sender_id, message.recipient_id, 0),
+                                              (message.recipient_id, message.sender_id, 1)]
+        ]
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            statement = insert(table).values(rows)
+            newer = db.or_(table.c.last_message_id.is_(None),
+                           table.c.last_message_id < statement.excluded.last_message_id)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.conversation_id],
+                set_={
+                    'last_message_id': db.case((newer, statement.excluded.last_message_id),
+                                               else_=table.c.last_message_id),
+                    'last_message_at': db.case((newer, statement.excluded.last_message_at),
+                                               else_=table.c.last_message_at),
+                    'unread_count': table.c.unread_count + statement.excluded.unread_count
+                }
+            ))
+            return
+        for row in rows:
+            key = (table.c.user_id == row['user_id']) & (table.c.conversation_id == row['conversation_id'])
+            updated = db.session.execute(table.update().where(key).values(
+                unread_count=table.c.unread_count + row['unread_count'])).rowcount
+            if not updated:
+                db.session.execute(table.insert().values(row))
+                continue
+            db.session.execute(table.update().where(key).where(db.or_(
+                table.c.last_message_id.is_(None), table.c.last_message_id < message.id
+            )).values(last_message_id=message.id, last_message_at=message.created_at))
+
+    @classmethod
+    def mark_read(cls, user_id, conversation_id):
+        """Mark the user's unread messages in the conversation read and take
+        exactly that many off the counter; returns how many were marked.
+
+        Only the unread messages are touched, found through
+        ix_messages_conversation_recipient_unread."""
+        marked = Message.query.filter_by(
+            conversation_id=conversation_id, recipient_id=user_id, is_read=False
+        ).update({Message.is_read: True}, synchronize_session=False)
+        if marked:
+            cls.query.filter_by(user_id=user_id, conversation_id=conversation_id).update(
+                {cls.unread_count: cls.unread_count - marked}, synchronize_session=False
+            )
+        return marked
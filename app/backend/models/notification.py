@@ -0,0 +1,33 @@
+from datetime import datetime
+from .user import db
+
+NOTIFICATION_TYPES = ('connection', 'message', 'like', 'comment', 'job_application', 'job_match')
+
+class Notification(db.Model):
+    """Something for a user to look at; mirrors the notifications table in
+    db.sql, plus 'job_match' (reference_id is a job matching a saved search)"""
+    __tablename__ = 'notifications'
+    __table_args__ = (
+        db.CheckConstraint(
+            "type IN ('connection', 'message', 'like', 'comment', 'job_application', 'job_match')",
+            name='ck_notifications_type'
+        ),
+        # A user's notifications are read newest first
+        db.Index('ix_notifications_user_created_at_id', 'user_id', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    type = db.Column(db.String(20), nullable=False)
+    reference_id = db.Column(db.Integer, nullable=False)
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'reference_id': self.reference_id,
+            'is_read': self.is_read,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
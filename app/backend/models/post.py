@@ -1,8 +1,37 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import json
+from json.encoder import encode_basestring_ascii
+from sqlalchemy import event
+import re
 from .user import User, db
+from .counters import ChangeCounter, upsert_increment
+
+# ChangeCounter names covering what listing and category responses show
+POSTS_VERSION = 'posts'
+POST_CATEGORIES_VERSION = 'post_categories'
+
+HASHTAG_PATTERN = re.compile(r'(?<![\w#])#(\w{1,50})')
+
+def extract_hashtags(content):
+    """Distinct lower-cased hashtags in content, in order of first appearance"""
+    return list(dict.fromkeys(tag.lower() for tag in HASHTAG_PATTERN.findall(content or '')))
 
 class Post(db.Model):
+    # Composite indexes matched to the listing query shapes in api/posts.py:
+    # every listing orders by (created_at, id), optionally filtered by
+    # category or visibility, or by an engagement counter first;
+    # category counts group by category.
+    __table_args__ = (
+        db.Index('ix_post_created_at_id', 'created_at', 'id'),
+        db.Index('ix_post_category_created_at_id', 'category', 'created_at', 'id'),
+        db.Index('ix_post_visibility_created_at_id', 'visibility', 'created_at', 'id'),
+        db.Index('ix_post_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_post_likes_count_created_at_id', 'likes_count', 'created_at', 'id'),
+        db.Index('ix_post_views_count_created_at_id', 'views_count', 'created_at', 'id'),
+        db.Index('ix_post_comments_count_created_at_id', 'comments_count', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -11,6 +40,12 @@ class Post(db.Model):
     visibility = db.Column(db.String(20), default='public', nullable=False)
     category = db.Column(db.String(100), nullable=True)
 
+    # Denormalized engagement counters, updated in the same transaction as
+    # the rows they count (see api/posts.py)
+    likes_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    views_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    comments_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
     user = db.relationship('User', backref=db.backref('posts', lazy=True))
 
     def __init__(self, user_id, content, media_url=None, visibility='public', category=None):
@@ -29,6 +64,9 @@ class Post(db.Model):
             'created_at': self.created_at.isoformat(),
             'visibility': self.visibility,
             'category': self.category,
+            'likes_count': self.likes_count or 0,
+            'views_count': self.views_count or 0,
+            'comments_count': self.comments_count or 0,
             'user': {
                 'id': self.user.id,
                 'username': self.user.username,
@@ -36,4 +74,156 @@ class Post(db.Model):
                 'last_name': self.user.last_name,
                 'image_url': self.user.image_url
             } if self.user else None
-        } 
\ No newline at end of file
+        }
+
+# Columns needed by listing responses. Selecting them as plain rows skips ORM
+# hydration and the identity map; post_rows_to_json then renders the same
+# shape as to_dict() without building intermediate dicts.
+POST_LISTING_COLUMNS = (
+    Post.id, Post.user_id, Post.content, Post.media_url, Post.created_at,
+    Post.visibility, Post.category, Post.likes_count, Post.views_count,
+    Post.comments_count, User.username, User.first_name, User.last_name,
+    User.image_url
+)
+
+# Author fields shown in listings; changing one changes every listing the
+# author's posts appear in, so the posts version moves with them
+LISTED_AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'image_url')
+
+@event.listens_for(User, 'after_update')
+def _bump_posts_version_on_author_change(mapper, connection, target):
+    state = db.inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in LISTED_AUTHOR_FIELDS):
+        ChangeCounter.bump(POSTS_VERSION, connection=connection)
+
+_POST_JSON_TEMPLATE = (
+    '{"id":%d,"user_id":%d,"content":%s,"media_url":%s,"created_at":%s,'
+    '"visibility":%s,"category":%s,"likes_count":%d,"views_count":%d,'
+    '"comments_count":%d,"user":{"id":%d,"username":%s,"first_name":%s,'
+    '"last_name":%s,"image_url":%s}}'
+)
+
+def _json_string(value):
+    return 'null' if value is None else encode_basestring_ascii(value)
+
+def post_row_to_json(row):
+    """Render one row selected with POST_LISTING_COLUMNS as a JSON object (str)"""
+    (post_id, user_id, content, media_url, created_at, visibility, category,
+     likes_count, views_count, comments_count, username, first_name,
+     last_name, image_url) = row[:14]
+    return _POST_JSON_TEMPLATE % (
+        post_id, user_id, _json_string(content), _json_string(media_url),
+        _json_string(created_at.isoformat() if created_at else None),
+        _json_string(visibility), _json_string(category),
+        likes_count or 0, views_count or 0, comments_count or 0,
+        user_id, _json_string(username), _json_string(first_name),
+        _json_string(last_name), _json_string(image_url)
+    )
+
+def post_rows_to_json(rows):
+    """Render rows selected with POST_LISTING_COLUMNS as a JSON array (bytes)"""
+    return ('[' + ','.join([post_row_to_json(row) for row in rows]) + ']').encode('ascii')
+
+def post_listing_json(rows, pagination):
+    """Listing body ``{"posts": [...], "pagination": {...}}`` as bytes"""
+    return b''.join([
+        b'{"posts":', post_rows_to_json(rows),
+        b',"pagination":', json.dumps(pagination).encode('utf-8'), b'}'
+    ])
+
+class PostLike(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='uq_post_like_user_post'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __init__(self, user_id, post_id):
+        self.user_id = user_id
+        self.post_id = post_id
+
+class PostCategoryStat(db.Model):
+    """Post count per category, maintained on post create/delete so reading
+    the category list never has to GROUP BY the post table.
+
+    Uncategorized posts (NULL or empty category) are counted under ''.
+    """
+    __tablename__ = 'post_category_stats'
+
+    category = db.Column(db.String(100), primary_key=True)
+    post_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    @staticmethod
+    def key(category):
+        return category or ''
+
+    @classmethod
+    def adjust(cls, category, delta):
+        """Add delta to a category's count inside the caller's transaction"""
+        upsert_increment(cls.__table__, 'category', cls.key(category), 'post_count', delta)
+
+    @classmethod
+    def reconcile(cls):
+        """Recompute every count from the post table and fix any drift.
+
+        Meant to run periodically (``flask reconcile-category-stats``).
+        Returns the number of categories whose stored count was wrong.
+        """
+        actual = {}
+        for category, count in db.session.query(Post.category, db.func.count(Post.id)).group_by(Post.category):
+            actual[cls.key(category)] = actual.get(cls.key(category), 0) + count
+
+        corrected = 0
+        stored = {stat.category: stat for stat in cls.query.with_for_update()}
+        for category, count in actual.items():
+            stat = stored.pop(category, None)
+            if stat is None:
+                db.session.add(cls(category=category, post_count=count))
+                corrected += 1
+            elif stat.post_count != count:
+                stat.post_count = count
+                corrected += 1
+        for stat in stored.values():
+            if stat.post_count != 0:
+                stat.post_count = 0
+                corrected += 1
+
+        if corrected:
+            # Cached category lists and their ETags still carry the drifted counts
+            ChangeCounter.bump(POST_CATEGORIES_VERSION)
+        db.session.commit()
+        return corrected
+
+class PostTag(db.Model):
+    """Inverted index from hashtag to post; the (tag, post_id) key serves tag filters"""
+    __tablename__ = 'post_tags'
+
+    tag = db.Column(db.String(50), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), primary_key=True, index=True)
+
+    def __init__(self, post_id, tag):
+        self.post_id = post_id
+        self.tag = tag
+
+class TagStat(db.Model):
+    """Running post count per tag, maintained with post_tags; indexed for top-k reads"""
+    __tablename__ = 'tag_stats'
+    __table_args__ = (
+        db.Index('ix_tag_stats_post_count_tag', 'post_count', 'tag'),
+    )
+
+    tag = db.Column(db.String(50), primary_key=True)
+    post_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    @classmethod
+    def adjust(cls, tag, delta):
+        upsert_increment(cls.__table__, 'tag', tag, 'post_count', delta)
+
+    @classmethod
+    def top(cls, limit):
+        return cls.query.filter(cls.post_count > 0).order_by(
+            cls.post_count.desc(), cls.tag.desc()
+        ).limit(limit).all()
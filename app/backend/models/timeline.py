@@ -0,0 +1,18 @@
+from .user import db
+
+class TimelineEntry(db.Model):
+    """One post id pushed into one user's home timeline (fan-out on write).
+
+    created_at and author_id are copied from the post so a feed page is a
+    range read on (user_id, created_at, post_id) and unfollowing can drop an
+    author's entries without touching the post table.
+    """
+    __tablename__ = 'timeline_entries'
+    __table_args__ = (
+        db.Index('ix_timeline_entries_user_created_at_post', 'user_id', 'created_at', 'post_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), primary_key=True, index=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
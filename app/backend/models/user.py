@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from sqlalchemy.orm import validates
 import re
 import json
@@ -17,6 +18,10 @@ class User(db.Model):
     last_name = db.Column(db.String(50), default="")
     bio = db.Column(db.Text, default="")
     location = db.Column(db.String(120), default="")
+    # Geocoded from location when it is written (see utils/geo.py); NULL if unknown
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)
     phone = db.Column(db.String(20), default="")
     website = db.Column(db.String(255), default="")
     
@@ -49,6 +54,10 @@ class User(db.Model):
     # Timestamps
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    
+    # Incremented on every update (see _bump_version); used for profile ETags
+    # because updated_at only has one-second resolution on SQLite
+    version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
     # Validation Rules
     @validates('email')
@@ -249,9 +258,14 @@ class User(db.Model):
 
     def get_skills_list(self):
         """Get skills as a list"""
-        if not self.skills:
+        return self.parse_skills(self.skills)
+
+    @staticmethod
+    def parse_skills(skills):
+        """Skills list from the stored comma-separated string"""
+        if not skills:
             return []
-        return [skill.strip() for skill in self.skills.split(',') if skill.strip()]
+        return [skill.strip() for skill in skills.split(',') if skill.strip()]
 
     def set_skills_list(self, skills_list):
         """Set skills from a list"""
@@ -334,3 +348,8 @@ class User(db.Model):
         
         completed = sum(1 for field in fields if getattr(self, field))
         return int((completed / len(fields)) * 100)
+
+@event.listens_for(User, 'before_update')
+def _bump_version(mapper, connection, target):
+    # Evaluated in SQL, so concurrent updates cannot produce the same version
+    target.version = User.version + 1
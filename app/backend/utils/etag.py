@@ -0,0 +1,56 @@
+import hashlib
+from functools import wraps
+from flask import request, current_app, make_response, g
+from utils.page_cache import page_cache, is_first_page
+from utils.view_counter import record_views
+
+def make_etag(*parts):
+    """Weak ETag value derived from version numbers and request parameters"""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+def _render(view, etag, cache_first_page, user_id, *args, **kwargs):
+    """Run the view, or serve its body from the page cache for first pages.
+
+    Post views the view recorded are cached with the body and recorded again
+    on every hit, so cached pages still count as views.
+    """
+    cache = page_cache() if cache_first_page and is_first_page() else None
+    if cache is not None:
+        cached = cache.get(etag)
+        if cached is not None:
+            body, mimetype, viewed_post_ids = cached
+            if viewed_post_ids:
+                record_views(viewed_post_ids)
+            return current_app.response_class(body, mimetype=mimetype)
+    response = make_response(view(user_id, *args, **kwargs))
+    if cache is not None and response.status_code == 200 and not response.is_streamed:
+        cache.set(etag, (response.get_data(), response.mimetype, g.get('viewed_post_ids')))
+    return response
+
+def conditional_get(version, cache_first_page=False):
+    """Decorator for token-protected GET views: ``version(user_id)`` cheaply
+    describes the data behind the response.
+
+    A matching If-None-Match is answered with 304 before the view runs, so
+    the full query and serialization are skipped. With ``cache_first_page``
+    first-page bodies are also kept in the page cache under their ETag, so
+    other requests for the same page skip the view too. Use below
+    token_required.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(user_id, *args, **kwargs):
+            # Read the version before the data, so a concurrent write can only
+            # make the ETag older than the body (a later miss), never newer
+            etag = make_etag(version(user_id), user_id, request.path, sorted(request.args.items(multi=True)))
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = _render(f, etag, cache_first_page, user_id, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
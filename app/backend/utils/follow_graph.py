@@ -0,0 +1,215 @@
+"""Compact in-memory follow graph for "people you may know" suggestions.
+
+Accepted follow edges are held in CSR form: ``row_ids`` (sorted follower ids),
+``indptr`` and ``targets`` (followed ids, sorted within each row), all NumPy
+arrays. A 2-hop query gathers the rows of everyone the user follows with one
+fancy-indexing step and counts candidates with np.unique, instead of a SQL
+self-join over user_connections.
+
+Edges accepted or removed after loading go into a small add/remove overlay,
+folded back into the arrays once it grows past COMPACT_FRACTION of the graph.
+Each process keeps its own copy; the ``follow_graph`` change counter tells
+it when another process changed the graph, in which case it reloads in the
+background while the loaded copy keeps answering.
+"""
+import itertools
+import threading
+import numpy as np
+from flask import current_app
+from models.user import db
+from models.counters import ChangeCounter
+from models.connection import UserConnection, CONNECTION_ACCEPTED
+from utils.index_rebuild import rebuild
+
+FOLLOW_GRAPH_VERSION = 'follow_graph'
+
+# Fold the overlay into the CSR arrays once it holds this share of all edges
+COMPACT_FRACTION = 0.05
+COMPACT_MIN_EDGES = 1024
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+class FollowGraph:
+    """Directed follower -> following adjacency over user ids"""
+
+    def __init__(self, sources=_EMPTY, targets=_EMPTY):
+        self._build(np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64))
+
+    @classmethod
+    def from_database(cls):
+        rows = db.session.query(UserConnection.follower_id, UserConnection.following_id).filter(
+            UserConnection.status == CONNECTION_ACCEPTED
+        ).all()
+        # np.array() over Row objects is ~20x slower than streaming the ints
+        pairs = np.fromiter(itertools.chain.from_iterable(rows), np.int64, 2 * len(rows)).reshape(-1, 2)
+        return cls(pairs[:, 0], pairs[:, 1])
+
+    def _build(self, sources, targets):
+        order = np.lexsort((targets, sources))
+        sources, targets = sources[order], targets[order]
+        self.row_ids, row_starts = np.unique(sources, return_index=True)
+        self.indptr = np.append(row_starts, len(sources)).astype(np.int64)
+        self.targets = targets
+        self._added = {}
+        self._removed = {}
+        self._overlay_size = 0
+
+    @property
+    def edge_count(self):
+        return len(self.targets) + sum(map(len, self._added.values())) - sum(map(len, self._removed.values()))
+
+    def _csr_row(self, user_id):
+        i = np.searchsorted(self.row_ids, user_id)
+        if i < len(self.row_ids) and self.row_ids[i] == user_id:
+            return self.targets[self.indptr[i]:self.indptr[i + 1]]
+        return _EMPTY
+
+    def _row(self, user_id):
+        row = self._csr_row(user_id)
+        removed, added = self._removed.get(user_id), self._added.get(user_id)
+        if removed:
+            row = row[~np.isin(row, list(removed))]
+        if added:
+            row = np.union1d(row, list(added))
+        return row
+
+    def following(self, user_id):
+        """Sorted ids the user follows"""
+        return self._row(user_id)
+
+    def _gather(self, user_ids):
+        """Concatenated rows of user_ids (with repeats), as one array"""
+        dirty = np.array([uid for uid in user_ids.tolist() if uid in self._added or uid in self._removed],
+                         dtype=np.int64)
+        clean = user_ids[~np.isin(user_ids, dirty)] if len(dirty) else user_ids
+
+        idx = np.searchsorted(self.row_ids, clean)
+        found = idx < len(self.row_ids)
+        found[found] = self.row_ids[idx[found]] == clean[found]
+        idx = idx[found]
+        starts, ends = self.indptr[idx], self.indptr[idx + 1]
+        lengths = ends - starts
+        # positions of every element of every selected row, without a Python loop
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        gathered = self.targets[offsets + np.arange(lengths.sum())]
+
+        if len(dirty):
+            gathered = np.concatenate([gathered] + [self._row(uid) for uid in dirty.tolist()])
+        return gathered
+
+    def suggestions(self, user_id, limit=10, exclude=()):
+        """Top ``limit`` (user_id, mutual_count) pairs two hops away.
+
+        A candidate's count is how many of the people user_id follows follow
+        them. Ties go to the lower user id. ``exclude`` removes extra ids
+        (e.g. pending requests).
+        """
+        friends = self.following(user_id)
+        if not len(friends):
+            return []
+        candidates, counts = np.unique(self._gather(friends), return_counts=True)
+        keep = ~np.isin(candidates, np.concatenate([friends, [user_id], np.asarray(exclude, dtype=np.int64)]))
+        candidates, counts = candidates[keep], counts[keep]
+        if not len(candidates):
+            return []
+
+        # One integer key orders by count desc, then id asc, so a partial
+        # sort picks exactly the same top-k as a full sort would
+        span = int(candidates.max()) + 1
+        keys = counts * span + (span - 1 - candidates)
+        if len(keys) > limit:
+            top = np.argpartition(-keys, limit - 1)[:limit]
+        else:
+            top = np.arange(len(keys))
+        top = top[np.argsort(-keys[top])]
+        return list(zip(candidates[top].tolist(), counts[top].tolist()))
+
+    def add_edge(self, follower_id, following_id):
+        if following_id in self._removed.get(follower_id, ()):
+            self._removed[follower_id].discard(following_id)
+        elif not np.isin(following_id, self._csr_row(follower_id)):
+            self._added.setdefault(follower_id, set()).add(following_id)
+        self._overlay_size += 1
+        self._maybe_compact()
+
+    def remove_edge(self, follower_id, following_id):
+        if following_id in self._added.get(follower_id, ()):
+            self._added[follower_id].discard(following_id)
+        elif np.isin(following_id, self._csr_row(follower_id)):
+            self._removed.setdefault(follower_id, set()).add(following_id)
+        self._overlay_size += 1
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._overlay_size < max(COMPACT_MIN_EDGES, COMPACT_FRACTION * len(self.targets)):
+            return
+        sources = np.repeat(self.row_ids, np.diff(self.indptr))
+        targets = self.targets
+        removed = [(s, t) for s, ts in self._removed.items() for t in ts]
+        added = [(s, t) for s, ts in self._added.items() for t in ts]
+        if removed:
+            # Pack (source, target) pairs into one int64 key for a vectorized isin
+            removed = np.array(removed, dtype=np.int64)
+            keep = ~np.isin(sources << 32 | targets, removed[:, 0] << 32 | removed[:, 1])
+            sources, targets = sources[keep], targets[keep]
+        if added:
+            added = np.array(added, dtype=np.int64)
+            sources = np.concatenate([sources, added[:, 0]])
+            targets = np.concatenate([targets, added[:, 1]])
+        self._build(sources, targets)
+
+class _GraphHolder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.graph = None
+        self.version = None
+        self.rebuild_thread = None
+
+    @property
+    def loaded(self):
+        return self.graph is not None
+
+    def install(self, loaded):
+        self.version, self.graph = loaded
+
+def _holder():
+    return current_app.extensions.setdefault('follow_graph', _GraphHolder())
+
+def _load_graph():
+    # Read the version before the edges: an edge committed during a reload
+    # only makes the graph newer than its version, costing one extra reload
+    return ChangeCounter.current(FOLLOW_GRAPH_VERSION)[0], FollowGraph.from_database()
+
+def _refresh(holder, version):
+    """Start reloading the graph if another process changed it (see
+    utils/index_rebuild.py) and return the graph to answer with; the caller
+    holds holder.lock"""
+    if holder.graph is None or holder.version != version:
+        rebuild(holder, _load_graph, holder.install, 'follow-graph')
+    return holder.graph
+
+def suggest_connections(user_id, limit=10, exclude=()):
+    """Ranked 2-hop suggestions for user_id from this process's follow graph.
+    If another process changed the graph it is reloaded in the background,
+    the loaded copy answering meanwhile."""
+    holder = _holder()
+    version = ChangeCounter.current(FOLLOW_GRAPH_VERSION)[0]
+    with holder.lock:
+        return _refresh(holder, version).suggestions(user_id, limit, exclude)
+
+def record_follow_change(follower_id, following_id, accepted):
+    """Apply a committed follow (accepted=True) or unfollow to the loaded graph.
+
+    If other changes landed since the graph was loaded, it is left for the
+    next suggestions request to reload instead.
+    """
+    holder = _holder()
+    version = ChangeCounter.current(FOLLOW_GRAPH_VERSION)[0]
+    with holder.lock:
+        if holder.graph is None or holder.version != version - 1:
+            return
+        if accepted:
+            holder.graph.add_edge(follower_id, following_id)
+        else:
+            holder.graph.remove_edge(follower_id, following_id)
+        holder.version = version
@@ -0,0 +1,214 @@
+"""Geocoding at write time and nearby searches over jobs and people.
+
+Jobs and users keep their location as free text. Whenever a location is
+written it is resolved against the offline gazetteer (models/geo.py) in the
+same flush, and the coordinates are stored with a geohash (utils/geohash.py).
+A nearby search then reads only the geohash ranges of the cells covering a
+circle around the center, grown until it holds a page (see nearest),
+computes exact distances for those points with NumPy and pages through them
+nearest first with a (distance, id) cursor.
+"""
+import math
+import numpy as np
+from sqlalchemy import and_, event, inspect, or_, select
+from models.user import db, User
+from models.job import Job
+from models.geo import GazetteerName, GazetteerPlace, normalize_place_name
+from utils.geohash import (
+    EARTH_RADIUS_KM, PREFIX_END, bbox_around, covering_prefixes, encode, haversine_km, in_bbox
+)
+from utils.pagination import decode_cursor, encode_cursor
+
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+
+# Nearby searches start with a circle this share of the area's radius
+FIRST_RING_FRACTION = 1 / 16
+
+# Country names accepted after a comma ("Paris, France"), as country codes
+COUNTRY_NAMES = {
+    'usa': 'us', 'united states': 'us', 'united states of america': 'us', 'america': 'us',
+    'uk': 'gb', 'united kingdom': 'gb', 'great britain': 'gb', 'england': 'gb', 'scotland': 'gb',
+    'germany': 'de', 'deutschland': 'de', 'france': 'fr', 'canada': 'ca', 'india': 'in',
+    'spain': 'es', 'italy': 'it', 'netherlands': 'nl', 'brazil': 'br', 'brasil': 'br',
+    'australia': 'au', 'japan': 'jp', 'ireland': 'ie', 'mexico': 'mx',
+}
+
+def geocode(connection, text):
+    """(latitude, longitude) of the place a location string names, or None.
+
+    The text before the first comma is looked up by name; anything after it
+    ("TX", "USA", "Ontario") is a hint matched against the country and
+    first-level region codes. Among equally good matches the most populous
+    place wins, so a bare "Paris" is the French one.
+    """
+    parts = [normalize_place_name(part) for part in (text or '').split(',')]
+    if not parts[0]:
+        return None
+    hints = {COUNTRY_NAMES.get(hint, hint) for hint in parts[1:] if hint}
+    candidates = connection.execute(
+        select(GazetteerPlace.latitude, GazetteerPlace.longitude, GazetteerPlace.country_code,
+               GazetteerPlace.admin1_code, GazetteerPlace.population)
+        .join(GazetteerName, GazetteerName.place_id == GazetteerPlace.id)
+        .where(GazetteerName.name == parts[0])
+    ).all()
+    if not candidates:
+        return None
+    best = max(candidates, key=lambda place: (
+        len(hints & {place.country_code.lower(), place.admin1_code.lower()}), place.population))
+    return best.latitude, best.longitude
+
+def set_coordinates(connection, target):
+    """Geocode ``target.location`` into its latitude, longitude and geohash"""
+    point = geocode(connection, target.location)
+    target.latitude, target.longitude = point or (None, None)
+    target.geohash = encode(*point) if point else None
+
+def _geocode_new(mapper, connection, target):
+    set_coordinates(connection, target)
+
+def _geocode_changed(mapper, connection, target):
+    if inspect(target).attrs.location.history.has_changes():
+        set_coordinates(connection, target)
+
+for _model in (Job, User):
+    event.listen(_model, 'before_insert', _geocode_new)
+    event.listen(_model, 'before_update', _geocode_changed)
+
+def _coordinate(value, name, limit):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a number')
+    if not -limit <= number <= limit:
+        raise ValueError(f'{name} must be between -{limit} and {limit}')
+    return number
+
+def search_area(args, home=None):
+    """Center, bounding box and radius of a nearby search from query parameters.
+
+    ``bbox=min_lon,min_lat,max_lon,max_lat`` searches a box (min_lon >
+    max_lon crosses the antimeridian); otherwise the search is a circle of
+    ``radius_km`` around ``lat``/``lon``, the place named by ``near`` or
+    ``home``. Results are sorted by distance from the center, which for a box
+    defaults to its middle. Returns ``(center, bbox, radius_km)`` with bbox
+    as (min_lat, min_lon, max_lat, max_lon) and radius_km None for a box.
+    Raises ValueError with a message for the client.
+    """
+    center = None
+    if 'lat' in args or 'lon' in args:
+        center = _coordinate(args.get('lat'), 'lat', 90), _coordinate(args.get('lon'), 'lon', 180)
+    elif args.get('near', '').strip():
+        center = geocode(db.session.connection(), args['near'])
+        if center is None:
+            raise ValueError('Unknown place')
+
+    if args.get('bbox'):
+        values = args['bbox'].split(',')
+        if len(values) != 4:
+            raise ValueError('bbox must be min_lon,min_lat,max_lon,max_lat')
+        min_lon, max_lon = (_coordinate(value, 'bbox longitude', 180) for value in values[0::2])
+        min_lat, max_lat = (_coordinate(value, 'bbox latitude', 90) for value in values[1::2])
+        if min_lat > max_lat:
+            raise ValueError('bbox min_lat must not exceed max_lat')
+        if center is None:
+            width = (max_lon - min_lon) % 360
+            center = (min_lat + max_lat) / 2, (min_lon + width / 2 + 180) % 360 - 180
+        return center, (min_lat, min_lon, max_lat, max_lon), None
+
+    center = center or home
+    if center is None:
+        raise ValueError('Give lat and lon, near, or bbox, or set a known location on your profile')
+    try:
+        radius_km = float(args.get('radius_km', DEFAULT_RADIUS_KM))
+    except ValueError:
+        raise ValueError('radius_km must be a number')
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValueError(f'radius_km must be between 0 and {MAX_RADIUS_KM}')
+    return center, bbox_around(*center, radius_km), radius_km
+
+def cell_ranges(model, bbox, conditions=()):
+    """Condition selecting the rows of ``model`` in the cells covering bbox.
+
+    ``conditions`` are repeated inside every cell's range rather than ANDed
+    outside the OR, so SQLite reads one index range per cell (e.g. jobs by
+    (status, geohash)) instead of preferring an index on the conditions alone.
+    """
+    return or_(*[and_(*conditions, model.geohash >= prefix, model.geohash < prefix + PREFIX_END)
+                 for prefix in covering_prefixes(bbox)])
+
+def _area_radius_km(center, bbox, radius_km):
+    """Distance from the center to the farthest point of the search area"""
+    if radius_km is not None:
+        return radius_km
+    min_lat, min_lon, max_lat, max_lon = bbox
+    if (max_lon - min_lon) % 360 >= 180:
+        return math.pi * EARTH_RADIUS_KM
+    # Within half a turn of longitude the farthest point of a box is a corner
+    return float(haversine_km(*center, np.array([min_lat, min_lat, max_lat, max_lat]),
+                              np.array([min_lon, max_lon, min_lon, max_lon])).max())
+
+def nearest(model, conditions, center, bbox, radius_km, cursor, per_page):
+    """One page of ``model`` rows in the search area, nearest first.
+
+    Returns ``([(id, distance_km), ...], next_cursor)``. Ties on distance
+    (e.g. everyone geocoded to the same city) are broken by id, so pages
+    never skip or repeat rows. Raises ValueError for a malformed cursor.
+
+    Rather than read every row of the area, the search starts with a small
+    circle (FIRST_RING_FRACTION of the area's radius, or twice the cursor's
+    distance) and doubles it until a page and one more row lie within it:
+    rows outside a circle are farther than any inside, so those are the
+    page. A dense city answers from its first ring; only a sparse area ends
+    up reading all of it.
+    """
+    after = decode_cursor(cursor, float, int) if cursor else None
+    area_radius = _area_radius_km(center, bbox, radius_km)
+    ring = max(area_radius * FIRST_RING_FRACTION, 2 * after[0] if after else 0)
+    while True:
+        final = ring >= area_radius
+        rows = db.session.query(model.id, model.latitude, model.longitude).filter(
+            cell_ranges(model, bbox if final else bbox_around(*center, ring), conditions)).all()
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        latitudes = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        longitudes = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+
+        # Cells overhang the area; keep only the points actually inside it
+        distances = haversine_km(*center, latitudes, longitudes)
+        keep = in_bbox(latitudes, longitudes, bbox)
+        bound = radius_km if final else ring
+        if bound is not None:
+            keep &= distances <= bound
+        if after:
+            keep &= (distances > after[0]) | ((distances == after[0]) & (ids > after[1]))
+        if final or np.count_nonzero(keep) > per_page:
+            break
+        ring *= 2
+    ids, distances = ids[keep], distances[keep]
+
+    order = np.lexsort((ids, distances))[:per_page + 1]
+    page = [(int(ids[i]), float(distances[i])) for i in order]
+    next_cursor = None
+    if len(page) > per_page:
+        last_id, last_distance = page[per_page - 1]
+        next_cursor = encode_cursor(last_distance, last_id)
+    return page[:per_page], next_cursor
+
+def geocode_existing():
+    """Geocode every stored job and user location again, e.g. after loading
+    a new gazetteer; each distinct location is looked up once. Returns the
+    number of rows that now have coordinates."""
+    connection = db.session.connection()
+    located = 0
+    for model in (Job, User):
+        for location, in db.session.query(model.location).distinct():
+            if not location:
+                continue
+            point = geocode(connection, location)
+            latitude, longitude = point or (None, None)
+            updated = db.session.query(model).filter(model.location == location).update({
+                'latitude': latitude, 'longitude': longitude, 'geohash': encode(*point) if point else None
+            }, synchronize_session=False)
+            located += updated if point else 0
+    db.session.commit()
+    return located
@@ -0,0 +1,103 @@
+"""Geohash encoding, cell coverings and great-circle distances.
+
+A geohash interleaves longitude and latitude bits into a base-32 string, so
+points in the same grid cell share a prefix and one cell's points are one
+range of an ordinary string index. A query region is covered by a handful of
+cells at the finest precision that keeps the count under MAX_COVERING_CELLS,
+each cell becomes a ``geohash >= prefix AND geohash < prefix + '{'`` range,
+and exact distances are only computed for the points those ranges return.
+"""
+import math
+import numpy as np
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+STORED_PRECISION = 9  # ~5 m cells
+MAX_COVERING_CELLS = 24
+EARTH_RADIUS_KM = 6371.0088
+
+# Sorts after every base-32 character, so [prefix, prefix + END) is one cell
+PREFIX_END = '{'
+
+def encode(latitude, longitude, precision=STORED_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+def cell_size(precision):
+    """(height, width) in degrees of a cell at this precision"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+def _cells(min_lat, min_lon, max_lat, max_lon, precision):
+    """Row and column numbers of the cells a box overlaps, plus the cell size"""
+    height, width = cell_size(precision)
+    last_row, last_column = round(180 / height) - 1, round(360 / width) - 1
+    rows = range(math.floor((min_lat + 90) / height), min(math.floor((max_lat + 90) / height), last_row) + 1)
+    columns = range(math.floor((min_lon + 180) / width), min(math.floor((max_lon + 180) / width), last_column) + 1)
+    return rows, columns, height, width
+
+def covering_prefixes(bbox):
+    """Sorted geohash prefixes of the cells covering ``bbox`` =
+    (min_lat, min_lon, max_lat, max_lon); a box crossing the antimeridian
+    has min_lon > max_lon"""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    boxes = [(min_lat, min_lon, max_lat, max_lon)]
+    if min_lon > max_lon:
+        boxes = [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    precision = 1
+    for candidate in range(2, STORED_PRECISION + 1):
+        count = sum(len(rows) * len(columns) for rows, columns, _, _ in
+                    (_cells(*box, candidate) for box in boxes))
+        if count > MAX_COVERING_CELLS:
+            break
+        precision = candidate
+    prefixes = set()
+    for box in boxes:
+        rows, columns, height, width = _cells(*box, precision)
+        for row in rows:
+            for column in columns:
+                prefixes.add(encode(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width, precision))
+    return sorted(prefixes)
+
+def bbox_around(latitude, longitude, radius_km):
+    """Smallest (min_lat, min_lon, max_lat, max_lon) containing the circle"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - dlat, latitude + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0
+    dlon = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) /
+                                      math.cos(math.radians(latitude)))))
+    if dlon >= 180:
+        return min_lat, -180.0, max_lat, 180.0
+    west, east = (longitude - dlon + 180) % 360 - 180, (longitude + dlon + 180) % 360 - 180
+    return min_lat, west, max_lat, east
+
+def in_bbox(latitudes, longitudes, bbox):
+    """Boolean mask of the points inside bbox (arrays in, array out)"""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    inside_lat = (latitudes >= min_lat) & (latitudes <= max_lat)
+    if min_lon <= max_lon:
+        return inside_lat & (longitudes >= min_lon) & (longitudes <= max_lon)
+    return inside_lat & ((longitudes >= min_lon) | (longitudes <= max_lon))
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distances from one point to arrays of points"""
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
@@ -0,0 +1,43 @@
+"""Swap-in rebuilds for the per-process in-memory indexes (job facets in
+utils/job_search.py, skill vectors in utils/skill_match.py, the follow graph
+in utils/follow_graph.py).
+
+A rebuild reads whole tables and takes seconds on a large board, and the
+holder's lock is held by whoever rebuilds, so doing it in the request that
+notices the copy is stale makes every request that needs the index wait
+too. Instead that request starts a background thread and carries on with
+the loaded copy, as do all requests until the thread swaps the new one in
+under the lock. Only the first load, with nothing to serve yet, happens in
+the request.
+
+With INDEX_REBUILD_IN_BACKGROUND off (in tests: the in-memory database has
+one shared connection) rebuilds run in the request, as before.
+"""
+import threading
+from flask import current_app
+
+def rebuild(holder, build, install, name):
+    """Run ``build()`` and then ``install(result)`` under ``holder.lock``;
+    the caller holds the lock. In the background if the holder already has
+    something to serve, in which case this returns at once and does nothing
+    if a rebuild for this holder is already under way. A failed background
+    build is logged and leaves the loaded copy in place."""
+    app = current_app._get_current_object()
+    if not holder.loaded or not app.config.get('INDEX_REBUILD_IN_BACKGROUND', True):
+        install(build())
+        return
+    if holder.rebuild_thread is not None and holder.rebuild_thread.is_alive():
+        return
+
+    def run():
+        with app.app_context():
+            try:
+                result = build()
+            except Exception as e:
+                app.logger.error(f"Error rebuilding {name}: {str(e)}")
+                return
+            with holder.lock:
+                install(result)
+
+    holder.rebuild_thread = threading.Thread(target=run, name=f'{name}-rebuild', daemon=True)
+    holder.rebuild_thread.start()
@@ -0,0 +1,180 @@
+"""Facet counts for job search from an in-memory column index.
+
+Facets are disjunctive: the counts shown for one facet apply every filter
+except that facet's own, so selecting "full-time" still shows how many
+part-time jobs there are. With four facets that would be four GROUP BY
+queries over the matching jobs per request; instead each process keeps the
+facet columns of every job as NumPy arrays (job ids sorted, each facet
+dictionary-encoded to small ints) and computes all counts in one vectorized
+pass: a boolean mask per filter, then np.bincount per facet.
+
+The index is rebuilt when the ``jobs`` change counter moves, at most once
+every JOB_FACETS_MAX_STALENESS_SECONDS, so a burst of job writes costs one
+reload and facet counts lag writes by that plus the rebuild, which runs in
+the background while the old copy keeps answering.
+
+For a text search the counts cover only the JOB_FACETS_MAX_MATCHES
+best-scoring matches, so a broad search ("engineer") doesn't pull every
+matching id out of the full-text index; responses say when that cut in
+(``facets_approximate``).
+"""
+import threading
+import time
+import numpy as np
+from flask import current_app
+from sqlalchemy import desc
+from models.user import db
+from models.job import Job, Company, JOB_FACETS, JOBS_VERSION
+from models.counters import ChangeCounter
+from utils.index_rebuild import rebuild
+
+DEFAULT_FACET_LIMIT = 20
+DEFAULT_MAX_STALENESS_SECONDS = 30
+DEFAULT_MAX_MATCHES = 5000
+
+def facet_filters(args):
+    """Selected values per facet from repeated query parameters
+    (``?job_type=contract&job_type=internship``). Raises ValueError for a
+    non-numeric company_id."""
+    filters = {}
+    for facet in JOB_FACETS:
+        values = [value.strip() for value in args.getlist(facet) if value.strip()]
+        if values:
+            filters[facet] = {int(value) for value in values} if facet == 'company_id' else set(values)
+    return filters
+
+def filter_conditions(filters):
+    """SQL conditions applying facet filters to a query over jobs"""
+    return [getattr(Job, facet).in_(values) for facet, values in filters.items()]
+
+def facet_match_ids(search_results):
+    """Ids of the best-scoring rows of a job search subquery (see
+    utils/search_index.py), at most JOB_FACETS_MAX_MATCHES of them, and
+    whether more jobs than that matched"""
+    max_matches = current_app.config.get('JOB_FACETS_MAX_MATCHES', DEFAULT_MAX_MATCHES)
+    job_ids = [job_id for job_id, in db.session.query(search_results.c.job_id).order_by(
+        desc(search_results.c.score), desc(search_results.c.job_id)
+    ).limit(max_matches + 1)]
+    return job_ids[:max_matches], len(job_ids) > max_matches
+
+class FacetIndex:
+    """Facet values of every job, as columns aligned with sorted job ids"""
+
+    def __init__(self, ids, columns):
+        order = np.argsort(ids, kind='stable')
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.labels, self.codes = {}, {}
+        for facet in JOB_FACETS:
+            # Encode in first-seen order with a dict (np.unique on an object
+            # array is several times slower), then renumber in label order
+            seen = {}
+            codes = np.fromiter((seen.setdefault(value, len(seen)) for value in columns[facet]),
+                                dtype=np.int32, count=len(ids))
+            labels = sorted(seen)
+            renumber = np.empty(len(labels), dtype=np.int32)
+            renumber[[seen[label] for label in labels]] = np.arange(len(labels), dtype=np.int32)
+            self.labels[facet] = labels
+            self.codes[facet] = renumber[codes][order]
+
+    @classmethod
+    def from_database(cls):
+        rows = db.session.query(Job.id, *[getattr(Job, facet) for facet in JOB_FACETS]).all()
+        columns = list(zip(*rows)) if rows else [()] * (len(JOB_FACETS) + 1)
+        return cls(columns[0], dict(zip(JOB_FACETS, columns[1:])))
+
+    def _code_of(self, facet):
+        return {label: code for code, label in enumerate(self.labels[facet])}
+
+    def counts(self, filters, job_ids=None, limit=DEFAULT_FACET_LIMIT):
+        """(value, count) pairs per facet over all jobs, or only ``job_ids``
+        (e.g. text search matches): the top ``limit`` values, most frequent
+        first, followed by any selected values not among them"""
+        base = np.ones(len(self.ids), dtype=bool)
+        if job_ids is not None:
+            job_ids = np.asarray(job_ids, dtype=np.int64)
+            positions = np.searchsorted(self.ids, job_ids)
+            found = positions < len(self.ids)
+            found[found] = self.ids[positions[found]] == job_ids[found]
+            base[:] = False
+            base[positions[found]] = True
+        masks = {}
+        for facet, values in filters.items():
+            code_of = self._code_of(facet)
+            masks[facet] = np.isin(self.codes[facet], [code_of[value] for value in values if value in code_of])
+
+        counts = {}
+        for facet in JOB_FACETS:
+            mask = base.copy()
+            for other, other_mask in masks.items():
+                if other != facet:
+                    mask &= other_mask
+            totals = np.bincount(self.codes[facet][mask], minlength=len(self.labels[facet]))
+            # Highest count first, ties in label order
+            top = [code for code in np.lexsort((np.arange(len(totals)), -totals))[:limit].tolist() if totals[code]]
+            pairs = [(self.labels[facet][code], int(totals[code])) for code in top]
+            shown = {label for label, _ in pairs}
+            code_of = self._code_of(facet) if facet in filters else {}
+            for value in sorted(filters.get(facet, ()), key=str):
+                if value not in shown:
+                    pairs.append((value, int(totals[code_of[value]]) if value in code_of else 0))
+            counts[facet] = pairs
+        return counts
+
+class _IndexHolder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.version = None
+        self.loaded_at = 0.0
+        self.rebuild_thread = None
+
+    @property
+    def loaded(self):
+        return self.index is not None
+
+    def install(self, loaded):
+        self.version, self.index = loaded
+        self.loaded_at = time.monotonic()
+
+def _holder():
+    return current_app.extensions.setdefault('job_facets', _IndexHolder())
+
+def _load_index():
+    # Version first, so a write landing during the load costs one extra reload
+    return ChangeCounter.current(JOBS_VERSION)[0], FacetIndex.from_database()
+
+def facet_index():
+    """This process's FacetIndex. Once jobs changed and the loaded copy is
+    older than JOB_FACETS_MAX_STALENESS_SECONDS it is rebuilt in the
+    background (see utils/index_rebuild.py), the old copy serving meanwhile."""
+    holder = _holder()
+    max_staleness = current_app.config.get('JOB_FACETS_MAX_STALENESS_SECONDS', DEFAULT_MAX_STALENESS_SECONDS)
+    version = ChangeCounter.current(JOBS_VERSION)[0]
+    with holder.lock:
+        stale = holder.version != version and time.monotonic() - holder.loaded_at >= max_staleness
+        if holder.index is None or stale:
+            rebuild(holder, _load_index, holder.install, 'job-facets')
+        return holder.index
+
+def facet_index_version():
+    """The ``jobs`` version this process's FacetIndex was loaded at (None
+    before the first load), for ETags of responses carrying facets: while a
+    rebuild is under way the facets lag the job list, and such a response
+    mustn't stay cached once the index catches up"""
+    return _holder().version
+
+def facet_counts(filters, job_ids=None, limit=DEFAULT_FACET_LIMIT):
+    """Facets for a search response as ``{facet: [{'value', 'count'}]}``;
+    company entries also carry the company name"""
+    facets = {
+        facet: [{'value': value, 'count': count} for value, count in pairs]
+        for facet, pairs in facet_index().counts(filters, job_ids, limit).items()
+    }
+    companies = facets['company_id']
+    if companies:
+        names = dict(db.session.query(Company.id, Company.name).filter(
+            Company.id.in_([entry['value'] for entry in companies])
+        ))
+        for entry in companies:
+            entry['name'] = names.get(entry['value'])
+    return facets
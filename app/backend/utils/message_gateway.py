@@ -0,0 +1,319 @@
+"""Push delivery of direct messages over WebSocket and Server-Sent Events.
+
+Holding a connection open per browser tab in the WSGI workers would tie up a
+thread each, so messages are pushed by a separate asyncio server running on
+its own thread (and port, MESSAGE_GATEWAY_PORT) inside every web process.
+An idle connection there is a socket plus one suspended coroutine, and one
+shared task sends the keep-alives, so thousands cost a few kilobytes each.
+
+The send path publishes each committed message on the in-process
+``messages`` channel (utils/pubsub.py). The gateway listens to that channel
+with a callback that hands the message to the event loop, which encodes it
+once and writes it to every open stream of the recipient (and of the
+sender, so their other tabs stay in sync). Writes only fill the socket
+buffer; a client that falls MAX_WRITE_BUFFER_BYTES behind is disconnected
+rather than slowing down everyone else.
+
+Clients connect to GATEWAY_PATH with the JWT in ``Authorization`` or, since
+EventSource cannot set headers, in ``?token=``. Either protocol first gets a
+``ready`` event; a client should wait for it and then load what it missed
+through the REST endpoints, because messages sent while it was disconnected
+(or sent through another worker process, which has its own gateway) are
+not replayed. Run a single worker process with threads when messages must
+reach every connected tab immediately.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+from collections import defaultdict
+from urllib.parse import parse_qs, urlsplit
+from flask import current_app
+from utils.jwt_utils import verify_token
+from utils.pubsub import pubsub
+
+MESSAGES_CHANNEL = 'messages'
+GATEWAY_PATH = '/api/messaging/stream'
+DEFAULT_HEARTBEAT_SECONDS = 25
+HANDSHAKE_TIMEOUT_SECONDS = 10
+MAX_REQUEST_HEAD_BYTES = 8192
+MAX_CLIENT_FRAME_BYTES = 4096  # Clients only send control frames
+MAX_WRITE_BUFFER_BYTES = 256 * 1024
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+def publish_message(message):
+    """Announce a committed message (as ``Message.to_dict()``) to this
+    process's gateway"""
+    pubsub().publish(MESSAGES_CHANNEL, message)
+
+def websocket_frame(payload, opcode=0x1):
+    """One unmasked, final WebSocket frame (server to client)"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+def sse_event(event, data, event_id=None):
+    lines = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{lines}event: {event}\ndata: {json.dumps(data)}\n\n'.encode()
+
+def _http_response(status, body):
+    payload = json.dumps(body).encode()
+    return (f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n'
+            f'Connection: close\r\n\r\n').encode() + payload
+
+class _Client:
+    """One open stream of one user; only ever touched on the gateway's loop"""
+    __slots__ = ('user_id', 'writer', 'websocket')
+
+    def __init__(self, user_id, writer, websocket):
+        self.user_id = user_id
+        self.writer = writer
+        self.websocket = websocket
+
+    def write(self, data):
+        if self.writer.is_closing():
+            return False
+        self.writer.write(data)
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER_BYTES:
+            self.writer.close()
+            return False
+        return True
+
+class MessageGateway:
+    """asyncio WebSocket/SSE server pushing published messages to their
+    participants' open connections"""
+
+    def __init__(self, app, heartbeat_seconds=DEFAULT_HEARTBEAT_SECONDS, allowed_origins=()):
+        self.app = app
+        self.heartbeat_seconds = heartbeat_seconds
+        self.allowed_origins = set(allowed_origins)
+        self.port = None
+        self.delivered = 0
+        self.dropped = 0
+        self._clients = defaultdict(set)
+        self._loop = None
+        self._thread = None
+        self._listener = None
+        self._started_pid = None
+        self._attempted_pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self, host, port):
+        """Start serving once per process (a thread started before a fork,
+        e.g. with gunicorn --preload, does not exist in the child)"""
+        if self._attempted_pid == os.getpid():
+            return
+        with self._lock:
+            if self._attempted_pid == os.getpid():
+                return
+            self._attempted_pid = os.getpid()
+            try:
+                self.start(host, port)
+            except OSError as e:
+                # Requests keep working; clients fall back to polling
+                self.app.logger.error(f'Message gateway could not listen on {host}:{port}: {e}')
+
+    def start(self, host, port):
+        """Serve on host:port from a daemon thread with its own event loop and
+        return the bound port (port 0 picks a free one)"""
+        ready, failure = threading.Event(), []
+        self._thread = threading.Thread(target=self._run, args=(host, port, ready, failure),
+                                        name='message-gateway', daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+        self._started_pid = os.getpid()
+        self._listener = self.app.extensions['pubsub'].listen(MESSAGES_CHANNEL, self._on_publish)
+        return self.port
+
+    def stop(self):
+        if self._listener:
+            self._listener.close()
+        if self._loop and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+        self._started_pid = None
+
+    def _run(self, host, port, ready, failure):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            server = loop.run_until_complete(asyncio.start_server(
+                self._handle, host, port, limit=MAX_REQUEST_HEAD_BYTES, backlog=1024))
+        except OSError as e:
+            failure.append(e)
+            ready.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        heartbeat = loop.create_task(self._heartbeat())
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            heartbeat.cancel()
+            # Closing the sockets lets the connection handlers return on their
+            # own (a cancelled handler is logged as an error by asyncio)
+            for clients in list(self._clients.values()):
+                for client in clients:
+                    client.writer.close()
+            tasks = asyncio.all_tasks(loop)
+            if tasks:
+                loop.run_until_complete(asyncio.wait(tasks, timeout=1))
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    def _on_publish(self, message):
+        # Runs on the publishing request's thread; the loop does the rest
+        self._loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _dispatch(self, message):
+        recipients = [client for user_id in {message['sender_id'], message['recipient_id']}
+                      for client in self._clients.get(user_id, ())]
+        if not recipients:
+            return
+        # Encoded once per message, not once per connection
+        sse = sse_event('message', message, message['id'])
+        frame = websocket_frame(json.dumps({'event': 'message', 'data': message}).encode())
+        for client in recipients:
+            if client.write(frame if client.websocket else sse):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+
+    async def _heartbeat(self):
+        ping, comment = websocket_frame(b'', opcode=0x9), b': keep-alive\n\n'
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for clients in list(self._clients.values()):
+                for client in list(clients):
+                    client.write(ping if client.websocket else comment)
+
+    def _authenticate(self, token):
+        if not token:
+            return None
+        with self.app.app_context():
+            return verify_token(token)
+
+    async def _handle(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HANDSHAKE_TIMEOUT_SECONDS)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+        request_line, *header_lines = head.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            method, target, _ = request_line.split(' ', 2)
+        except ValueError:
+            method, target = '', ''
+        url = urlsplit(target)
+        if method != 'GET' or url.path != GATEWAY_PATH:
+            writer.write(_http_response('404 Not Found', {'error': 'Not found'}))
+            writer.close()
+            return
+
+        authorization = headers.get('authorization', '')
+        token = authorization[7:] if authorization.startswith('Bearer ') else parse_qs(url.query).get('token', [''])[0]
+        user_id = self._authenticate(token)
+        if not user_id:
+            writer.write(_http_response('401 Unauthorized', {'error': 'Invalid token'}))
+            writer.close()
+            return
+
+        websocket = headers.get('upgrade', '').lower() == 'websocket'
+        # Registered before "ready" goes out, so nothing sent after it is missed
+        client = _Client(user_id, writer, websocket)
+        self._clients[user_id].add(client)
+        if websocket:
+            key = headers.get('sec-websocket-key', '')
+            accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+            writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                          f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode())
+            writer.write(websocket_frame(json.dumps({'event': 'ready', 'data': {'user_id': user_id}}).encode()))
+        else:
+            origin = headers.get('origin')
+            cors = f'Access-Control-Allow-Origin: {origin}\r\n' if origin in self.allowed_origins else ''
+            writer.write(('HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                          f'X-Accel-Buffering: no\r\n{cors}\r\n').encode())
+            writer.write(sse_event('ready', {'user_id': user_id}))
+
+        try:
+            if websocket:
+                await self._read_websocket(reader, client)
+            else:
+                # EventSource never sends anything; this returns when it goes away
+                while await reader.read(1024):
+                    pass
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            clients = self._clients.get(user_id)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self._clients[user_id]
+            writer.close()
+
+    async def _read_websocket(self, reader, client):
+        """Answer pings and close frames until the client goes away"""
+        while True:
+            first, second = await reader.readexactly(2)
+            opcode, length = first & 0x0F, second & 0x7F
+            if length == 126:
+                length, = struct.unpack('!H', await reader.readexactly(2))
+            elif length == 127:
+                length, = struct.unpack('!Q', await reader.readexactly(8))
+            if length > MAX_CLIENT_FRAME_BYTES or not second & 0x80:
+                # Oversized, or unmasked (which clients must never send)
+                client.write(websocket_frame(struct.pack('!H', 1008), opcode=0x8))
+                return
+            mask = await reader.readexactly(4)
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(await reader.readexactly(length)))
+            if opcode == 0x8:
+                client.write(websocket_frame(payload[:2], opcode=0x8))
+                return
+            if opcode == 0x9:
+                client.write(websocket_frame(payload, opcode=0xA))
+
+    def stats(self):
+        """Read from another thread, so only approximate"""
+        return {
+            'running': self._started_pid == os.getpid(),
+            'port': self.port,
+            'users': len(self._clients),
+            'connections': sum(len(clients) for clients in list(self._clients.values())),
+            'delivered': self.delivered,
+            'dropped': self.dropped
+        }
+
+def init_message_gateway(app, allowed_origins=()):
+    """Create the gateway; it starts with the first request of each process
+    when MESSAGE_GATEWAY_PORT is set"""
+    gateway = app.extensions['message_gateway'] = MessageGateway(
+        app,
+        heartbeat_seconds=app.config.get('MESSAGE_GATEWAY_HEARTBEAT_SECONDS', DEFAULT_HEARTBEAT_SECONDS),
+        allowed_origins=allowed_origins
+    )
+    port = app.config.get('MESSAGE_GATEWAY_PORT')
+    if port is not None:
+        host = app.config.get('MESSAGE_GATEWAY_HOST', '0.0.0.0')
+        app.before_request(lambda: gateway.ensure_started(host, port))
+
+def message_gateway():
+    """The current app's MessageGateway"""
+    return current_app.extensions['message_gateway']
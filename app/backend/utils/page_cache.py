@@ -0,0 +1,87 @@
+"""In-process LRU + TTL cache of serialized first pages.
+
+Keys are the ETag values computed by utils.etag.conditional_get, which
+already hash the version counters behind a response together with the
+viewer, path and query string. A write that bumps a version therefore makes
+every page it affects unreachable without flushing anything else; the stale
+entries simply age out of the LRU. The TTL bounds how long data that is not
+covered by a version (e.g. like counts in feeds) can lag.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 30
+
+class PageCache:
+    """Thread-safe LRU cache whose entries also expire after ttl_seconds"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+def init_page_cache(app):
+    app.extensions['page_cache'] = PageCache(
+        max_entries=app.config.get('PAGE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+        ttl_seconds=app.config.get('PAGE_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+    )
+
+def page_cache():
+    """The current app's PageCache, or None if caching is disabled"""
+    return current_app.extensions.get('page_cache')
+
+def staleness_bucket():
+    """Number of the current PAGE_CACHE_TTL_SECONDS window. Versions that
+    leave engagement counts out include it, so ETags and cached pages never
+    show counts older than the TTL."""
+    return int(time.time() // current_app.config.get('PAGE_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+
+def is_first_page():
+    """Whether the request asks for the first page (no cursor yet, page 1)"""
+    return not request.args.get('cursor') and request.args.get('page', '1') == '1'
@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+def encode_cursor(*values):
+    """Encode sort key values into an opaque, URL-safe cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, *types):
+    """Decode a cursor created by encode_cursor.
+
+    ``types`` gives the expected type of each key value (e.g. ``datetime, int``).
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError('Cursor has the wrong shape')
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value_type, value in zip(types, values)
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+def keyset_condition(columns, values, descending=True):
+    """Row-value condition selecting rows strictly after ``values`` in the given order"""
+    key = tuple_(*columns)
+    bound = tuple_(*values)
+    return key < bound if descending else key > bound
+
+def keyset_page(query, cursor, per_page, sort_key, descending=True):
+    """Fetch one keyset page of an ordered query.
+
+    ``sort_key`` is a list of ``(column, type)`` pairs matching the query's
+    ORDER BY. Returns ``(rows, next_cursor)``, where ``next_cursor`` is None on
+    the last page. Raises ValueError for a malformed cursor.
+    """
+    columns = [column for column, _ in sort_key]
+    if cursor:
+        values = decode_cursor(cursor, *[value_type for _, value_type in sort_key])
+        query = query.filter(keyset_condition(columns, values, descending))
+    
+    # Fetch one extra row to find out whether another page exists; the sort
+    # key values ride along so the next cursor can be built from the last row
+    rows = query.add_columns(*columns).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(*rows[-1][-len(columns):]) if has_next else None
+    return rows, next_cursor
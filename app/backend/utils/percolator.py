@@ -0,0 +1,118 @@
+"""Percolation of newly posted jobs against saved job searches.
+
+Re-running every saved search for every new job costs searches x jobs.
+Instead each saved search is filed in saved_search_keys under one condition
+it requires, its *anchor*: its longest search term, or else the values of
+its most selective facet filter. A new job lists every key it could satisfy
+(its facet values and, since terms prefix-match, every prefix of its words
+up to MAX_TERM_KEY_LENGTH characters), indexed lookups of KEY_LOOKUP_BATCH
+keys at a time fetch the saved searches anchored under any of them, and
+only those candidates are checked in full.
+
+Matching follows /api/jobs: every search term must prefix-match a word of
+the job's title, description or location (case- and accent-insensitive,
+like the full-text index), and the job's value must be among the selected
+values of every filtered facet.
+"""
+import bisect
+import re
+import unicodedata
+from datetime import datetime
+from models.user import db
+from models.job import SavedJobSearch, SavedSearchKey, JOB_FACETS
+from models.notification import Notification
+
+# Longer terms are filed under their first MAX_TERM_KEY_LENGTH characters
+MAX_TERM_KEY_LENGTH = 10
+
+# Most selective first; a search with neither terms nor filters matches every job
+ANCHOR_FACETS = ('company_id', 'location', 'job_type', 'status')
+MATCH_ALL_KEY = '*'
+
+# Keys per candidate lookup, well under SQLite's bound-parameter limit
+KEY_LOOKUP_BATCH = 500
+
+def fold(text):
+    """Lower-case text with accents stripped, as the full-text index sees it"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+def search_terms(search):
+    return re.findall(r'\w+', fold(search))
+
+def term_key(term):
+    return f'term:{term[:MAX_TERM_KEY_LENGTH]}'
+
+def facet_key(facet, value):
+    return f'{facet}:{value}'
+
+def anchor_keys(search, filters):
+    """Keys to file a saved search under; any job it matches has one of them"""
+    terms = search_terms(search)
+    if terms:
+        return [term_key(max(terms, key=len))]
+    for facet in ANCHOR_FACETS:
+        if filters.get(facet):
+            return sorted(facet_key(facet, value) for value in filters[facet])
+    return [MATCH_ALL_KEY]
+
+def index_saved_search(saved_search):
+    """(Re)file a saved search under its anchor keys"""
+    saved_search.keys = [
+        SavedSearchKey(key=key) for key in anchor_keys(saved_search.search, saved_search.get_filters())
+    ]
+
+def job_words(job):
+    return sorted(set(search_terms(f'{job.title} {job.description} {job.location}')))
+
+def job_keys(job, words):
+    """Every key a saved search matching this job may be filed under"""
+    keys = {MATCH_ALL_KEY}
+    keys.update(facet_key(facet, getattr(job, facet)) for facet in JOB_FACETS)
+    keys.update(term_key(word[:length]) for word in words
+                for length in range(1, min(len(word), MAX_TERM_KEY_LENGTH) + 1))
+    return keys
+
+def _has_prefix(words, term):
+    i = bisect.bisect_left(words, term)
+    return i < len(words) and words[i].startswith(term)
+
+def search_matches(search, filters, job, words):
+    """Whether a saved search matches a job; ``words`` as from job_words(job)"""
+    return (all(getattr(job, facet) in values for facet, values in filters.items())
+            and all(_has_prefix(words, term) for term in search_terms(search)))
+
+def percolate(job):
+    """(saved_search_id, user_id) of every saved search matching the job"""
+    words = job_words(job)
+    keys = sorted(job_keys(job, words))
+    checked, matched = set(), {}
+    # A long description has thousands of keys; look them up a bounded batch
+    # at a time rather than as one IN list with a parameter per key
+    for start in range(0, len(keys), KEY_LOOKUP_BATCH):
+        candidates = db.session.query(
+            SavedJobSearch.id, SavedJobSearch.user_id, SavedJobSearch.search, SavedJobSearch.filters
+        ).join(SavedSearchKey).filter(SavedSearchKey.key.in_(keys[start:start + KEY_LOOKUP_BATCH]))
+        for search_id, user_id, search, filters in candidates:
+            if search_id in checked:
+                continue
+            checked.add(search_id)
+            if search_matches(search, SavedJobSearch.parse_filters(filters), job, words):
+                matched[search_id] = user_id
+    return sorted(matched.items())
+
+def notify_job_matches(job):
+    """Queue a 'job_match' notification, in one batch insert, for every user
+    with a saved search matching a just-flushed job (except its poster).
+    Returns how many were written; the caller commits."""
+    if job.status != 'open':
+        return 0
+    poster = job.company.user_id
+    user_ids = sorted({user_id for _, user_id in percolate(job) if user_id != poster})
+    if user_ids:
+        now = datetime.utcnow()
+        db.session.execute(Notification.__table__.insert(), [
+            {'user_id': user_id, 'type': 'job_match', 'reference_id': job.id, 'is_read': False, 'created_at': now}
+            for user_id in user_ids
+        ])
+    return len(user_ids)
@@ -0,0 +1,122 @@
+"""In-process publish/subscribe for change notifications.
+
+Writers publish small messages (ids, not data) after their transaction
+commits; waiting readers wake up, decide whether a message concerns them and
+re-read the database. Messages only reach subscribers in the same worker
+process, so anything built on this must stay correct without them (e.g. a
+long-poll that times out still re-reads the database) and only gets its
+latency from them.
+"""
+import threading
+from collections import defaultdict, deque
+from flask import current_app
+
+DEFAULT_QUEUE_SIZE = 256
+
+class Subscription:
+    """Messages published to one channel since subscribing, oldest first.
+
+    At most ``queue_size`` messages are kept; older ones are dropped and
+    ``overflowed`` is set, telling the reader it has to re-read everything.
+    """
+
+    def __init__(self, broker, channel, queue_size=DEFAULT_QUEUE_SIZE):
+        self.broker = broker
+        self.channel = channel
+        self.overflowed = False
+        self._messages = deque(maxlen=queue_size)
+        self._ready = threading.Condition()
+
+    def deliver(self, message):
+        with self._ready:
+            if len(self._messages) == self._messages.maxlen:
+                self.overflowed = True
+            self._messages.append(message)
+            self._ready.notify_all()
+
+    def get(self, timeout=None):
+        """Wait up to timeout seconds for messages and return all of them
+        (an empty list on timeout)"""
+        with self._ready:
+            self._ready.wait_for(lambda: self._messages, timeout)
+            messages = list(self._messages)
+            self._messages.clear()
+            return messages
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class Listener:
+    """Calls ``callback(message)`` for every message published to a channel,
+    on the publishing thread. Meant for handing messages to another event
+    loop (e.g. ``loop.call_soon_threadsafe``); the callback must not block.
+    """
+
+    def __init__(self, broker, channel, callback):
+        self.broker = broker
+        self.channel = channel
+        self.callback = callback
+
+    def deliver(self, message):
+        self.callback(message)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class PubSub:
+    """Thread-safe channel -> subscriptions registry"""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, channel, queue_size=DEFAULT_QUEUE_SIZE):
+        subscription = Subscription(self, channel, queue_size)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def listen(self, channel, callback):
+        listener = Listener(self, channel, callback)
+        with self._lock:
+            self._subscriptions[channel].add(listener)
+        return listener
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, message):
+        """Deliver message to every current subscriber of channel; returns how many"""
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+            self.published += 1
+        for subscription in subscribers:
+            subscription.deliver(message)
+        return len(subscribers)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'channels': len(self._subscriptions),
+                'subscriptions': sum(map(len, self._subscriptions.values())),
+                'published': self.published
+            }
+
+def init_pubsub(app):
+    app.extensions['pubsub'] = PubSub()
+
+def pubsub():
+    """The current app's PubSub"""
+    return current_app.extensions['pubsub']
@@ -0,0 +1,275 @@
+"""Full-text search indexes over post content and author names, and over
+job titles, descriptions and locations.
+
+SQLite uses FTS5 virtual tables, PostgreSQL tsvector tables with GIN
+indexes. Both are kept in sync by database triggers, so every write path
+(post create/delete, profile name changes, job edits) updates the index
+without any application code having to remember to do it.
+"""
+import re
+from sqlalchemy import table, column, select, func, literal_column, text
+from models.user import db
+
+SEARCH_TABLE = 'post_search'
+JOB_SEARCH_TABLE = 'job_search'
+
+SQLITE_TABLE_DDL = [
+    """CREATE VIRTUAL TABLE post_search USING fts5(
+        content, author, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+]
+
+SQLITE_TRIGGER_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS post_search_insert AFTER INSERT ON post BEGIN
+        INSERT INTO post_search (rowid, content, author)
+        SELECT NEW.id, NEW.content,
+               coalesce(u.username, '') || ' ' || coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '')
+        FROM "user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS post_search_update AFTER UPDATE OF content, user_id ON post BEGIN
+        DELETE FROM post_search WHERE rowid = OLD.id;
+        INSERT INTO post_search (rowid, content, author)
+        SELECT NEW.id, NEW.content,
+               coalesce(u.username, '') || ' ' || coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '')
+        FROM "user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS post_search_delete AFTER DELETE ON post BEGIN
+        DELETE FROM post_search WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS post_search_author AFTER UPDATE OF username, first_name, last_name ON "user" BEGIN
+        UPDATE post_search
+        SET author = coalesce(NEW.username, '') || ' ' || coalesce(NEW.first_name, '') || ' ' || coalesce(NEW.last_name, '')
+        WHERE rowid IN (SELECT id FROM post WHERE user_id = NEW.id);
+    END""",
+]
+
+SQLITE_BACKFILL = """
+    INSERT INTO post_search (rowid, content, author)
+    SELECT p.id, p.content,
+           coalesce(u.username, '') || ' ' || coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '')
+    FROM post p JOIN "user" u ON u.id = p.user_id
+"""
+
+# Content is weighted above author names so ts_rank favours body matches
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce({content}, '')), 'A') || "
+    "setweight(to_tsvector('simple', concat_ws(' ', {username}, {first_name}, {last_name})), 'B')"
+)
+
+POSTGRES_TABLE_DDL = [
+    """CREATE TABLE post_search (
+        post_id INTEGER PRIMARY KEY REFERENCES post (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )""",
+    "CREATE INDEX ix_post_search_document ON post_search USING GIN (document)",
+]
+
+POSTGRES_TRIGGER_DDL = [
+    """CREATE OR REPLACE FUNCTION post_search_refresh_post() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO post_search (post_id, document)
+        SELECT NEW.id, """ + POSTGRES_DOCUMENT.format(
+            content='NEW.content', username='u.username', first_name='u.first_name', last_name='u.last_name'
+        ) + """
+        FROM "user" u WHERE u.id = NEW.user_id
+        ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS post_search_post ON post",
+    """CREATE TRIGGER post_search_post AFTER INSERT OR UPDATE OF content, user_id ON post
+    FOR EACH ROW EXECUTE FUNCTION post_search_refresh_post()""",
+    """CREATE OR REPLACE FUNCTION post_search_refresh_author() RETURNS trigger AS $$
+    BEGIN
+        UPDATE post_search s SET document = """ + POSTGRES_DOCUMENT.format(
+            content='p.content', username='NEW.username', first_name='NEW.first_name', last_name='NEW.last_name'
+        ) + """
+        FROM post p WHERE p.id = s.post_id AND p.user_id = NEW.id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    'DROP TRIGGER IF EXISTS post_search_author ON "user"',
+    """CREATE TRIGGER post_search_author AFTER UPDATE OF username, first_name, last_name ON "user"
+    FOR EACH ROW EXECUTE FUNCTION post_search_refresh_author()""",
+]
+
+POSTGRES_BACKFILL = """
+    INSERT INTO post_search (post_id, document)
+    SELECT p.id, """ + POSTGRES_DOCUMENT.format(
+        content='p.content', username='u.username', first_name='u.first_name', last_name='u.last_name'
+    ) + """
+    FROM post p JOIN "user" u ON u.id = p.user_id
+    ON CONFLICT (post_id) DO NOTHING
+"""
+
+JOB_SQLITE_TABLE_DDL = [
+    """CREATE VIRTUAL TABLE job_search USING fts5(
+        title, description, location, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+]
+
+JOB_SQLITE_TRIGGER_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS job_search_insert AFTER INSERT ON jobs BEGIN
+        INSERT INTO job_search (rowid, title, description, location)
+        VALUES (NEW.id, NEW.title, NEW.description, NEW.location);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_search_update AFTER UPDATE OF title, description, location ON jobs BEGIN
+        DELETE FROM job_search WHERE rowid = OLD.id;
+        INSERT INTO job_search (rowid, title, description, location)
+        VALUES (NEW.id, NEW.title, NEW.description, NEW.location);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS job_search_delete AFTER DELETE ON jobs BEGIN
+        DELETE FROM job_search WHERE rowid = OLD.id;
+    END""",
+]
+
+JOB_SQLITE_BACKFILL = """
+    INSERT INTO job_search (rowid, title, description, location)
+    SELECT id, title, description, location FROM jobs
+"""
+
+# Per-column bm25() weights for (title, description, location)
+JOB_SQLITE_WEIGHTS = (10.0, 1.0, 4.0)
+
+# Title above location above description, as in the SQLite weights
+JOB_POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce({title}, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({location}, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce({description}, '')), 'C')"
+)
+
+JOB_POSTGRES_TABLE_DDL = [
+    """CREATE TABLE job_search (
+        job_id INTEGER PRIMARY KEY REFERENCES jobs (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )""",
+    "CREATE INDEX ix_job_search_document ON job_search USING GIN (document)",
+]
+
+JOB_POSTGRES_TRIGGER_DDL = [
+    """CREATE OR REPLACE FUNCTION job_search_refresh() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO job_search (job_id, document)
+        VALUES (NEW.id, """ + JOB_POSTGRES_DOCUMENT.format(
+            title='NEW.title', location='NEW.location', description='NEW.description'
+        ) + """)
+        ON CONFLICT (job_id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS job_search_job ON jobs",
+    """CREATE TRIGGER job_search_job AFTER INSERT OR UPDATE OF title, description, location ON jobs
+    FOR EACH ROW EXECUTE FUNCTION job_search_refresh()""",
+]
+
+JOB_POSTGRES_BACKFILL = """
+    INSERT INTO job_search (job_id, document)
+    SELECT id, """ + JOB_POSTGRES_DOCUMENT.format(
+        title='title', location='location', description='description'
+    ) + """
+    FROM jobs
+    ON CONFLICT (job_id) DO NOTHING
+"""
+
+# (table, table DDL, trigger DDL, backfill) for each index, per dialect
+SEARCH_INDEXES = {
+    'sqlite': [
+        (SEARCH_TABLE, SQLITE_TABLE_DDL, SQLITE_TRIGGER_DDL, SQLITE_BACKFILL),
+        (JOB_SEARCH_TABLE, JOB_SQLITE_TABLE_DDL, JOB_SQLITE_TRIGGER_DDL, JOB_SQLITE_BACKFILL),
+    ],
+    'postgresql': [
+        (SEARCH_TABLE, POSTGRES_TABLE_DDL, POSTGRES_TRIGGER_DDL, POSTGRES_BACKFILL),
+        (JOB_SEARCH_TABLE, JOB_POSTGRES_TABLE_DDL, JOB_POSTGRES_TRIGGER_DDL, JOB_POSTGRES_BACKFILL),
+    ],
+}
+
+def _search_table_exists(connection, name):
+    if connection.dialect.name == 'sqlite':
+        return connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': name}
+        ).first() is not None
+    return connection.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is not None
+
+def init_search_index():
+    """Create the search indexes and their sync triggers if missing (idempotent).
+
+    Each index is backfilled from existing rows only when it is first created.
+    Must be called inside an application context.
+    """
+    with db.engine.begin() as connection:
+        for name, table_ddl, trigger_ddl, backfill in SEARCH_INDEXES.get(db.engine.dialect.name, []):
+            created = not _search_table_exists(connection, name)
+            if created:
+                for statement in table_ddl:
+                    connection.exec_driver_sql(statement)
+            for statement in trigger_ddl:
+                connection.exec_driver_sql(statement)
+            if created:
+                connection.exec_driver_sql(backfill)
+
+def drop_search_index():
+    """Drop the search index tables (triggers on post/user/jobs go with their tables)"""
+    with db.engine.begin() as connection:
+        for name in (SEARCH_TABLE, JOB_SEARCH_TABLE):
+            connection.exec_driver_sql(f'DROP TABLE IF EXISTS {name}')
+
+def parse_search_terms(search):
+    """Split free text into lower-cased word tokens safe to embed in a query"""
+    return re.findall(r'\w+', search.lower())
+
+def search_posts_subquery(search):
+    """Subquery of (post_id, score) for posts matching any term, higher score = more relevant.
+
+    Terms are prefix-matched, mirroring the old substring search closely
+    enough for typeahead. Returns None if the search has no usable terms.
+    """
+    terms = parse_search_terms(search)
+    if not terms:
+        return None
+
+    if db.engine.dialect.name == 'postgresql':
+        search_table = table(SEARCH_TABLE, column('post_id'), column('document'))
+        query = func.to_tsquery('simple', ' | '.join(f'{term}:*' for term in terms))
+        return select(
+            search_table.c.post_id.label('post_id'),
+            func.ts_rank(search_table.c.document, query).label('score')
+        ).where(search_table.c.document.op('@@')(query)).subquery('search_results')
+
+    search_table = table(SEARCH_TABLE)
+    index = literal_column(SEARCH_TABLE)
+    # bm25() is lower-is-better, negate it so both backends sort descending
+    return select(
+        literal_column('rowid').label('post_id'),
+        (-func.bm25(index)).label('score')
+    ).select_from(search_table).where(
+        index.op('MATCH')(' OR '.join(f'"{term}"*' for term in terms))
+    ).subquery('search_results')
+
+def search_jobs_subquery(search):
+    """Subquery of (job_id, score) for jobs whose title, description or
+    location matches every term, higher score = more relevant.
+
+    Unlike post search all terms must match (each prefix-matched), since
+    job searches narrow down ("python remote") rather than browse. Returns
+    None if the search has no usable terms.
+    """
+    terms = parse_search_terms(search)
+    if not terms:
+        return None
+
+    if db.engine.dialect.name == 'postgresql':
+        search_table = table(JOB_SEARCH_TABLE, column('job_id'), column('document'))
+        query = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        return select(
+            search_table.c.job_id.label('job_id'),
+            func.ts_rank(search_table.c.document, query).label('score')
+        ).where(search_table.c.document.op('@@')(query)).subquery('job_search_results')
+
+    search_table = table(JOB_SEARCH_TABLE)
+    index = literal_column(JOB_SEARCH_TABLE)
+    return select(
+        literal_column('rowid').label('job_id'),
+        (-func.bm25(index, *JOB_SQLITE_WEIGHTS)).label('score')
+    ).select_from(search_table).where(
+        index.op('MATCH')(' AND '.join(f'"{term}"*' for term in terms))
+    ).subquery('job_search_results')
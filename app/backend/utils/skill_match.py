@@ -0,0 +1,330 @@
+"""Skill-based matching between users and jobs with sparse TF-IDF vectors.
+
+The vocabulary is every distinct skill users list (``User.skills``,
+normalized to lowercase tokens). A job's terms are the skill phrases found
+in its title and description, up to MAX_SKILL_TOKENS words long; IDF comes
+from how many jobs mention a skill, so "communication" counts for less than
+"kubernetes". Users are binary skill vectors and jobs sublinear term counts,
+both IDF-weighted and L2-normalized, so a match score is their cosine.
+
+Each process holds both sides as scipy.sparse CSR matrices and answers
+"top-k jobs for these users" and "top-k candidates for these jobs" with one
+sparse matrix product per batch. A user whose skills change moves into a
+small overlay, folded back into the matrix once it grows (the same scheme
+as utils/follow_graph.py), so an edit never rebuilds the user matrix.
+
+The ``skill_profiles`` change counter tells a process that another one
+changed users, and it reloads the user side. Job changes (the ``jobs``
+counter) and skills new to the vocabulary rebuild both sides, at most once
+every SKILL_MATCH_MAX_STALENESS_SECONDS. Both happen in the background, the
+loaded matcher answering until the new one is swapped in.
+"""
+import copy
+import math
+import re
+import threading
+import time
+import numpy as np
+import scipy.sparse as sp
+from flask import current_app
+from models.user import db, User
+from models.job import Job, JOBS_VERSION
+from models.counters import ChangeCounter
+from utils.index_rebuild import rebuild
+
+SKILL_PROFILES_VERSION = 'skill_profiles'
+
+# Longest skill phrase looked for in job text ("amazon web services")
+MAX_SKILL_TOKENS = 3
+DEFAULT_MAX_STALENESS_SECONDS = 60
+
+# Fold the user overlay into the matrix once it holds this share of all users
+COMPACT_FRACTION = 0.05
+COMPACT_MIN_USERS = 256
+
+# Keeps "c++", "c#" and "node.js" whole; a trailing period is punctuation
+TOKEN_RE = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+
+_NO_COLUMNS = np.zeros(0, dtype=np.int32)
+_NO_WEIGHTS = np.zeros(0, dtype=np.float32)
+
+def tokenize(text):
+    return [token.rstrip('.') for token in TOKEN_RE.findall((text or '').lower())]
+
+def skill_terms(skills):
+    """Distinct vocabulary terms of a list of skills as users type them"""
+    return list(dict.fromkeys(term for term in (' '.join(tokenize(skill)) for skill in skills) if term))
+
+def phrase_starts(vocabulary):
+    """First words of the multi-word terms, the only places a phrase can start"""
+    return {term.split(' ', 1)[0] for term in vocabulary if ' ' in term}
+
+def text_term_counts(text, vocabulary, starts, max_tokens=MAX_SKILL_TOKENS):
+    """{column: count} of the vocabulary phrases occurring in text; ``starts``
+    as returned by phrase_starts(vocabulary)"""
+    tokens = tokenize(text)
+    counts = {}
+    for i, token in enumerate(tokens):
+        column = vocabulary.get(token)
+        if column is not None:
+            counts[column] = counts.get(column, 0) + 1
+        if token in starts:
+            for n in range(2, min(max_tokens, len(tokens) - i) + 1):
+                column = vocabulary.get(' '.join(tokens[i:i + n]))
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+    return counts
+
+def job_text(title, description):
+    return f'{title}\n{description}'
+
+def _csr(rows, width):
+    """CSR matrix from a list of (columns, weights) pairs"""
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(columns) for columns, _ in rows])
+    indices = np.concatenate([_NO_COLUMNS] + [columns for columns, _ in rows])
+    data = np.concatenate([_NO_WEIGHTS] + [weights for _, weights in rows])
+    return sp.csr_matrix((data, indices, indptr), shape=(len(rows), width))
+
+def _top_k(ids, scores, k):
+    """(id, score) pairs of the k best scores, ties to the lower id"""
+    if len(scores) > k:
+        keep = scores >= np.partition(scores, len(scores) - k)[len(scores) - k]
+        ids, scores = ids[keep], scores[keep]
+    order = np.lexsort((ids, -scores))[:k]
+    return list(zip(ids[order].tolist(), scores[order].tolist()))
+
+class SkillMatcher:
+    """TF-IDF skill vectors of every job and every user with skills"""
+
+    def __init__(self, jobs, users):
+        """``jobs``: (id, text, is_open) tuples; ``users``: (id, skills, is_public)
+        tuples with skills as a list of strings"""
+        self.terms = sorted({term for _, skills, _ in users for term in skill_terms(skills)})
+        self.vocabulary = {term: column for column, term in enumerate(self.terms)}
+        self._starts = phrase_starts(self.vocabulary)
+
+        jobs = sorted(jobs)
+        self.job_ids = np.fromiter((job_id for job_id, _, _ in jobs), np.int64, len(jobs))
+        self.job_open = np.fromiter((is_open for _, _, is_open in jobs), bool, len(jobs))
+        job_counts = [text_term_counts(text, self.vocabulary, self._starts) for _, text, _ in jobs]
+        df = np.zeros(len(self.terms), dtype=np.int64)
+        for counts in job_counts:
+            df[list(counts)] += 1
+        self.idf = (np.log((1 + len(jobs)) / (1 + df)) + 1).astype(np.float32)
+        # What a skill no job mentions would weigh
+        self.unseen_idf = math.log(1 + len(jobs)) + 1
+        self.jobs = _csr([self._job_row(counts) for counts in job_counts], len(self.terms))
+        self.jobs_t = self.jobs.T.tocsr()
+        self.load_users(users)
+
+    @classmethod
+    def from_database(cls):
+        jobs = [(job_id, job_text(title, description), status == 'open') for job_id, title, description, status in
+                db.session.query(Job.id, Job.title, Job.description, Job.status)]
+        return cls(jobs, users_from_database())
+
+    def _job_row(self, counts):
+        columns = np.fromiter(sorted(counts), np.int32, len(counts))
+        weights = (1 + np.log(np.array([counts[column] for column in columns], np.float32))) * self.idf[columns]
+        return columns, weights / (np.linalg.norm(weights) or 1)
+
+    def _user_row(self, skills):
+        """(columns, weights) of a user's skills. Skills outside the vocabulary
+        can't match any job, but they still count towards the vector's length,
+        so a specialist in things no job asks for doesn't score like one who
+        only lists what the job asks for."""
+        terms = skill_terms(skills)
+        known = sorted(self.vocabulary[term] for term in terms if term in self.vocabulary)
+        self.unknown_terms.update(term for term in terms if term not in self.vocabulary)
+        columns = np.array(known, dtype=np.int32)
+        weights = self.idf[columns]
+        length = math.sqrt(float((weights ** 2).sum()) + (len(terms) - len(known)) * self.unseen_idf ** 2)
+        return columns, weights / (length or 1)
+
+    def load_users(self, users):
+        """Replace the user side; ``users`` as for the constructor"""
+        self.unknown_terms = set()
+        users = sorted(users)
+        self._set_users(
+            np.fromiter((user_id for user_id, _, _ in users), np.int64, len(users)),
+            np.fromiter((is_public for _, _, is_public in users), bool, len(users)),
+            [self._user_row(skills) for _, skills, _ in users]
+        )
+
+    def _set_users(self, user_ids, public, rows):
+        self.user_ids = user_ids
+        self.user_public = public
+        self.users = _csr(rows, len(self.terms))
+        self.users_t = self.users.T.tocsr()
+        # user_id -> (columns, weights, is_public) of users changed since
+        self._overlay = {}
+
+    def _position(self, ids, item_id):
+        i = int(np.searchsorted(ids, item_id))
+        return i if i < len(ids) and ids[i] == item_id else None
+
+    def _base_user_row(self, i):
+        start, end = self.users.indptr[i], self.users.indptr[i + 1]
+        return self.users.indices[start:end], self.users.data[start:end]
+
+    def user_row(self, user_id):
+        if user_id in self._overlay:
+            return self._overlay[user_id][:2]
+        i = self._position(self.user_ids, user_id)
+        return self._base_user_row(i) if i is not None else (_NO_COLUMNS, _NO_WEIGHTS)
+
+    def job_row(self, job_id=None, text=None):
+        """A loaded job's vector, or one computed from ``text`` (e.g. a job
+        posted after the matrices were built)"""
+        i = self._position(self.job_ids, job_id) if text is None else None
+        if i is None:
+            return self._job_row(text_term_counts(text, self.vocabulary, self._starts))
+        start, end = self.jobs.indptr[i], self.jobs.indptr[i + 1]
+        return self.jobs.indices[start:end], self.jobs.data[start:end]
+
+    def shared_skills(self, user_columns, job_columns):
+        return [self.terms[column] for column in np.intersect1d(user_columns, job_columns).tolist()]
+
+    def update_user(self, user_id, skills, is_public=True):
+        """Apply a user's new skills (or visibility) without rebuilding"""
+        columns, weights = self._user_row(skills)
+        self._overlay[user_id] = (columns, weights, is_public)
+        if len(self._overlay) >= max(COMPACT_MIN_USERS, COMPACT_FRACTION * len(self.user_ids)):
+            self._compact()
+
+    def _compact(self):
+        rows = {user_id: (*self._base_user_row(i), public)
+                for i, (user_id, public) in enumerate(zip(self.user_ids.tolist(), self.user_public.tolist()))}
+        rows.update(self._overlay)
+        user_ids = sorted(user_id for user_id, (columns, _, _) in rows.items() if len(columns))
+        self._set_users(
+            np.array(user_ids, dtype=np.int64),
+            np.array([rows[user_id][2] for user_id in user_ids], dtype=bool),
+            [rows[user_id][:2] for user_id in user_ids]
+        )
+
+    def top_jobs(self, user_ids, k=10, exclude=None):
+        """Per user, the ``k`` best (job_id, score) pairs over open jobs.
+        ``exclude`` optionally holds a collection of job ids per user."""
+        scores = _csr([self.user_row(user_id) for user_id in user_ids], len(self.terms)) @ self.jobs_t
+        results = []
+        for i in range(len(user_ids)):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            positions, values = scores.indices[start:end], scores.data[start:end]
+            keep = self.job_open[positions]
+            if exclude is not None and exclude[i]:
+                keep &= ~np.isin(self.job_ids[positions], list(exclude[i]))
+            results.append(_top_k(self.job_ids[positions[keep]], values[keep], k))
+        return results
+
+    def top_candidates(self, job_rows, k=10, exclude=None):
+        """Per job vector (see job_row), the ``k`` best (user_id, score) pairs
+        over public users. ``exclude`` optionally holds user ids per job."""
+        queries = _csr(job_rows, len(self.terms))
+        scores = queries @ self.users_t
+        overlay_ids = np.array([user_id for user_id, (_, _, public) in self._overlay.items() if public],
+                               dtype=np.int64)
+        overlay_scores = (queries @ _csr([self._overlay[user_id][:2] for user_id in overlay_ids.tolist()],
+                                         len(self.terms)).T).toarray()
+        changed = np.array(list(self._overlay), dtype=np.int64)
+        results = []
+        for i in range(len(job_rows)):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            positions, values = scores.indices[start:end], scores.data[start:end]
+            ids = self.user_ids[positions]
+            keep = self.user_public[positions] & ~np.isin(ids, changed)
+            ids = np.concatenate([ids[keep], overlay_ids])
+            values = np.concatenate([values[keep], overlay_scores[i]])
+            keep = values > 0
+            if exclude is not None and exclude[i]:
+                keep &= ~np.isin(ids, list(exclude[i]))
+            results.append(_top_k(ids[keep], values[keep], k))
+        return results
+
+def users_from_database():
+    return [(user_id, User.parse_skills(skills), bool(is_public)) for user_id, skills, is_public in
+            db.session.query(User.id, User.skills, User.is_public).filter(User.skills != '')]
+
+class _MatcherHolder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.matcher = None
+        self.jobs_version = None
+        self.skills_version = None
+        self.loaded_at = 0.0
+        self.rebuild_thread = None
+
+    @property
+    def loaded(self):
+        return self.matcher is not None
+
+    def install_matcher(self, loaded):
+        (self.jobs_version, self.skills_version), self.matcher = loaded
+        self.loaded_at = time.monotonic()
+
+    def install_users(self, loaded):
+        (_, self.skills_version), self.matcher = loaded
+
+def _holder():
+    return current_app.extensions.setdefault('skill_matcher', _MatcherHolder())
+
+# Versions are read before the data, so a concurrent write costs one extra reload
+
+def _load_matcher():
+    return ChangeCounter.current(JOBS_VERSION, SKILL_PROFILES_VERSION), SkillMatcher.from_database()
+
+def _reload_users(matcher):
+    """A copy of matcher sharing its job side, with the users reloaded"""
+    versions = ChangeCounter.current(JOBS_VERSION, SKILL_PROFILES_VERSION)
+    reloaded = copy.copy(matcher)
+    reloaded.load_users(users_from_database())
+    return versions, reloaded
+
+def _refresh(holder):
+    """Start rebuilding or reloading what changed (see utils/index_rebuild.py)
+    and return the matcher to answer with; the caller holds holder.lock"""
+    max_staleness = current_app.config.get('SKILL_MATCH_MAX_STALENESS_SECONDS', DEFAULT_MAX_STALENESS_SECONDS)
+    jobs_version, skills_version = ChangeCounter.current(JOBS_VERSION, SKILL_PROFILES_VERSION)
+    matcher = holder.matcher
+    expired = time.monotonic() - holder.loaded_at >= max_staleness
+    if matcher is None or expired and (holder.jobs_version != jobs_version or matcher.unknown_terms):
+        rebuild(holder, _load_matcher, holder.install_matcher, 'skill-matcher')
+    elif holder.skills_version != skills_version:
+        rebuild(holder, lambda: _reload_users(matcher), holder.install_users, 'skill-matcher')
+    return holder.matcher
+
+def jobs_for_users(user_ids, limit=10, exclude=None):
+    """Per user, [(job_id, score, shared skills)] for the best matching open jobs"""
+    holder = _holder()
+    with holder.lock:
+        matcher = _refresh(holder)
+        return [
+            [(job_id, score, matcher.shared_skills(matcher.user_row(user_id)[0], matcher.job_row(job_id)[0]))
+             for job_id, score in ranked]
+            for user_id, ranked in zip(user_ids, matcher.top_jobs(user_ids, limit, exclude))
+        ]
+
+def candidates_for_jobs(job_texts, limit=10, exclude=None):
+    """Per job text (title and description), [(user_id, score, shared skills)]
+    for the best matching public users"""
+    holder = _holder()
+    with holder.lock:
+        matcher = _refresh(holder)
+        job_rows = [matcher.job_row(text=text) for text in job_texts]
+        return [
+            [(user_id, score, matcher.shared_skills(matcher.user_row(user_id)[0], columns))
+             for user_id, score in ranked]
+            for (columns, _), ranked in zip(job_rows, matcher.top_candidates(job_rows, limit, exclude))
+        ]
+
+def record_skills_change(user):
+    """Apply a committed change to a user's skills or visibility to the loaded
+    matcher, if no other change landed since it last caught up"""
+    holder = _holder()
+    version = ChangeCounter.current(SKILL_PROFILES_VERSION)[0]
+    with holder.lock:
+        if holder.matcher is None or holder.skills_version != version - 1:
+            return
+        holder.matcher.update_user(user.id, user.get_skills_list(), bool(user.is_public))
+        holder.skills_version = version
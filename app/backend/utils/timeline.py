@@ -0,0 +1,200 @@
+"""Fan-out-on-write home timelines.
+
+When a post is created its id is pushed into the timeline of the author and
+of every accepted follower, so reading a home feed is a single range read on
+timeline_entries (user_id, created_at, post_id) instead of a join over the
+follow graph at read time.
+
+Authors with at least FEED_PULL_FOLLOWER_THRESHOLD followers are the
+exception: pushing one of their posts would mean a write per follower, so
+their posts only land in their own timeline and followers pull them at read
+time, merged with the pushed timeline by (created_at, id). An author who
+drops back below the threshold resumes pushing; posts written while they
+were pulled are not backfilled.
+
+Timelines are bounded to TIMELINE_MAX_LENGTH entries: following someone
+backfills at most that many of their posts, and ``flask trim-timelines``
+drops anything older than the newest TIMELINE_MAX_LENGTH entries per user.
+All functions run on the session and commit with the caller's transaction.
+
+Every change to a user's timeline bumps their ``timeline:<id>`` counter and
+every post by an author bumps ``author_posts:<id>``; feed_version() combines
+the counters a viewer's feed depends on for ETags and the page cache.
+
+After a post commits, publish_new_post() announces it on the in-process
+``new_posts`` channel (utils/pubsub.py) so waiting "new posts" requests can
+wake up instead of polling the database.
+"""
+import heapq
+from flask import current_app
+from sqlalchemy import select, insert, delete, literal, func, tuple_, cast
+from models.user import db
+from models.post import Post
+from models.counters import ChangeCounter
+from models.connection import UserConnection, FollowerStat, CONNECTION_ACCEPTED
+from models.timeline import TimelineEntry
+from utils.pubsub import pubsub
+from utils.page_cache import staleness_bucket
+
+DEFAULT_TIMELINE_MAX_LENGTH = 800
+DEFAULT_FEED_PULL_FOLLOWER_THRESHOLD = 5000
+
+# Posts with this visibility only ever reach their author's own timeline
+PRIVATE_VISIBILITY = 'private'
+
+NEW_POSTS_CHANNEL = 'new_posts'
+
+_ENTRY_COLUMNS = ['user_id', 'post_id', 'author_id', 'created_at']
+
+def timeline_max_length():
+    return current_app.config.get('TIMELINE_MAX_LENGTH', DEFAULT_TIMELINE_MAX_LENGTH)
+
+def timeline_version_name(user_id):
+    return f'timeline:{user_id}'
+
+def author_posts_version_name(author_id):
+    return f'author_posts:{author_id}'
+
+def _timeline_version_names(user_ids):
+    """SELECT of timeline counter names for a one-column SELECT of user ids"""
+    user_id = user_ids.subquery().c[0]
+    return select(literal('timeline:') + cast(user_id, db.String))
+
+def feed_version(user_id):
+    """Versions covering a viewer's feed: their timeline, their pull authors'
+    posts and, since like counts are not versioned per viewer, a time bucket
+    of PAGE_CACHE_TTL_SECONDS so counts are never staler than that.
+    """
+    authors = pull_authors(user_id)
+    names = [timeline_version_name(user_id)] + [author_posts_version_name(author_id) for author_id in authors]
+    return tuple(authors), ChangeCounter.current(*names), staleness_bucket()
+
+def pull_follower_threshold():
+    return current_app.config.get('FEED_PULL_FOLLOWER_THRESHOLD', DEFAULT_FEED_PULL_FOLLOWER_THRESHOLD)
+
+def is_pull_author(author_id):
+    """Whether followers pull this author's posts at read time instead of receiving pushes"""
+    return FollowerStat.count(author_id) >= pull_follower_threshold()
+
+def pull_authors(user_id):
+    """Ids of the accepted followees of user_id whose posts are pulled at read time"""
+    return [author_id for author_id, in db.session.query(UserConnection.following_id).join(
+        FollowerStat, FollowerStat.user_id == UserConnection.following_id
+    ).filter(
+        UserConnection.follower_id == user_id,
+        UserConnection.status == CONNECTION_ACCEPTED,
+        FollowerStat.follower_count >= pull_follower_threshold()
+    )]
+
+def followed_authors(user_id):
+    """Ids of everyone user_id follows (accepted connections)"""
+    return {author_id for author_id, in db.session.query(UserConnection.following_id).filter(
+        UserConnection.follower_id == user_id,
+        UserConnection.status == CONNECTION_ACCEPTED
+    )}
+
+def merge_feed_sources(sources, limit):
+    """K-way merge of row lists that each end in (created_at, id), sorted descending.
+
+    heapq.merge keeps one head row per source on its heap, so memory stays
+    O(len(sources)) and the work is O(limit * log len(sources)). Rows seen
+    in an earlier source are skipped (an author who recently crossed the
+    pull threshold has both pushed and pulled copies).
+    """
+    merged = heapq.merge(*sources, key=lambda row: (row[-2], row[-1]), reverse=True)
+    rows, seen = [], set()
+    for row in merged:
+        if row[-1] in seen:
+            continue
+        seen.add(row[-1])
+        rows.append(row)
+        if len(rows) == limit:
+            break
+    return rows
+
+def fan_out_post(post):
+    """Push a freshly flushed post into its author's and followers' timelines.
+
+    The follower rows are written with one INSERT ... SELECT, so the cost to
+    the request is a single statement whatever the follower count. Posts by
+    pull authors stop at the author's own timeline.
+    """
+    db.session.add(TimelineEntry(
+        user_id=post.user_id, post_id=post.id, author_id=post.user_id, created_at=post.created_at
+    ))
+    ChangeCounter.bump(timeline_version_name(post.user_id), author_posts_version_name(post.user_id))
+    if post.visibility == PRIVATE_VISIBILITY or is_pull_author(post.user_id):
+        return
+    follower_ids = select(UserConnection.follower_id).where(
+        UserConnection.following_id == post.user_id,
+        UserConnection.status == CONNECTION_ACCEPTED
+    )
+    entries = follower_ids.add_columns(literal(post.id), literal(post.user_id), literal(post.created_at, db.DateTime))
+    db.session.execute(insert(TimelineEntry).from_select(_ENTRY_COLUMNS, entries))
+    ChangeCounter.bump_selected(_timeline_version_names(follower_ids))
+
+def publish_new_post(post):
+    """Announce a committed post to waiting readers in this process"""
+    pubsub().publish(NEW_POSTS_CHANNEL, {
+        'post_id': post.id,
+        'author_id': post.user_id,
+        'visibility': post.visibility
+    })
+
+def reaches_feed(message, user_id, authors):
+    """Whether a NEW_POSTS_CHANNEL message is for user_id's feed, given the
+    ids of the authors they follow (the same rule fan_out_post applies)"""
+    if message['author_id'] == user_id:
+        return True
+    return message['author_id'] in authors and message['visibility'] != PRIVATE_VISIBILITY
+
+def remove_post(post):
+    """Drop a deleted post from every timeline it was pushed into"""
+    ChangeCounter.bump(author_posts_version_name(post.user_id))
+    ChangeCounter.bump_selected(_timeline_version_names(
+        select(TimelineEntry.user_id).where(TimelineEntry.post_id == post.id)
+    ))
+    db.session.execute(delete(TimelineEntry).where(TimelineEntry.post_id == post.id))
+
+def backfill_follow(follower_id, author_id):
+    """Seed a new follower's timeline with the author's most recent posts"""
+    ChangeCounter.bump(timeline_version_name(follower_id))
+    if is_pull_author(author_id):
+        return
+    recent = select(
+        literal(follower_id), Post.id, Post.user_id, Post.created_at
+    ).where(
+        Post.user_id == author_id,
+        Post.visibility != PRIVATE_VISIBILITY
+    ).order_by(Post.created_at.desc(), Post.id.desc()).limit(timeline_max_length())
+    db.session.execute(insert(TimelineEntry).from_select(_ENTRY_COLUMNS, recent))
+
+def remove_follow(follower_id, author_id):
+    """Drop an author's posts from a former follower's timeline"""
+    ChangeCounter.bump(timeline_version_name(follower_id))
+    db.session.execute(delete(TimelineEntry).where(
+        TimelineEntry.user_id == follower_id,
+        TimelineEntry.author_id == author_id
+    ))
+
+def trim_timelines(max_length=None):
+    """Delete entries beyond the newest max_length of each timeline.
+
+    Meant to run periodically (``flask trim-timelines``) rather than on every
+    fan-out. Returns the number of entries removed.
+    """
+    max_length = max_length or timeline_max_length()
+    ranked = select(
+        TimelineEntry.user_id,
+        TimelineEntry.post_id,
+        func.row_number().over(
+            partition_by=TimelineEntry.user_id,
+            order_by=(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())
+        ).label('position')
+    ).subquery()
+    stale = select(ranked.c.user_id, ranked.c.post_id).where(ranked.c.position > max_length)
+    removed = db.session.execute(
+        delete(TimelineEntry).where(tuple_(TimelineEntry.user_id, TimelineEntry.post_id).in_(stale))
+    ).rowcount
+    db.session.commit()
+    return removed
@@ -0,0 +1,140 @@
+"""Write-behind buffer for post view counts.
+
+Listings and feeds record an impression for every post they return. Doing
+that as one UPDATE per impression would turn every read into writes, so
+impressions are coalesced per post in memory and written by a background
+thread as a single batched UPDATE every VIEW_COUNTER_FLUSH_INTERVAL_SECONDS,
+or sooner once VIEW_COUNTER_FLUSH_SIZE posts are pending.
+
+Flushes do not bump the posts version: that would invalidate every listing
+ETag and cached first page once per interval under any read traffic.
+Listings show view counts up to PAGE_CACHE_TTL_SECONDS old instead (see
+posts_version in api/posts.py).
+
+Counts still pending are flushed at interpreter exit and put back in the
+buffer if a flush fails, so only a hard crash loses anything, and then at
+most one interval's worth. Set the interval to 0 to disable the flusher
+thread and call flush() yourself (as the tests do).
+"""
+import atexit
+import os
+import threading
+from collections import Counter
+from flask import current_app, g
+from sqlalchemy import bindparam
+from models.user import db
+from models.post import Post
+
+DEFAULT_FLUSH_INTERVAL_SECONDS = 5.0
+DEFAULT_FLUSH_SIZE = 1000
+
+_post_table = Post.__table__
+# One statement executed with a parameter list, which the driver runs as a batch
+_INCREMENT_VIEWS = _post_table.update().where(
+    _post_table.c.id == bindparam('post_id')
+).values(views_count=_post_table.c.views_count + bindparam('views'))
+
+class ViewCounterBuffer:
+    """Thread-safe per-post view counts, written to the post table in batches"""
+
+    def __init__(self, app, flush_interval=DEFAULT_FLUSH_INTERVAL_SECONDS, flush_size=DEFAULT_FLUSH_SIZE):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher_pid = None
+        self.flushes = self.flushed_views = self.failed_flushes = 0
+
+    def record(self, post_ids):
+        """Count one view of each post id"""
+        with self._lock:
+            self._pending.update(post_ids)
+            full = len(self._pending) >= self.flush_size
+        if self.flush_interval > 0:
+            self._ensure_flusher()
+            if full:
+                self._wakeup.set()
+
+    def flush(self):
+        """Write pending counts in one transaction; returns the views written.
+
+        Needs an app context. On failure the counts go back into the buffer
+        for the next flush.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+        try:
+            # Fixed row order, so concurrent flushes from several workers
+            # always take row locks in the same order
+            db.session.execute(_INCREMENT_VIEWS, [
+                {'post_id': post_id, 'views': views} for post_id, views in sorted(pending.items())
+            ])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            with self._lock:
+                self._pending.update(pending)
+                self.failed_flushes += 1
+            current_app.logger.error(f"Error flushing view counts: {str(e)}")
+            return 0
+        views = sum(pending.values())
+        with self._lock:
+            self.flushes += 1
+            self.flushed_views += views
+        return views
+
+    def _ensure_flusher(self):
+        # A thread started before a fork (e.g. gunicorn --preload) does not
+        # exist in the child, so each process starts its own
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._run, name='view-counter-flusher', daemon=True).start()
+        atexit.register(self._flush_in_context)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        with self.app.app_context():
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_posts': len(self._pending),
+                'pending_views': sum(self._pending.values()),
+                'flush_interval_seconds': self.flush_interval,
+                'flush_size': self.flush_size,
+                'flushes': self.flushes,
+                'flushed_views': self.flushed_views,
+                'failed_flushes': self.failed_flushes
+            }
+
+def init_view_counter(app):
+    app.extensions['view_counter'] = ViewCounterBuffer(
+        app,
+        flush_interval=app.config.get('VIEW_COUNTER_FLUSH_INTERVAL_SECONDS', DEFAULT_FLUSH_INTERVAL_SECONDS),
+        flush_size=app.config.get('VIEW_COUNTER_FLUSH_SIZE', DEFAULT_FLUSH_SIZE)
+    )
+
+def view_counter():
+    """The current app's ViewCounterBuffer"""
+    return current_app.extensions['view_counter']
+
+def record_views(post_ids):
+    """Count a view of each listed post. The ids are also kept on ``g`` so a
+    page served later from the page cache can count them again."""
+    post_ids = list(post_ids)
+    g.viewed_post_ids = post_ids
+    view_counter().record(post_ids)
@@ -0,0 +1,151 @@
+"""Group commit for small, frequent writes (messages, likes).
+
+Each of those requests writes a row or two and commits, and on SQLite every
+commit is an fsync of the journal, so a busy worker spends most of its time
+waiting for the disk one request at a time. With WRITE_QUEUE_ENABLED the
+writes are instead handed to a committer thread, which runs everything
+queued within WRITE_QUEUE_MAX_DELAY_MS (at most WRITE_QUEUE_MAX_BATCH
+writes) in one transaction and commits once. Each caller blocks until that
+commit has happened, so a request still only answers after its write is
+durable.
+
+A write is a function run with ``db.session`` as its session, e.g.
+``write_queue().run(insert_like, user_id, post_id)``. It may be run more
+than once: if any write in a batch raises, the batch is rolled back and its
+writes are replayed one transaction each, so only the failing caller sees
+the error. It should return plain values (ids, dicts), since ORM objects
+are expired by the commit and belong to the committer's session.
+
+When the queue is disabled (the default, and in tests) ``run`` executes the
+write in the caller's session and commits it right away, so call sites are
+the same either way. The caller's own session must not hold uncommitted
+writes when it calls ``run``: with the queue enabled they would be in a
+different transaction (and on SQLite would block the committer), and its
+transaction is rolled back, releasing the connection, while it waits. Not for
+``sqlite://`` in-memory databases, whose single shared connection cannot be
+used from two threads.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+from flask import current_app
+from models.user import db
+
+DEFAULT_MAX_DELAY_MS = 2.0
+DEFAULT_MAX_BATCH = 256
+
+class WriteQueue:
+    """Runs submitted writes in shared transactions on a committer thread"""
+
+    def __init__(self, app, enabled=False, max_delay_ms=DEFAULT_MAX_DELAY_MS, max_batch=DEFAULT_MAX_BATCH):
+        self.app = app
+        self.enabled = enabled
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self._queue = []
+        self._ready = threading.Condition()
+        self._committer_pid = None
+        self.batches = self.writes = self.largest_batch = self.replayed_batches = 0
+
+    def run(self, write, *args):
+        """Run ``write(*args)`` and return its result once it is committed;
+        re-raises whatever the write raised"""
+        if not self.enabled:
+            try:
+                result = write(*args)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            return result
+        self._ensure_committer()
+        # Hand the caller's connection back to the pool while it waits, or
+        # enough waiting callers would leave none for the committer
+        db.session.rollback()
+        future = Future()
+        with self._ready:
+            self._queue.append((future, write, args))
+            self._ready.notify()
+        return future.result()
+
+    def _ensure_committer(self):
+        # As with the view counter, every process (e.g. each gunicorn
+        # worker after a fork) starts its own thread
+        if self._committer_pid == os.getpid():
+            return
+        with self._ready:
+            if self._committer_pid == os.getpid():
+                return
+            self._committer_pid = os.getpid()
+        threading.Thread(target=self._run, name='write-queue-committer', daemon=True).start()
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                with self.app.app_context():
+                    self._commit(batch)
+            except Exception as e:
+                # Never leave a caller waiting, whatever went wrong
+                for future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _next_batch(self):
+        """Wait for a write, then up to max_delay for more to join it"""
+        with self._ready:
+            self._ready.wait_for(lambda: self._queue)
+            deadline = time.monotonic() + self.max_delay
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._ready.wait(remaining):
+                    break
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+        return batch
+
+    def _commit(self, batch):
+        try:
+            results = [write(*args) for _, write, args in batch]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if len(batch) == 1:
+                batch[0][0].set_exception(e)
+                return
+            self.replayed_batches += 1
+            for entry in batch:
+                self._commit([entry])
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for (future, _, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        with self._ready:
+            pending = len(self._queue)
+        return {
+            'enabled': self.enabled,
+            'pending': pending,
+            'max_delay_ms': self.max_delay * 1000,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'writes': self.writes,
+            'writes_per_batch': round(self.writes / self.batches, 2) if self.batches else None,
+            'largest_batch': self.largest_batch,
+            'replayed_batches': self.replayed_batches
+        }
+
+def init_write_queue(app):
+    app.extensions['write_queue'] = WriteQueue(
+        app,
+        enabled=app.config.get('WRITE_QUEUE_ENABLED', False),
+        max_delay_ms=app.config.get('WRITE_QUEUE_MAX_DELAY_MS', DEFAULT_MAX_DELAY_MS),
+        max_batch=app.config.get('WRITE_QUEUE_MAX_BATCH', DEFAULT_MAX_BATCH)
+    )
+
+def write_queue():
+    """The current app's WriteQueue"""
+    return current_app.extensions['write_queue']
@@ -147,8 +147,8 @@ const PostList: React.FC = () => {
 
   const handleLike = async (postId: number) => {
     try {
-      await postsApi.likePost(postId);
-      setPosts(prev => prev.map(p => p.id === postId ? { ...p, likes_count: (p.likes_count || 0) + 1 } : p));
+      const result = await postsApi.likePost(postId);
+      setPosts(prev => prev.map(p => p.id === postId ? { ...p, likes_count: result.likes_count ?? p.likes_count } : p));
     } catch (err) {
       alert('Failed to like post.');
     }
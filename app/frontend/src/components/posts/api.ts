@@ -11,17 +11,20 @@ export interface PostFilters {
   sort_order?: 'asc' | 'desc';
   page?: number;
   per_page?: number;
+  cursor?: string;
+  include_total?: boolean;
 }
 
 export interface PostResponse {
   posts: Post[];
   pagination: {
-    page: number;
+    page?: number;
     per_page: number;
-    total: number;
-    pages: number;
+    total?: number;
+    pages?: number;
     has_next: boolean;
-    has_prev: boolean;
+    has_prev?: boolean;
+    next_cursor?: string | null;
   };
 }
 
@@ -72,6 +75,8 @@ export const postsApi = {
     if (filters.sort_order) params.append('sort_order', filters.sort_order);
     if (filters.page) params.append('page', filters.page.toString());
     if (filters.per_page) params.append('per_page', filters.per_page.toString());
+    if (filters.cursor !== undefined) params.append('cursor', filters.cursor);
+    if (filters.include_total) params.append('include_total', 'true');
 
     const response = await fetch(`${API_URL}/api/posts?${params.toString()}`, {
       headers: {
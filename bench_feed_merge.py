@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hybrid push/pull home feed
+
+1. create_post cost for an author with many followers, pushed vs pulled
+2. /api/feed page latency as the number of pulled authors grows
+3. merge_feed_sources (bounded heap) vs concatenate-and-sort of the sources
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from main import create_app  # noqa: E402
+from models.connection import UserConnection, FollowerStat, CONNECTION_ACCEPTED  # noqa: E402
+from models.post import Post  # noqa: E402
+from models.user import User, db  # noqa: E402
+from utils.jwt_utils import create_token  # noqa: E402
+from utils.timeline import fan_out_post, merge_feed_sources  # noqa: E402
+
+FOLLOWERS = 5000
+PULLED_AUTHORS = (0, 5, 20, 50)
+POSTS_PER_AUTHOR = 60
+PER_PAGE = 20
+ITERATIONS = 200
+
+
+def seed(app):
+    db.session.add_all([User(username=f'bench_{i}', email=f'bench_{i}@example.com', password='x')
+                        for i in range(FOLLOWERS + max(PULLED_AUTHORS) + 1)])
+    db.session.commit()
+    # User 1 is the big author every other user follows; user 2 is the viewer
+    db.session.add_all([UserConnection(i, 1, CONNECTION_ACCEPTED) for i in range(2, FOLLOWERS + 2)])
+    db.session.add(FollowerStat(user_id=1, follower_count=FOLLOWERS))
+    db.session.commit()
+
+
+def time_create_post(threshold, app):
+    app.config['FEED_PULL_FOLLOWER_THRESHOLD'] = threshold
+    samples = []
+    for i in range(20):
+        start = time.perf_counter()
+        post = Post(1, f'big author post {i}')
+        db.session.add(post)
+        db.session.flush()
+        fan_out_post(post)
+        db.session.commit()
+        samples.append(time.perf_counter() - start)
+    return sum(samples) / len(samples) * 1000
+
+
+def seed_pulled_authors(count):
+    """Make the viewer (user 2) follow `count` pull authors with recent posts"""
+    base = datetime(2024, 1, 1)
+    first_author = FOLLOWERS + 2
+    for author_id in range(first_author, first_author + count):
+        if db.session.get(FollowerStat, author_id):
+            continue
+        db.session.add(UserConnection(2, author_id, CONNECTION_ACCEPTED))
+        db.session.add(FollowerStat(user_id=author_id, follower_count=1))
+        for i in range(POSTS_PER_AUTHOR):
+            post = Post(author_id, f'pulled post {i}')
+            post.created_at = base + timedelta(minutes=random.randint(0, 100000))
+            db.session.add(post)
+    db.session.commit()
+
+
+def time_feed_page(client, headers):
+    client.get('/api/feed', headers=headers, query_string={'per_page': PER_PAGE})  # warm up
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        response = client.get('/api/feed', headers=headers, query_string={'per_page': PER_PAGE})
+        assert response.status_code == 200
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+def time_merge(k, rows_per_source=PER_PAGE + 1):
+    base = datetime(2024, 1, 1)
+    sources = []
+    for s in range(k):
+        rows = [(f'row {s}-{i}', base + timedelta(seconds=random.randint(0, 10 ** 6)), s * 10 ** 6 + i)
+                for i in range(rows_per_source)]
+        sources.append(sorted(rows, key=lambda row: (row[-2], row[-1]), reverse=True))
+
+    def heap_merge():
+        return merge_feed_sources(sources, PER_PAGE + 1)
+
+    def sort_merge():
+        rows = sorted([row for source in sources for row in source],
+                      key=lambda row: (row[-2], row[-1]), reverse=True)
+        return rows[:PER_PAGE + 1]
+
+    assert heap_merge() == sort_merge()
+    timings = []
+    for fn in (heap_merge, sort_merge):
+        start = time.perf_counter()
+        for _ in range(ITERATIONS * 5):
+            fn()
+        timings.append((time.perf_counter() - start) / (ITERATIONS * 5) * 1000)
+    return timings
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    app = create_app('testing')
+    with app.app_context():
+        seed(app)
+        print(f'create_post for an author with {FOLLOWERS} followers (20 posts)')
+        print(f'  push (fan-out to every follower): {time_create_post(FOLLOWERS + 1, app):.3f} ms/post')
+        print(f'  pull (own timeline only):         {time_create_post(FOLLOWERS, app):.3f} ms/post')
+
+        # From here on the viewer's timeline holds the pushed posts above and
+        # every author they still follow is a pull author
+        UserConnection.query.filter_by(follower_id=2, following_id=1).delete()
+        db.session.commit()
+        app.config['FEED_PULL_FOLLOWER_THRESHOLD'] = 1
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {create_token(2)}'}
+        print(f'\n/api/feed per_page={PER_PAGE}, {ITERATIONS} iterations')
+        for count in PULLED_AUTHORS:
+            seed_pulled_authors(count)
+            print(f'  {count:3d} pulled authors: {time_feed_page(client, headers):.3f} ms/page')
+
+        print(f'\nmerge of k sources x {PER_PAGE + 1} rows down to {PER_PAGE + 1}')
+        for k in (2, 10, 50, 200):
+            heap_ms, sort_ms = time_merge(k)
+            print(f'  k={k:3d}: heap {heap_ms * 1000:8.1f} us   concat+sort {sort_ms * 1000:8.1f} us')
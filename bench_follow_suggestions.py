@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 2-hop connection suggestions, SQL self-join vs the CSR follow graph
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from main import create_app  # noqa: E402
+from models.connection import UserConnection, CONNECTION_ACCEPTED  # noqa: E402
+from models.user import User, db  # noqa: E402
+from utils.follow_graph import FollowGraph  # noqa: E402
+
+USERS = 20000
+FOLLOWS_PER_USER = 40
+LIMIT = 10
+QUERIES = 50
+
+SUGGESTIONS_SQL = db.text("""
+    SELECT c2.following_id, count(*) AS mutual
+    FROM user_connections c1
+    JOIN user_connections c2 ON c2.follower_id = c1.following_id AND c2.status = 'accepted'
+    WHERE c1.follower_id = :user_id AND c1.status = 'accepted'
+      AND c2.following_id != :user_id
+      AND c2.following_id NOT IN (
+          SELECT following_id FROM user_connections WHERE follower_id = :user_id AND status = 'accepted'
+      )
+    GROUP BY c2.following_id
+    ORDER BY mutual DESC, c2.following_id
+    LIMIT :limit
+""")
+
+
+def seed(rng):
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'bench_{i}', 'email': f'bench_{i}@example.com', 'password': 'x'} for i in range(1, USERS + 1)
+    ])
+    # Skewed popularity, so some accounts have many followers like a real network
+    edges = set()
+    for follower in range(1, USERS + 1):
+        while len(edges) < follower * FOLLOWS_PER_USER:
+            following = min(int(rng.paretovariate(1.2)), USERS) if rng.random() < 0.5 else rng.randint(1, USERS)
+            if following != follower:
+                edges.add((follower, following))
+    db.session.execute(UserConnection.__table__.insert(), [
+        {'follower_id': s, 'following_id': t, 'status': CONNECTION_ACCEPTED} for s, t in edges
+    ])
+    db.session.commit()
+    return len(edges)
+
+
+def timed(fn, user_ids):
+    start = time.perf_counter()
+    results = [fn(user_id) for user_id in user_ids]
+    return (time.perf_counter() - start) / len(user_ids) * 1000, results
+
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    app = create_app('testing')
+    with app.app_context():
+        edge_count = seed(rng)
+        print(f'{USERS} users, {edge_count} accepted follows, top {LIMIT}, {QUERIES} users queried')
+
+        start = time.perf_counter()
+        graph = FollowGraph.from_database()
+        print(f'  graph load:    {(time.perf_counter() - start) * 1000:8.1f} ms '
+              f'({(graph.row_ids.nbytes + graph.indptr.nbytes + graph.targets.nbytes) / 2 ** 20:.1f} MiB)')
+
+        user_ids = rng.sample(range(1, USERS + 1), QUERIES)
+        sql_ms, sql_results = timed(
+            lambda user_id: [tuple(row) for row in db.session.execute(
+                SUGGESTIONS_SQL, {'user_id': user_id, 'limit': LIMIT})], user_ids)
+        graph_ms, graph_results = timed(lambda user_id: graph.suggestions(user_id, LIMIT), user_ids)
+        assert sql_results == graph_results
+        print(f'  SQL self-join: {sql_ms:8.3f} ms/user')
+        print(f'  CSR graph:     {graph_ms:8.3f} ms/user ({sql_ms / graph_ms:.0f}x)')
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            graph.add_edge(rng.randint(1, USERS), rng.randint(1, USERS))
+        print(f'  add_edge:      {(time.perf_counter() - start):8.3f} ms/edge (incl. compaction)')
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: nearest open jobs within 25 km over 200k geocoded jobs, geohash cell ranges vs a full scan
+"""
+
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from main import create_app  # noqa: E402
+from models.geo import GazetteerPlace  # noqa: E402
+from models.job import Company, Job  # noqa: E402
+from models.user import User, db  # noqa: E402
+from utils.geo import nearest  # noqa: E402
+from utils.geohash import bbox_around, encode, haversine_km  # noqa: E402
+
+JOBS = 200000
+COMPANIES = 500
+RADIUS_KM = 25
+PER_PAGE = 20
+QUERIES = 50
+GAZETTEER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend', 'data', 'gazetteer_cities.tsv')
+
+
+def seed(rng, cities):
+    db.session.add(User(username='bench_owner', email='owner@example.com', password='x'))
+    db.session.execute(Company.__table__.insert(), [{'user_id': 1, 'name': f'Company {i}'} for i in range(COMPANIES)])
+    weights = [math.sqrt(city.population) for city in cities]
+    jobs = []
+    for city in rng.choices(cities, weights, k=JOBS):
+        # Spread jobs over the metro area rather than one point per city
+        latitude = city.latitude + rng.gauss(0, 0.15)
+        longitude = city.longitude + rng.gauss(0, 0.15)
+        jobs.append({
+            'company_id': rng.randint(1, COMPANIES), 'title': 'Engineer', 'description': 'Build things',
+            'location': city.name, 'job_type': 'full-time', 'status': 'open' if rng.random() < 0.9 else 'closed',
+            'latitude': latitude, 'longitude': longitude, 'geohash': encode(latitude, longitude),
+            'created_at': datetime(2024, 1, 1), 'updated_at': datetime(2024, 1, 1)
+        })
+    db.session.execute(Job.__table__.insert(), jobs)
+    db.session.commit()
+
+
+def full_scan(center):
+    """Baseline: distance to every open job, then sort"""
+    rows = db.session.query(Job.id, Job.latitude, Job.longitude).filter(Job.status == 'open').all()
+    ids = np.array([row[0] for row in rows])
+    distances = haversine_km(*center, np.array([row[1] for row in rows]), np.array([row[2] for row in rows]))
+    inside = distances <= RADIUS_KM
+    order = np.lexsort((ids[inside], distances[inside]))[:PER_PAGE]
+    return [int(job_id) for job_id in ids[inside][order]]
+
+
+def cell_search(center):
+    page, _ = nearest(Job, [Job.status == 'open'], center, bbox_around(*center, RADIUS_KM), RADIUS_KM, None, PER_PAGE)
+    return [job_id for job_id, _ in page]
+
+
+if __name__ == '__main__':
+    app = create_app('testing')
+    with app.app_context():
+        GazetteerPlace.load_geonames(GAZETTEER)
+        cities = GazetteerPlace.query.all()
+        rng = random.Random(0)
+        start = time.perf_counter()
+        seed(rng, cities)
+        print(f'{JOBS} jobs seeded in {time.perf_counter() - start:.1f} s')
+        centers = [(city.latitude + rng.gauss(0, 0.1), city.longitude + rng.gauss(0, 0.1))
+                   for city in rng.choices(cities, k=QUERIES)]
+
+        for label, fn in [('geohash cell ranges', cell_search), ('full scan', full_scan)]:
+            start = time.perf_counter()
+            results = [fn(center) for center in centers]
+            elapsed = (time.perf_counter() - start) / QUERIES * 1000
+            print(f'  {label:20s} {elapsed:8.2f} ms per query')
+            if label == 'geohash cell ranges':
+                expected = results
+            else:
+                assert results == expected
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/jobs first pages, deep keyset pages, search and facets over 200k jobs,
+and in-memory facet counts vs one GROUP BY per facet
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from main import create_app  # noqa: E402
+from models.job import Company, Job, JOB_TYPES, JOB_FACETS  # noqa: E402
+from models.user import User, db  # noqa: E402
+from utils.job_search import FacetIndex, filter_conditions  # noqa: E402
+from utils.jwt_utils import create_token  # noqa: E402
+
+JOBS = 200000
+COMPANIES = 500
+LOCATIONS = [f'City {i}' for i in range(200)] + ['Remote']
+WORDS = ('python', 'java', 'react', 'data', 'cloud', 'sales', 'design', 'support', 'security', 'mobile')
+ITERATIONS = 20
+
+
+def seed(rng):
+    db.session.add(User(username='bench_owner', email='owner@example.com', password='x'))
+    db.session.execute(Company.__table__.insert(), [
+        {'user_id': 1, 'name': f'Company {i}', 'created_at': datetime(2024, 1, 1), 'updated_at': datetime(2024, 1, 1)}
+        for i in range(COMPANIES)
+    ])
+    base = datetime(2020, 1, 1)
+    db.session.execute(Job.__table__.insert(), [{
+        'company_id': rng.randint(1, COMPANIES),
+        'title': f'{rng.choice(WORDS).title()} {rng.choice(["engineer", "analyst", "manager", "lead"])}',
+        'description': ' '.join(rng.choice(WORDS) for _ in range(40)),
+        'location': rng.choice(LOCATIONS),
+        'job_type': rng.choice(JOB_TYPES),
+        'status': 'open' if rng.random() < 0.7 else 'closed',
+        'created_at': base + timedelta(minutes=i),
+        'updated_at': base
+    } for i in range(JOBS)])
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+
+
+def timed(client, headers, url):
+    assert client.get(url, headers=headers).status_code == 200
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        # A distinct query string per request keeps the page cache out of it
+        response = client.get(f'{url}&n={i}', headers=headers)
+    body = response.get_json()
+    return (time.perf_counter() - start) / ITERATIONS * 1000, body
+
+
+def group_by_facets(filters):
+    """Disjunctive facet counts the SQL way: one GROUP BY per facet"""
+    counts = {}
+    for facet in JOB_FACETS:
+        column = getattr(Job, facet)
+        others = filter_conditions({f: values for f, values in filters.items() if f != facet})
+        counts[facet] = db.session.query(column, db.func.count(Job.id)).filter(*others).group_by(column).order_by(
+            db.func.count(Job.id).desc()).limit(20).all()
+    return counts
+
+
+if __name__ == '__main__':
+    app = create_app('testing')
+    with app.app_context():
+        start = time.perf_counter()
+        seed(random.Random(0))
+        print(f'{JOBS} jobs seeded in {time.perf_counter() - start:.1f} s')
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {create_token(1)}'}
+
+        _, body = timed(client, headers, '/api/jobs?per_page=20&facets=false')
+        deep_cursor = None
+        for _ in range(50):  # walk 50 pages in to get a deep cursor
+            cursor = body['pagination']['next_cursor']
+            body = client.get(f'/api/jobs?per_page=20&facets=false&cursor={cursor}', headers=headers).get_json()
+        deep_cursor = body['pagination']['next_cursor']
+
+        cases = [
+            ('first page, no facets', '/api/jobs?per_page=20&facets=false'),
+            ('first page + facets', '/api/jobs?per_page=20'),
+            ('status+job_type + facets', '/api/jobs?per_page=20&status=open&job_type=contract'),
+            ('page 51 (keyset)', f'/api/jobs?per_page=20&cursor={deep_cursor}'),
+            ('search "python lead"', '/api/jobs?per_page=20&search=python+lead&facets=false'),
+            ('search + facets', '/api/jobs?per_page=20&search=python+lead'),
+        ]
+        for label, url in cases:
+            ms, body = timed(client, headers, url)
+            print(f'  {label:28s} {ms:8.2f} ms  ({len(body["jobs"])} jobs)')
+
+        start = time.perf_counter()
+        index = FacetIndex.from_database()
+        print(f'  facet index load             {(time.perf_counter() - start) * 1000:8.2f} ms')
+        filters = {'status': {'open'}, 'job_type': {'contract'}}
+        for label, fn in [('facets, NumPy index', lambda: index.counts(filters)),
+                          ('facets, GROUP BY per facet', lambda: group_by_facets(filters))]:
+            start = time.perf_counter()
+            for _ in range(5):
+                fn()
+            print(f'  {label:28s} {(time.perf_counter() - start) / 5 * 1000:8.2f} ms')
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Load test: thousands of idle WebSocket/SSE clients on the message gateway, memory per connection
+and send-to-delivery latency, vs what polling the thread endpoint would cost
+"""
+
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from main import create_app  # noqa: E402
+from models.user import User, db  # noqa: E402
+from utils.jwt_utils import create_token  # noqa: E402
+from utils.message_gateway import GATEWAY_PATH, message_gateway  # noqa: E402
+
+USERS = 2000
+CLIENTS = 5000  # Half WebSocket, half SSE
+MESSAGES = 500
+POLL_INTERVAL_SECONDS = 5
+
+
+def rss_kb():
+    with open('/proc/self/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith('VmRSS'))
+
+
+async def idle_client(port, token, websocket, received, connected):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=1 << 20)
+    headers = [f'GET {GATEWAY_PATH} HTTP/1.1', 'Host: localhost', f'Authorization: Bearer {token}']
+    if websocket:
+        headers += ['Upgrade: websocket', 'Connection: Upgrade', 'Sec-WebSocket-Version: 13',
+                    f'Sec-WebSocket-Key: {base64.b64encode(os.urandom(16)).decode()}']
+    writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode())
+    await reader.readuntil(b'\r\n\r\n')
+    connected.release()
+    while True:
+        if websocket:
+            first, second = await reader.readexactly(2)
+            length = second & 0x7F
+            if length == 126:
+                length = int.from_bytes(await reader.readexactly(2), 'big')
+            event = json.loads(await reader.readexactly(length))
+            data = event['data'] if event['event'] == 'message' else None
+        else:
+            block = (await reader.readuntil(b'\n\n')).decode()
+            data = json.loads(block.split('data: ', 1)[1]) if 'event: message' in block else None
+        if data:
+            received.append((time.perf_counter(), data['content']))
+
+
+def send_messages(app, pairs, sent_at):
+    with app.app_context():
+        client = app.test_client()
+        headers = {}
+        for seq, (sender, recipient) in enumerate(pairs):
+            headers.setdefault(sender, {'Authorization': f'Bearer {create_token(sender)}'})
+            sent_at[str(seq)] = time.perf_counter()
+            client.post('/api/messaging/messages', headers=headers[sender],
+                        json={'recipient_id': recipient, 'content': str(seq)})
+            time.sleep(0.002)
+
+
+async def main(app, port):
+    rng = random.Random(0)
+    owners = [rng.randint(1, USERS) for _ in range(CLIENTS)]
+    tokens = {}
+    with app.app_context():
+        for user_id in set(owners):
+            tokens[user_id] = create_token(user_id)
+    received, connected = [], asyncio.Semaphore(0)
+
+    before = rss_kb()
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(idle_client(port, tokens[user_id], i % 2 == 0, received, connected))
+             for i, user_id in enumerate(owners)]
+    for _ in range(CLIENTS):
+        await connected.acquire()
+    await asyncio.sleep(0.5)
+    stats = app.extensions['message_gateway'].stats()
+    print(f'{stats["connections"]} idle connections for {stats["users"]} users open in '
+          f'{time.perf_counter() - start:.1f} s, {(rss_kb() - before) / CLIENTS:.1f} KB RSS per connection '
+          f'(client and server side together)')
+
+    online = sorted(set(owners))
+    pairs = [(rng.randint(1, USERS), rng.choice(online)) for _ in range(MESSAGES)]
+    pairs = [(sender, recipient) for sender, recipient in pairs if sender != recipient]
+    sent_at = {}
+    sender = threading.Thread(target=send_messages, args=(app, pairs, sent_at))
+    sender.start()
+    while sender.is_alive():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.5)
+
+    tabs = {user_id: owners.count(user_id) for user_id in online}
+    expected = sum(tabs[recipient] + tabs.get(sender, 0) for sender, recipient in pairs)
+    latencies = sorted((at - sent_at[content]) * 1000 for at, content in received)
+    print(f'{len(pairs)} messages sent, {len(received)} of {expected} deliveries to open tabs; '
+          f'send-to-delivery latency (including the POST) p50 {statistics.median(latencies):.2f} ms, '
+          f'p99 {latencies[int(len(latencies) * 0.99)]:.2f} ms')
+
+    # What the same clients would cost polling instead
+    with app.app_context():
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {tokens[online[0]]}'}
+        start = time.perf_counter()
+        for _ in range(200):
+            client.get('/api/messaging/conversations', headers=headers)
+        per_request = (time.perf_counter() - start) / 200
+    rate = CLIENTS / POLL_INTERVAL_SECONDS
+    print(f'polling every {POLL_INTERVAL_SECONDS} s instead: {rate:.0f} requests/s, '
+          f'~{rate * per_request:.2f} CPU-seconds per second at {per_request * 1000:.2f} ms per request')
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == '__main__':
+    app = create_app('testing')
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'bench_{i}', 'email': f'bench_{i}@example.com', 'password': 'x'}
+            for i in range(1, USERS + 1)
+        ])
+        db.session.commit()
+        port = message_gateway().start('127.0.0.1', 0)
+    try:
+        asyncio.run(main(app, port))
+    finally:
+        app.extensions['message_gateway'].stop()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark: reading a thread page and an inbox page (with unread counts) over 500k messages,
+conversation-partitioned storage and per-user summaries vs the sender/recipient layout of db.sql
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import and_, func, or_  # noqa: E402
+
+from main import create_app  # noqa: E402
+from models.message import Conversation, ConversationSummary, Message  # noqa: E402
+from models.user import User, db  # noqa: E402
+
+USERS = 5000
+CONVERSATIONS = 40000
+MESSAGES = 500000
+UNREAD = 0.05  # The newest messages are still unread
+PER_PAGE = 50
+ITERATIONS = 500
+
+
+def seed(rng):
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'bench_{i}', 'email': f'bench_{i}@example.com', 'password': 'x'} for i in range(1, USERS + 1)
+    ])
+    pairs = set()
+    while len(pairs) < CONVERSATIONS:
+        # A few very active users, like real inboxes
+        first, second = sorted((int(rng.paretovariate(0.6)) % USERS + 1, rng.randint(1, USERS)))
+        if first != second:
+            pairs.add((first, second))
+    pairs = sorted(pairs)
+    db.session.execute(Conversation.__table__.insert(), [
+        {'id': i, 'first_user_id': first, 'second_user_id': second, 'created_at': datetime(2024, 1, 1)}
+        for i, (first, second) in enumerate(pairs, 1)
+    ])
+    base, messages, last = datetime(2024, 1, 1), [], {}
+    # Activity is skewed: a few long-running threads hold most messages
+    weights = [1 / rank for rank in range(1, CONVERSATIONS + 1)]
+    for message_id, conversation_id in enumerate(rng.choices(range(1, CONVERSATIONS + 1), weights, k=MESSAGES), 1):
+        sender, recipient = rng.sample(pairs[conversation_id - 1], 2)
+        created_at = base + timedelta(seconds=message_id * 10)
+        messages.append({'id': message_id, 'conversation_id': conversation_id, 'sender_id': sender,
+                         'recipient_id': recipient, 'content': f'message {message_id}',
+                         'is_read': message_id <= MESSAGES * (1 - UNREAD),
+                         'created_at': created_at})
+        last[conversation_id] = (message_id, created_at)
+    db.session.execute(Message.__table__.insert(), messages)
+    db.session.execute(Conversation.__table__.update().where(Conversation.id == db.bindparam('conversation_id'))
+                       .values(last_message_id=db.bindparam('message_id'), last_message_at=db.bindparam('at')),
+                       [{'conversation_id': c, 'message_id': m, 'at': at} for c, (m, at) in last.items()])
+    # As migration 0013 seeds them
+    for user_column, other_column in [('first_user_id', 'second_user_id'), ('second_user_id', 'first_user_id')]:
+        db.session.execute(db.text(
+            'INSERT INTO conversation_summaries '
+            '(user_id, conversation_id, other_user_id, last_message_id, last_message_at, unread_count) '
+            f'SELECT c.{user_column}, c.id, c.{other_column}, c.last_message_id, c.last_message_at, '
+            '(SELECT count(m.id) FROM messages m WHERE m.conversation_id = c.id '
+            f'AND m.recipient_id = c.{user_column} AND m.is_read = false) '
+            'FROM conversations c WHERE c.last_message_id IS NOT NULL'
+        ))
+    # What the previous inbox read, before migration 0013 dropped them
+    db.session.execute(db.text('CREATE INDEX ix_bench_first_user ON conversations (first_user_id, last_message_at, id)'))
+    db.session.execute(db.text('CREATE INDEX ix_bench_second_user ON conversations (second_user_id, last_message_at, id)'))
+    # The best the db.sql layout can do: one index per direction
+    db.session.execute(db.text('CREATE INDEX ix_bench_sender ON messages (sender_id, recipient_id, created_at)'))
+    db.session.execute(db.text('CREATE INDEX ix_bench_recipient ON messages (recipient_id, sender_id, created_at)'))
+    db.session.commit()
+    return pairs
+
+
+def thread_by_conversation(conversation_id, first, second):
+    return [message_id for message_id, in db.session.query(Message.id).filter_by(conversation_id=conversation_id)
+            .order_by(Message.created_at.desc(), Message.id.desc()).limit(PER_PAGE)]
+
+
+def thread_by_direction(conversation_id, first, second):
+    """Baseline: both directions of the pair, merged and sorted"""
+    return [message_id for message_id, in db.session.query(Message.id).filter(or_(
+        and_(Message.sender_id == first, Message.recipient_id == second),
+        and_(Message.sender_id == second, Message.recipient_id == first)
+    )).order_by(Message.created_at.desc(), Message.id.desc()).limit(PER_PAGE)]
+
+
+def inbox_by_summary(user_id):
+    return [(row.conversation_id, row.unread_count) for row in db.session.query(
+        ConversationSummary.conversation_id, ConversationSummary.unread_count
+    ).filter(ConversationSummary.user_id == user_id).order_by(
+        ConversationSummary.last_message_at.desc(), ConversationSummary.conversation_id.desc()
+    ).limit(20)]
+
+
+def inbox_by_pointer(user_id):
+    """The previous inbox: both pair indexes of conversations, then the page's unread counts"""
+    page = [row.id for row in db.session.query(Conversation.id).filter(
+        or_(Conversation.first_user_id == user_id, Conversation.second_user_id == user_id)
+    ).order_by(Conversation.last_message_at.desc(), Conversation.id.desc()).limit(20)]
+    unread = dict(db.session.query(Message.conversation_id, func.count(Message.id)).filter(
+        Message.conversation_id.in_(page), Message.recipient_id == user_id, Message.is_read.is_(False)
+    ).group_by(Message.conversation_id).all())
+    return [(conversation_id, unread.get(conversation_id, 0)) for conversation_id in page]
+
+
+def inbox_by_group_by(user_id):
+    """Baseline: newest message and unread count per conversation computed from the messages"""
+    latest = db.session.query(
+        Message.conversation_id, func.max(Message.id).label('last_id'),
+        func.sum(db.case((and_(Message.recipient_id == user_id, Message.is_read.is_(False)), 1), else_=0)
+                 ).label('unread')
+    ).filter(
+        or_(Message.sender_id == user_id, Message.recipient_id == user_id)
+    ).group_by(Message.conversation_id).subquery()
+    return [tuple(row) for row in db.session.query(latest.c.conversation_id, latest.c.unread)
+            .order_by(latest.c.last_id.desc()).limit(20)]
+
+
+def mark_read_by_unread_index(conversation_id, user_id):
+    ConversationSummary.mark_read(user_id, conversation_id)
+    db.session.rollback()
+
+
+def mark_read_by_thread_walk(conversation_id, user_id):
+    """Baseline: without the unread index, every message of the thread is visited"""
+    db.session.execute(db.text(
+        'UPDATE messages INDEXED BY ix_messages_conversation_created_at_id SET is_read = 1 '
+        'WHERE conversation_id = :conversation_id AND recipient_id = :user_id AND is_read = 0'
+    ), {'conversation_id': conversation_id, 'user_id': user_id})
+    db.session.rollback()
+
+
+if __name__ == '__main__':
+    app = create_app('testing')
+    with app.app_context():
+        rng = random.Random(0)
+        start = time.perf_counter()
+        pairs = seed(rng)
+        print(f'{MESSAGES} messages in {CONVERSATIONS} conversations seeded in {time.perf_counter() - start:.1f} s')
+        # Threads are opened in proportion to their activity
+        opened = db.session.query(Message.conversation_id).filter(
+            Message.id.in_([rng.randint(1, MESSAGES) for _ in range(ITERATIONS)]))
+        threads = [(i, *pairs[i - 1]) for i, in opened]
+        # Inboxes of the busiest users are the expensive ones
+        inboxes = [pair[0] for pair in rng.sample(pairs[:2000], 100)]
+
+        for title, cases, args in [('thread page', [('conversation index', thread_by_conversation),
+                                                    ('both directions', thread_by_direction)], threads),
+                                   ('inbox page with unread counts', [('summary table', inbox_by_summary),
+                                                                      ('pointer + unread COUNT', inbox_by_pointer),
+                                                                      ('GROUP BY messages', inbox_by_group_by)],
+                                    [(user_id,) for user_id in inboxes]),
+                                   ('mark thread read', [('unread index', mark_read_by_unread_index),
+                                                         ('thread walk', mark_read_by_thread_walk)],
+                                    [(i, first) for i, first, _ in threads])]:
+            print(title)
+            for label, fn in cases:
+                start = time.perf_counter()
+                results = [fn(*arg) for arg in args]
+                elapsed = (time.perf_counter() - start) / len(args) * 1000
+                print(f'  {label:22s} {elapsed:8.3f} ms each')
+                if fn is cases[0][1]:
+                    expected = results
+                else:
+                    assert results == expected
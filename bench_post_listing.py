@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ORM + to_dict listing vs projection rows + direct JSON at per_page=50
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import desc  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from main import create_app  # noqa: E402
+from models.post import Post, POST_LISTING_COLUMNS, post_rows_to_json  # noqa: E402
+from models.user import User, db  # noqa: E402
+
+PER_PAGE = 50
+ITERATIONS = 500
+
+
+def seed(authors=200, posts=5000):
+    for i in range(authors):
+        db.session.add(User(username=f'bench_{i}', email=f'bench_{i}@example.com', password='x',
+                            first_name='Bench', last_name=f'User {i}'))
+    db.session.commit()
+    base = datetime(2024, 1, 1)
+    for i in range(posts):
+        post = Post(i % authors + 1, f'Benchmark post {i} ' + 'lorem ipsum ' * 20, category=f'cat{i % 10}')
+        post.created_at = base + timedelta(minutes=i)
+        db.session.add(post)
+    db.session.commit()
+
+
+def orm_page():
+    posts = (Post.query.join(User).options(joinedload(Post.user))
+             .order_by(desc(Post.created_at), desc(Post.id)).limit(PER_PAGE).all())
+    body = json.dumps({'posts': [post.to_dict() for post in posts]}).encode('utf-8')
+    db.session.expunge_all()
+    return body
+
+
+def projection_page():
+    rows = (db.session.query(*POST_LISTING_COLUMNS).select_from(Post).join(User)
+            .order_by(desc(Post.created_at), desc(Post.id)).limit(PER_PAGE).all())
+    return b'{"posts":' + post_rows_to_json(rows) + b'}'
+
+
+def timed(fn):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+if __name__ == '__main__':
+    app = create_app('testing')
+    with app.app_context():
+        seed()
+        assert json.loads(orm_page()) == json.loads(projection_page())
+        orm_ms = timed(orm_page)
+        projection_ms = timed(projection_page)
+        print(f'per_page={PER_PAGE}, {ITERATIONS} iterations')
+        print(f'ORM + to_dict:        {orm_ms:.3f} ms/page')
+        print(f'projection + JSON:    {projection_ms:.3f} ms/page')
+        print(f'speedup:              {orm_ms / projection_ms:.2f}x')
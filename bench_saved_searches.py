@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: matching a new job against 100k saved searches, percolator candidates vs checking every search
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from main import create_app  # noqa: E402
+from models.job import Company, Job, SavedJobSearch, SavedSearchKey, JOB_TYPES  # noqa: E402
+from models.user import User, db  # noqa: E402
+from utils.percolator import anchor_keys, job_words, percolate, search_matches  # noqa: E402
+
+SEARCHES = 100000
+USERS = 20000
+COMPANIES = 200
+LOCATIONS = [f'City {i}' for i in range(200)] + ['Remote']
+# A long tail of words, so searches and jobs share a realistic, not total, vocabulary
+WORDS = [f'{stem}{i}' for stem in ('dev', 'data', 'ops', 'sales', 'design', 'lead', 'cloud', 'mobile')
+         for i in range(150)]
+JOBS = 50
+
+
+def seed(rng):
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'bench_{i}', 'email': f'bench_{i}@example.com', 'password': 'x'} for i in range(1, USERS + 1)
+    ])
+    db.session.execute(Company.__table__.insert(), [{'user_id': 1, 'name': f'Company {i}'} for i in range(COMPANIES)])
+    searches, keys = [], []
+    for search_id in range(1, SEARCHES + 1):
+        # Most alerts are keyword searches, some only filter
+        search = ' '.join(rng.sample(WORDS, rng.randint(1, 2))) if rng.random() < 0.9 else ''
+        filters = {}
+        if rng.random() < 0.5:
+            filters['job_type'] = [rng.choice(JOB_TYPES)]
+        if rng.random() < 0.3 or not search and not filters:
+            filters['location'] = [rng.choice(LOCATIONS)]
+        searches.append({'id': search_id, 'user_id': rng.randint(2, USERS), 'name': 'alert', 'search': search,
+                         'filters': json.dumps(filters)})
+        keys += [{'key': key, 'saved_search_id': search_id}
+                 for key in anchor_keys(search, {f: set(v) for f, v in filters.items()})]
+    db.session.execute(SavedJobSearch.__table__.insert(), searches)
+    db.session.execute(SavedSearchKey.__table__.insert(), keys)
+    db.session.commit()
+
+
+def check_everything(job):
+    """Baseline: evaluate every saved search against the job"""
+    words = job_words(job)
+    return sorted((search_id, user_id) for search_id, user_id, search, filters in db.session.query(
+        SavedJobSearch.id, SavedJobSearch.user_id, SavedJobSearch.search, SavedJobSearch.filters
+    ) if search_matches(search, SavedJobSearch.parse_filters(filters), job, words))
+
+
+if __name__ == '__main__':
+    app = create_app('testing')
+    with app.app_context():
+        rng = random.Random(0)
+        start = time.perf_counter()
+        seed(rng)
+        print(f'{SEARCHES} saved searches seeded in {time.perf_counter() - start:.1f} s')
+        jobs = [Job(id=i, company_id=rng.randint(1, COMPANIES), title=' '.join(rng.sample(WORDS, 3)),
+                    description=' '.join(rng.choice(WORDS) for _ in range(80)), location=rng.choice(LOCATIONS),
+                    job_type=rng.choice(JOB_TYPES), status='open') for i in range(1, JOBS + 1)]
+
+        for label, fn in [('percolator candidates', percolate), ('check every search', check_everything)]:
+            start = time.perf_counter()
+            matches = [fn(job) for job in jobs]
+            elapsed = (time.perf_counter() - start) / JOBS * 1000
+            print(f'  {label:24s} {elapsed:8.2f} ms per job  ({sum(map(len, matches)) / JOBS:.1f} matches per job)')
+            if label == 'percolator candidates':
+                expected = matches
+            else:
+                assert matches == expected
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: skill matching with sparse TF-IDF matrices, batched vs one query at a time,
+and an incremental skills edit vs rebuilding the matcher
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+
+from utils.skill_match import SkillMatcher  # noqa: E402
+
+USERS = 100000
+JOBS = 50000
+SKILLS = 2000
+WORDS = ['team', 'fast', 'paced', 'remote', 'growth', 'product', 'customers', 'build', 'scale', 'own']
+BATCH = 1000
+LIMIT = 10
+
+
+def skill_name(n):
+    # Most skills are one word; every tenth is a two-word phrase
+    return f'applied tech{n}' if n % 10 == 0 else f'tech{n}'
+
+
+def skill_names(rng):
+    # Zipf-ish popularity: a few skills everybody lists, a long tail of niche ones
+    return [skill_name(min(int(rng.paretovariate(0.8)), SKILLS)) if rng.random() < 0.7 else
+            skill_name(rng.randint(1, SKILLS)) for _ in range(rng.randint(3, 12))]
+
+
+def job_description(rng):
+    words = [rng.choice(WORDS) for _ in range(60)]
+    for skill in skill_names(rng):
+        words.insert(rng.randrange(len(words)), skill)
+    return ' '.join(words)
+
+
+if __name__ == '__main__':
+    rng = random.Random(0)
+    users = [(i, skill_names(rng), rng.random() < 0.9) for i in range(1, USERS + 1)]
+    jobs = [(i, job_description(rng), rng.random() < 0.8) for i in range(1, JOBS + 1)]
+
+    start = time.perf_counter()
+    matcher = SkillMatcher(jobs, users)
+    build = time.perf_counter() - start
+    print(f'{USERS} users, {JOBS} jobs, {len(matcher.terms)} terms: built in {build:.2f} s '
+          f'({matcher.jobs.nnz} job and {matcher.users.nnz} user nonzeros)')
+
+    user_ids = rng.sample(range(1, USERS + 1), BATCH)
+    start = time.perf_counter()
+    batched = matcher.top_jobs(user_ids, LIMIT)
+    per_user = (time.perf_counter() - start) / BATCH * 1000
+    print(f'  top jobs, batch of {BATCH}:       {per_user:8.3f} ms per user')
+
+    start = time.perf_counter()
+    single = [matcher.top_jobs([user_id], LIMIT)[0] for user_id in user_ids[:100]]
+    print(f'  top jobs, one at a time:      {(time.perf_counter() - start) / 100 * 1000:8.3f} ms per user')
+    assert single == batched[:100]
+
+    job_rows = [matcher.job_row(job_id) for job_id in rng.sample(range(1, JOBS + 1), 200)]
+    start = time.perf_counter()
+    matcher.top_candidates(job_rows, LIMIT)
+    print(f'  top candidates, batch of 200: {(time.perf_counter() - start) / 200 * 1000:8.3f} ms per job')
+
+    start = time.perf_counter()
+    for user_id in rng.sample(range(1, USERS + 1), 200):
+        matcher.update_user(user_id, skill_names(rng))
+    print(f'  skills edit (overlay):        {(time.perf_counter() - start) / 200 * 1000:8.3f} ms '
+          f'vs {build * 1000:.0f} ms to rebuild')
+    start = time.perf_counter()
+    matcher.top_jobs(user_ids, LIMIT)
+    print(f'  top jobs with 200 edits:      {(time.perf_counter() - start) / BATCH * 1000:8.3f} ms per user')
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: message sends per second from concurrent senders on a file-backed SQLite database,
+one commit per request vs group commit through the write queue
+"""
+
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from config import TestingConfig  # noqa: E402
+from main import create_app  # noqa: E402
+from models.message import Message  # noqa: E402
+from models.user import User, db  # noqa: E402
+from utils.jwt_utils import create_token  # noqa: E402
+
+USERS = 200
+SENDERS = [1, 8, 32, 64]
+MESSAGES_PER_SENDER = 40
+
+
+def commit_cost_ms(path, commits=200):
+    """What one small commit costs on this disk, for reading the numbers below"""
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE scratch (x INTEGER)')
+    began = time.perf_counter()
+    for _ in range(commits):
+        connection.execute('INSERT INTO scratch VALUES (1)')
+        connection.commit()
+    elapsed = (time.perf_counter() - began) / commits * 1000
+    connection.close()
+    return elapsed
+
+
+def run(app, senders, headers):
+    latencies, failures = [], []
+    start = threading.Barrier(senders + 1)
+
+    def send(n):
+        client = app.test_client()
+        sender, mine = n % USERS + 1, []
+        start.wait()
+        for i in range(MESSAGES_PER_SENDER):
+            began = time.perf_counter()
+            response = client.post('/api/messaging/messages', headers=headers[sender],
+                                   json={'recipient_id': (sender + i) % USERS + 1, 'content': f'{n}:{i}'})
+            mine.append((time.perf_counter() - began) * 1000)
+            if response.status_code != 201:
+                failures.append(response.status_code)
+        latencies.extend(mine)
+
+    threads = [threading.Thread(target=send, args=(n,)) for n in range(senders)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    latencies.sort()
+    return len(latencies) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)], failures
+
+
+if __name__ == '__main__':
+    directory = tempfile.mkdtemp()
+    TestingConfig.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    app = create_app('testing')
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'bench_{i}', 'email': f'bench_{i}@example.com', 'password': 'x'}
+            for i in range(1, USERS + 1)
+        ])
+        db.session.commit()
+        headers = {i: {'Authorization': f'Bearer {create_token(i)}'} for i in range(1, USERS + 1)}
+
+    queue = app.extensions['write_queue']
+    failed = 0
+    print(f'{MESSAGES_PER_SENDER} messages per sender, file-backed SQLite (journal_mode=delete, synchronous=full), '
+          f'{commit_cost_ms(os.path.join(directory, "scratch.db")):.2f} ms per bare commit on this disk')
+    for senders in SENDERS:
+        for label, enabled in [('commit per request', False), ('group commit', True)]:
+            queue.enabled = enabled
+            batches, writes = queue.batches, queue.writes
+            rate, p50, p99, failures = run(app, senders, headers)
+            failed += len(failures)
+            batched = (f', {(queue.writes - writes) / max(1, queue.batches - batches):.1f} writes per commit'
+                      if enabled else '')
+            print(f'  {senders:3d} senders  {label:18s} {rate:7.0f} sends/s  p50 {p50:6.2f} ms  '
+                  f'p99 {p99:7.2f} ms{batched}' + (f'  {len(failures)} failed' if failures else ''))
+    with app.app_context():
+        assert db.session.query(Message).count() == sum(SENDERS) * MESSAGES_PER_SENDER * 2 - failed
@@ -0,0 +1,50 @@
+"""
+Shared pytest fixtures for the in-process backend tests
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+# Keep main.py's module-level app off the development database
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from main import create_app  # noqa: E402
+from models.user import User, db  # noqa: E402
+from utils.jwt_utils import create_token  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create a user and return its id"""
+    def _make_user(username, **fields):
+        user = User(username=username, email=f'{username}@example.com', password='not-a-hash', **fields)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+    return _make_user
+
+
+@pytest.fixture
+def auth_headers(app):
+    def _auth_headers(user_id):
+        return {'Authorization': f'Bearer {create_token(user_id)}'}
+    return _auth_headers
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-memory follow graph and /api/connections/suggestions
+"""
+
+import random
+from collections import Counter
+
+import pytest
+from flask import current_app
+
+import utils.follow_graph as follow_graph_module
+from models.connection import UserConnection, CONNECTION_ACCEPTED
+from models.counters import ChangeCounter
+from models.user import db
+from utils.follow_graph import FollowGraph, FOLLOW_GRAPH_VERSION
+
+
+def brute_force(edges, user_id, limit, exclude=()):
+    following = {t for s, t in edges if s == user_id}
+    counts = Counter(t for s, t in edges if s in following)
+    for skip in following | {user_id} | set(exclude):
+        counts.pop(skip, None)
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def random_edges(rng, users=60, count=600):
+    return {(rng.randint(1, users), rng.randint(1, users)) for _ in range(count)} - {(u, u) for u in range(users + 1)}
+
+
+def test_suggestions_match_brute_force():
+    rng = random.Random(3)
+    edges = random_edges(rng)
+    sources, targets = zip(*edges)
+    graph = FollowGraph(sources, targets)
+    assert graph.edge_count == len(edges)
+    for user_id in range(1, 61):
+        assert graph.suggestions(user_id, limit=5, exclude=[7]) == brute_force(edges, user_id, 5, exclude=[7])
+
+
+@pytest.mark.parametrize('compact_min', [1024, 1])
+def test_incremental_updates_and_compaction(monkeypatch, compact_min):
+    monkeypatch.setattr(follow_graph_module, 'COMPACT_MIN_EDGES', compact_min)
+    rng = random.Random(5)
+    edges = random_edges(rng)
+    sources, targets = zip(*edges)
+    graph = FollowGraph(sources, targets)
+
+    for _ in range(200):
+        edge = (rng.randint(1, 60), rng.randint(1, 60))
+        if edge[0] == edge[1]:
+            continue
+        if edge in edges and rng.random() < 0.5:
+            graph.remove_edge(*edge)
+            edges.discard(edge)
+        else:
+            graph.add_edge(*edge)
+            edges.add(edge)
+
+    assert graph.edge_count == len(edges)
+    for user_id in range(1, 61):
+        assert graph.following(user_id).tolist() == sorted(t for s, t in edges if s == user_id)
+        assert graph.suggestions(user_id, limit=8) == brute_force(edges, user_id, 8)
+
+
+@pytest.fixture
+def network(client, make_user, auth_headers):
+    users = {name: make_user(f'graph_{name}') for name in ('ann', 'ben', 'cat', 'dan', 'eve', 'fay')}
+    headers = {name: auth_headers(user_id) for name, user_id in users.items()}
+
+    def follow(follower, following):
+        client.post(f'/api/connections/{users[following]}', headers=headers[follower])
+        client.post(f'/api/connections/{users[follower]}/accept', headers=headers[following])
+
+    for follower, following in [('ann', 'ben'), ('ann', 'cat'), ('ben', 'dan'), ('cat', 'dan'),
+                                ('cat', 'eve'), ('ben', 'fay')]:
+        follow(follower, following)
+    return users, headers, follow
+
+
+def suggested(client, headers):
+    response = client.get('/api/connections/suggestions', headers=headers)
+    assert response.status_code == 200
+    return [(s['user']['username'], s['mutual_connections']) for s in response.get_json()['suggestions']]
+
+
+def test_suggestions_endpoint_ranks_by_mutual_connections(client, network):
+    users, headers, follow = network
+    assert suggested(client, headers['ann']) == [('graph_dan', 2), ('graph_eve', 1), ('graph_fay', 1)]
+
+    # A pending request hides the suggestion; accepting it removes it for good
+    client.post(f'/api/connections/{users["eve"]}', headers=headers['ann'])
+    assert suggested(client, headers['ann']) == [('graph_dan', 2), ('graph_fay', 1)]
+
+    # Later follows are applied to the loaded graph without a reload
+    graph = current_app.extensions['follow_graph'].graph
+    follow('ben', 'eve')
+    assert suggested(client, headers['ann']) == [('graph_dan', 2), ('graph_fay', 1)]
+    follow('cat', 'fay')
+    client.delete(f'/api/connections/{users["dan"]}', headers=headers['cat'])
+    assert suggested(client, headers['ann']) == [('graph_fay', 2), ('graph_dan', 1)]
+    assert current_app.extensions['follow_graph'].graph is graph
+
+
+def test_graph_reloads_after_changes_from_another_process(client, network):
+    users, headers, _ = network
+    suggested(client, headers['ann'])
+    # Written behind this process's back, as another worker would
+    db.session.add(UserConnection(users['ben'], users['eve'], CONNECTION_ACCEPTED))
+    db.session.add(UserConnection(users['cat'], users['fay'], CONNECTION_ACCEPTED))
+    ChangeCounter.bump(FOLLOW_GRAPH_VERSION)
+    db.session.commit()
+
+    assert suggested(client, headers['ann']) == [('graph_dan', 2), ('graph_eve', 2), ('graph_fay', 2)]
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for ETag / conditional GET on listing and profile endpoints
+"""
+
+import pytest
+
+from models.counters import ChangeCounter
+from models.post import POSTS_VERSION
+from models.user import User, db
+
+
+def get(client, url, headers, etag=None):
+    if etag:
+        headers = {**headers, 'If-None-Match': etag}
+    return client.get(url, headers=headers)
+
+
+@pytest.mark.parametrize('url', ['/api/posts', '/api/posts?category=x&per_page=5', '/api/posts/categories'])
+def test_listing_revalidates_until_posts_change(client, make_user, auth_headers, url):
+    headers = auth_headers(make_user('etag_lister'))
+    first = get(client, url, headers)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/')
+
+    cached = get(client, url, headers, etag)
+    assert cached.status_code == 304
+    assert cached.get_data() == b''
+
+    client.post('/api/posts', headers=headers, json={'content': 'new', 'category': 'x'})
+    changed = get(client, url, headers, etag)
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_etag_depends_on_query_parameters(client, make_user, auth_headers):
+    headers = auth_headers(make_user('etag_params'))
+    etag = get(client, '/api/posts?per_page=5', headers).headers['ETag']
+    assert get(client, '/api/posts?per_page=6', headers, etag).status_code == 200
+
+
+def test_author_rename_invalidates_listing(client, make_user, auth_headers):
+    user_id = make_user('etag_author')
+    headers = auth_headers(user_id)
+    client.post('/api/posts', headers=headers, json={'content': 'hello'})
+    etag = get(client, '/api/posts', headers).headers['ETag']
+
+    # Unrelated profile fields keep the listing ETag valid
+    client.put('/api/profile', headers=headers, json={'bio': 'hi'})
+    assert get(client, '/api/posts', headers, etag).status_code == 304
+
+    client.put('/api/profile', headers=headers, json={'first_name': 'Renamed'})
+    assert get(client, '/api/posts', headers, etag).status_code == 200
+
+
+def test_likes_leave_listing_valid_until_the_staleness_bucket_moves(client, make_user, auth_headers, monkeypatch):
+    headers = auth_headers(make_user('etag_liker'))
+    post_id = client.post('/api/posts', headers=headers, json={'content': 'hello'}).get_json()['post']['id']
+    etag = get(client, '/api/posts', headers).headers['ETag']
+    client.post(f'/api/posts/{post_id}/like', headers=headers)
+    assert get(client, '/api/posts', headers, etag).status_code == 304
+    assert ChangeCounter.current(POSTS_VERSION) == (1,)
+
+    monkeypatch.setattr('api.posts.staleness_bucket', lambda: -1)
+    refreshed = get(client, '/api/posts', headers, etag)
+    assert refreshed.status_code == 200 and refreshed.get_json()['posts'][0]['likes_count'] == 1
+
+
+def test_profile_etag_follows_every_update(client, make_user, auth_headers):
+    user_id = make_user('etag_profile')
+    headers = auth_headers(user_id)
+    etag = get(client, '/api/profile', headers).headers['ETag']
+    assert get(client, '/api/profile', headers, etag).status_code == 304
+
+    # Two updates in the same second still produce distinct versions
+    client.put('/api/profile', headers=headers, json={'bio': 'one'})
+    second = get(client, '/api/profile', headers, etag)
+    assert second.status_code == 200
+    client.put('/api/profile', headers=headers, json={'bio': 'two'})
+    assert get(client, '/api/profile', headers, second.headers['ETag']).status_code == 200
+    assert db.session.get(User, user_id).version == 2
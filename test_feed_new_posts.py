@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for /api/feed/new (new posts since a cursor, long-poll and SSE)
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from models.post import Post
+from models.user import db
+from utils.pubsub import PubSub
+from utils.timeline import fan_out_post, publish_new_post
+
+
+@pytest.fixture
+def people(client, make_user, auth_headers):
+    ids = {name: make_user(f'new_{name}') for name in ('author', 'reader', 'stranger')}
+    headers = {name: auth_headers(user_id) for name, user_id in ids.items()}
+    client.post(f'/api/connections/{ids["author"]}', headers=headers['reader'])
+    client.post(f'/api/connections/{ids["reader"]}/accept', headers=headers['author'])
+    return ids, headers
+
+
+def newest_cursor(client, headers):
+    return client.get('/api/feed', headers=headers).get_json()['pagination']['newest_cursor']
+
+
+def post(client, headers, content, **fields):
+    return client.post('/api/posts', headers=headers, json={'content': content, **fields}).get_json()['post']['id']
+
+
+def test_returns_ids_or_count_of_newer_posts(client, people):
+    _, headers = people
+    post(client, headers['author'], 'seen')
+    since = newest_cursor(client, headers['reader'])
+
+    body = client.get(f'/api/feed/new?since={since}', headers=headers['reader']).get_json()
+    assert body == {'count': 0, 'has_more': False, 'cursor': since, 'post_ids': []}
+
+    first = post(client, headers['author'], 'one')
+    post(client, headers['stranger'], 'not followed')
+    post(client, headers['author'], 'only me', visibility='private')
+    second = post(client, headers['author'], 'two')
+    body = client.get(f'/api/feed/new?since={since}', headers=headers['reader']).get_json()
+    assert body['post_ids'] == [second, first]
+    assert body['cursor'] == newest_cursor(client, headers['reader'])
+
+    body = client.get(f'/api/feed/new?since={since}&count_only=true', headers=headers['reader']).get_json()
+    assert body == {'count': 2, 'has_more': False, 'cursor': body['cursor']}
+
+    assert client.get('/api/feed/new', headers=headers['reader']).status_code == 400
+    assert client.get('/api/feed/new?since=bogus', headers=headers['reader']).status_code == 400
+
+
+def test_limit_sets_has_more(app, client, people):
+    app.config['FEED_NEW_POSTS_LIMIT'] = 2
+    _, headers = people
+    post(client, headers['author'], 'seen')
+    since = newest_cursor(client, headers['reader'])
+    ids = [post(client, headers['author'], f'post {i}') for i in range(3)]
+    body = client.get(f'/api/feed/new?since={since}', headers=headers['reader']).get_json()
+    assert body['post_ids'] == ids[:0:-1] and body['has_more']
+
+
+def create_later(app, author_id, content, delay=0.2):
+    """Create and publish a post from another thread, as a concurrent request would"""
+    def run():
+        time.sleep(delay)
+        with app.app_context():
+            new_post = Post(author_id, content)
+            db.session.add(new_post)
+            db.session.flush()
+            fan_out_post(new_post)
+            db.session.commit()
+            db.session.refresh(new_post)
+            # Done with the shared test connection before the reader wakes up
+            db.session.remove()
+            publish_new_post(new_post)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_long_poll_wakes_on_a_relevant_post_only(app, client, people):
+    ids, headers = people
+    post(client, headers['author'], 'seen')
+    since = newest_cursor(client, headers['reader'])
+
+    thread = create_later(app, ids['stranger'], 'not followed')
+    start = time.monotonic()
+    body = client.get(f'/api/feed/new?since={since}&wait=0.6', headers=headers['reader']).get_json()
+    thread.join()
+    assert body['post_ids'] == [] and time.monotonic() - start >= 0.6
+
+    thread = create_later(app, ids['author'], 'followed')
+    start = time.monotonic()
+    body = client.get(f'/api/feed/new?since={since}&wait=10', headers=headers['reader']).get_json()
+    thread.join()
+    assert body['count'] == 1 and time.monotonic() - start < 5
+
+
+def test_sse_stream_sends_events_and_closes_its_subscription(app, client, people):
+    ids, headers = people
+    post(client, headers['author'], 'seen')
+    since = newest_cursor(client, headers['reader'])
+    first = post(client, headers['author'], 'already there')
+
+    response = client.get(f'/api/feed/new?since={since}&stream=sse', headers=headers['reader'], buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    event = next(chunks).decode()
+    assert event.startswith('id: ') and '\nevent: new_posts\n' in event
+    assert json.loads(event.split('data: ')[1])['post_ids'] == [first]
+
+    thread = create_later(app, ids['author'], 'live')
+    event = next(chunks).decode()
+    thread.join()
+    assert json.loads(event.split('data: ')[1])['count'] == 1
+    response.close()
+    assert app.extensions['pubsub'].stats()['subscriptions'] == 0
+
+
+def test_waiters_over_the_cap_are_answered_without_holding_a_thread(app, client, people):
+    ids, headers = people
+    post(client, headers['author'], 'seen')
+    since = newest_cursor(client, headers['reader'])
+    first = post(client, headers['author'], 'already there')
+    app.config['FEED_MAX_WAITERS'] = 1
+
+    # One stream takes the only slot
+    stream = client.get(f'/api/feed/new?since={since}&stream=sse', headers=headers['reader'], buffered=False)
+    next(iter(stream.response))
+
+    start = time.monotonic()
+    response = client.get(f'/api/feed/new?since={newest_cursor(client, headers["reader"])}&wait=10',
+                          headers=headers['reader'])
+    assert time.monotonic() - start < 5
+    assert response.headers['Retry-After'] == '5' and response.get_json()['count'] == 0
+
+    refused = client.get(f'/api/feed/new?since={since}&stream=sse', headers=headers['reader'])
+    events = refused.get_data(as_text=True).split('\n\n')
+    assert events[0] == 'retry: 5000' and json.loads(events[1].split('data: ')[1])['post_ids'] == [first]
+
+    stream.close()
+    response = client.get(f'/api/feed/new?since={since}&wait=1', headers=headers['reader'])
+    assert response.get_json()['count'] == 1 and 'Retry-After' not in response.headers
+    assert app.extensions['pubsub'].stats()['subscriptions'] == 0
+
+
+def test_pubsub_subscription_overflow():
+    broker = PubSub()
+    with broker.subscribe('channel', queue_size=2) as subscription:
+        assert broker.publish('other', 1) == 0
+        for message in range(3):
+            assert broker.publish('channel', message) == 1
+        assert subscription.get(timeout=0) == [1, 2] and subscription.overflowed
+        assert subscription.get(timeout=0.01) == []
+    assert broker.stats()['subscriptions'] == 0
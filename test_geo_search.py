@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script for geo search: write-time geocoding and nearby jobs and profiles over the geohash index
+"""
+
+import math
+import os
+import random
+
+import pytest
+from sqlalchemy import event
+
+from models.geo import GazetteerPlace
+from models.job import Job
+from models.user import User, db
+
+GAZETTEER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend', 'data', 'gazetteer_cities.tsv')
+LOCATIONS = ['San Francisco', 'Oakland, CA', 'Berkeley', 'Palo Alto', 'Mountain View', 'San Jose', 'Los Angeles',
+             'Berlin', 'Potsdam', 'München', 'Paris', 'Paris, TX', 'London', 'London, Canada', 'Auckland',
+             'Remote', 'Atlantis']
+
+
+@pytest.fixture
+def gazetteer(app):
+    GazetteerPlace.load_geonames(GAZETTEER)
+
+
+@pytest.fixture
+def employer(client, make_user, auth_headers, gazetteer):
+    headers = auth_headers(make_user('employer'))
+    company_id = client.post('/api/companies', headers=headers, json={'name': 'Acme'}).get_json()['company']['id']
+    return headers, company_id
+
+
+def post_job(client, employer, location, **fields):
+    headers, company_id = employer
+    job = {'company_id': company_id, 'title': 'Engineer', 'description': 'Build things', 'location': location,
+           'job_type': 'full-time', **fields}
+    return client.post('/api/jobs', headers=headers, json=job).get_json()['job']['id']
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+         math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * 6371.0088 * math.asin(math.sqrt(a))
+
+
+def all_pages(client, url, headers, key):
+    results, cursor = [], None
+    while True:
+        response = client.get(url + (f'&cursor={cursor}' if cursor else ''), headers=headers)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        results += [(item['id'], item['distance_km']) for item in body[key]]
+        cursor = body['pagination']['next_cursor']
+        if not cursor:
+            return results
+
+
+def test_nearby_jobs_match_a_brute_force_scan(client, employer, auth_headers, make_user):
+    rng = random.Random(5)
+    for _ in range(80):
+        post_job(client, employer, rng.choice(LOCATIONS), status=rng.choice(['open', 'open', 'open', 'closed']))
+    headers = auth_headers(make_user('seeker'))
+    jobs = [(job.id, job.latitude, job.longitude) for job in Job.query.filter_by(status='open') if job.geohash]
+
+    def expected(lat, lon, inside):
+        found = [(job_id, haversine(lat, lon, jlat, jlon)) for job_id, jlat, jlon in jobs if inside(jlat, jlon)]
+        return sorted(found, key=lambda item: (item[1], item[0]))
+
+    searches = [
+        ('lat=37.77&lon=-122.42&radius_km=60', 37.77, -122.42, None),
+        ('lat=52.5&lon=13.4&radius_km=40', 52.5, 13.4, None),
+        ('lat=37.77&lon=-122.42&radius_km=500', 37.77, -122.42, None),
+        ('near=Paris%2C%20TX&radius_km=5', 33.66094, -95.55551, None),
+        ('bbox=-123,37,-121.5,38&lat=37.4&lon=-122.1', 37.4, -122.1,
+         lambda lat, lon: 37 <= lat <= 38 and -123 <= lon <= -121.5),
+        ('bbox=170,-50,-170,-30', -40, 180, lambda lat, lon: -50 <= lat <= -30 and (lon >= 170 or lon <= -170)),
+    ]
+    for query, lat, lon, inside in searches:
+        radius = float(query.split('radius_km=')[1]) if 'radius_km' in query else None
+        want = expected(lat, lon, inside or (lambda jlat, jlon: haversine(lat, lon, jlat, jlon) <= radius))
+        got = all_pages(client, f'/api/jobs/nearby?per_page=7&{query}', headers, 'jobs')
+        assert [job_id for job_id, _ in got] == [job_id for job_id, _ in want], query
+        assert all(abs(distance - round(km, 2)) < 0.011 for (_, distance), (_, km) in zip(got, want))
+        assert want, query
+
+
+def test_nearby_search_reads_only_the_covering_cells(client, employer, auth_headers, make_user):
+    for location in ['San Francisco', 'Oakland', 'Berlin', 'Tokyo', 'Sydney'] * 5:
+        post_job(client, employer, location)
+    headers = auth_headers(make_user('seeker'))
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'geohash >=' in statement:
+            statements.append((statement, parameters))
+
+    def nearby(query):
+        statements.clear()
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            return client.get(f'/api/jobs/nearby?{query}', headers=headers).get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+    body = nearby('lat=37.8&lon=-122.3&radius_km=30')
+    assert len(body['jobs']) == 10
+    # The circle grew ring by ring until the whole Bay Area was in it
+    assert len(statements) > 1
+    with db.engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = ' '.join(str(row[-1]) for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}',
+                                                                              parameters))
+            assert 'ix_jobs_status_geohash' in plan and 'SCAN jobs' not in plan
+        read = connection.exec_driver_sql(*statements[-1]).fetchall()
+    # Only the Bay Area rows come back from the index; nothing from the other continents
+    assert len(read) == 10
+
+    # Five jobs sit right at the center, so the first ring already holds a page and one more
+    body = nearby('near=Oakland&radius_km=30&per_page=3')
+    assert [job['distance_km'] for job in body['jobs']] == [0, 0, 0] and body['pagination']['has_next']
+    assert len(statements) == 1
+
+
+def test_geocoding_disambiguates_and_follows_edits(client, make_user, auth_headers, gazetteer):
+    places = {
+        'Paris': (48.85, 2.35), 'Paris, TX': (33.66, -95.56), 'Paris, Texas, USA': (33.66, -95.56),
+        'London, Canada': (42.98, -81.23), 'London': (51.51, -0.13), 'Cambridge, MA': (42.38, -71.11),
+        'Cambridge, UK': (52.2, 0.12), 'München': (48.14, 11.58), 'Portland, ME': (43.66, -70.26),
+        'portland': (45.52, -122.68), 'Remote': None, '': None,
+    }
+    for i, (location, point) in enumerate(places.items()):
+        user = db.session.get(User, make_user(f'user{i}', location=location))
+        if point is None:
+            assert user.geohash is None and user.latitude is None, location
+        else:
+            assert abs(user.latitude - point[0]) < 0.02 and abs(user.longitude - point[1]) < 0.02, location
+
+    me = make_user('oakland', location='Oakland')
+    headers = auth_headers(me)
+    berkeley = make_user('berkeley', location='Berkeley')
+    make_user('private', location='Oakland', is_public=False)
+    make_user('berlin', location='Berlin')
+    users = client.get('/api/profile/nearby', headers=headers).get_json()['users']
+    assert [user['username'] for user in users] == ['berkeley']
+    assert 'latitude' not in users[0] and 0 < users[0]['distance_km'] < 15
+
+    # Moving re-geocodes: the Berkeley user is now near Berlin, and nobody is near Oakland
+    client.put('/api/profile', headers=auth_headers(berkeley), json={'location': 'Potsdam'})
+    assert client.get('/api/profile/nearby', headers=headers).get_json()['users'] == []
+    users = client.get('/api/profile/nearby?near=Berlin&radius_km=50', headers=headers).get_json()['users']
+    assert [user['username'] for user in users] == ['berlin', 'berkeley']
+
+    client.put('/api/profile', headers=headers, json={'location': 'Remote'})
+    assert client.get('/api/profile/nearby', headers=headers).status_code == 400
+    for query in ['near=Atlantis', 'lat=91&lon=0', 'lat=1', 'radius_km=900&lat=0&lon=0', 'bbox=1,2,3',
+                  'bbox=0,10,1,5', 'lat=0&lon=0&cursor=nonsense']:
+        assert client.get(f'/api/profile/nearby?{query}', headers=headers).status_code == 400, query
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test script for the fan-out-on-write home timeline and the follow graph
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.post import Post
+from models.timeline import TimelineEntry
+from models.user import db
+from utils.timeline import fan_out_post
+
+
+@pytest.fixture
+def users(make_user, auth_headers):
+    ids = {name: make_user(f'feed_{name}') for name in ('alice', 'bob', 'carol')}
+    return {name: (user_id, auth_headers(user_id)) for name, user_id in ids.items()}
+
+
+def follow(client, follower, author):
+    follower_id, follower_headers = follower
+    author_id, author_headers = author
+    assert client.post(f'/api/connections/{author_id}', headers=follower_headers).status_code == 201
+    assert client.post(f'/api/connections/{follower_id}/accept', headers=author_headers).status_code == 200
+
+
+def post(client, author, content, **fields):
+    response = client.post('/api/posts', headers=author[1], json={'content': content, **fields})
+    assert response.status_code == 201
+    return response.get_json()['post']['id']
+
+
+def feed_ids(client, viewer, **params):
+    response = client.get('/api/feed', headers=viewer[1], query_string=params)
+    assert response.status_code == 200
+    return [p['id'] for p in response.get_json()['posts']]
+
+
+def test_posts_fan_out_to_accepted_followers_only(client, users):
+    alice, bob, carol = users['alice'], users['bob'], users['carol']
+    follow(client, bob, alice)
+    # carol's request is never accepted
+    client.post(f'/api/connections/{alice[0]}', headers=carol[1])
+
+    first = post(client, alice, 'hello followers')
+    second = post(client, alice, 'only me', visibility='private')
+
+    assert feed_ids(client, alice) == [second, first]
+    assert feed_ids(client, bob) == [first]
+    assert feed_ids(client, carol) == []
+
+
+def test_accept_backfills_and_unfollow_removes(client, users):
+    alice, bob = users['alice'], users['bob']
+    earlier = post(client, alice, 'before the follow')
+    assert feed_ids(client, bob) == []
+
+    follow(client, bob, alice)
+    own = post(client, bob, 'my own post')
+    assert feed_ids(client, bob) == [own, earlier]
+
+    assert client.delete(f'/api/connections/{alice[0]}', headers=bob[1]).status_code == 200
+    assert feed_ids(client, bob) == [own]
+    later = post(client, alice, 'after the unfollow')
+    assert feed_ids(client, bob) == [own]
+    assert feed_ids(client, alice) == [later, earlier]
+
+
+def test_deleted_posts_leave_every_timeline(client, users):
+    alice, bob = users['alice'], users['bob']
+    follow(client, bob, alice)
+    post_id = post(client, alice, 'short lived')
+    client.delete(f'/api/posts/{post_id}', headers=alice[1])
+
+    assert feed_ids(client, bob) == []
+    assert TimelineEntry.query.filter_by(post_id=post_id).count() == 0
+
+
+def test_follow_validation(client, users):
+    alice, bob = users['alice'], users['bob']
+    assert client.post(f'/api/connections/{alice[0]}', headers=alice[1]).status_code == 400
+    assert client.post('/api/connections/999999', headers=alice[1]).status_code == 404
+    assert client.post(f'/api/connections/{bob[0]}/accept', headers=alice[1]).status_code == 404
+
+    client.post(f'/api/connections/{alice[0]}', headers=bob[1])
+    repeat = client.post(f'/api/connections/{alice[0]}', headers=bob[1])
+    assert repeat.status_code == 200
+
+    connections = client.get('/api/connections', headers=alice[1]).get_json()
+    assert [c['follower_id'] for c in connections['pending']] == [bob[0]]
+    assert connections['followers'] == []
+
+
+def seed_timeline(user_id, count):
+    base = datetime(2024, 1, 1)
+    for i in range(count):
+        p = Post(user_id, f'post {i}')
+        p.created_at = base + timedelta(minutes=i // 2)  # ties on created_at
+        db.session.add(p)
+        db.session.flush()
+        fan_out_post(p)
+    db.session.commit()
+
+
+def test_feed_cursor_walks_every_entry_once(client, users):
+    alice = users['alice']
+    seed_timeline(alice[0], 23)
+
+    seen, cursor = [], ''
+    while cursor is not None:
+        response = client.get('/api/feed', headers=alice[1], query_string={'per_page': 5, 'cursor': cursor})
+        body = response.get_json()
+        seen += [p['id'] for p in body['posts']]
+        cursor = body['pagination']['next_cursor']
+
+    expected = [p.id for p in Post.query.order_by(Post.created_at.desc(), Post.id.desc())]
+    assert seen == expected
+    assert client.get('/api/feed?cursor=garbage', headers=alice[1]).status_code == 400
+
+
+def test_trim_cli_caps_timelines(app, client, users):
+    alice = users['alice']
+    seed_timeline(alice[0], 12)
+    app.config['TIMELINE_MAX_LENGTH'] = 5
+
+    result = app.test_cli_runner().invoke(args=['trim-timelines'])
+    assert '7 entries removed' in result.output
+    newest = [p.id for p in Post.query.order_by(Post.created_at.desc(), Post.id.desc()).limit(5)]
+    assert feed_ids(client, alice) == newest
+
+
+def test_high_follower_authors_are_pulled_and_merged(app, client, users):
+    app.config['FEED_PULL_FOLLOWER_THRESHOLD'] = 2
+    alice, bob, carol = users['alice'], users['bob'], users['carol']
+    follow(client, bob, alice)
+    follow(client, carol, alice)   # alice now crosses the threshold
+    follow(client, carol, bob)
+
+    ids = []
+    for author, content in [(alice, 'a1'), (bob, 'b1'), (alice, 'a2'), (bob, 'b2'), (alice, 'a3')]:
+        ids.append(post(client, author, content))
+
+    # alice's posts were not pushed anywhere but her own timeline
+    alice_posts = [ids[0], ids[2], ids[4]]
+    assert TimelineEntry.query.filter(TimelineEntry.post_id.in_(alice_posts)).count() == 3
+
+    assert feed_ids(client, carol) == ids[::-1]
+    assert feed_ids(client, bob) == [ids[4], ids[3], ids[2], ids[1], ids[0]]
+
+    pages, cursor = [], ''
+    while cursor is not None:
+        body = client.get('/api/feed', headers=carol[1], query_string={'per_page': 2, 'cursor': cursor}).get_json()
+        pages.append([p['id'] for p in body['posts']])
+        cursor = body['pagination']['next_cursor']
+    assert pages == [ids[4:2:-1], ids[2:0:-1], ids[0:1]]
+
+
+def test_pushed_and_pulled_copies_are_not_duplicated(app, client, users):
+    alice, bob = users['alice'], users['bob']
+    follow(client, bob, alice)
+    pushed = post(client, alice, 'pushed while small')
+
+    app.config['FEED_PULL_FOLLOWER_THRESHOLD'] = 1
+    pulled = post(client, alice, 'pulled once popular')
+    assert feed_ids(client, bob) == [pulled, pushed]
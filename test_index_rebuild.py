@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for background rebuilds of the job facet index, the skill matcher and the follow graph
+"""
+
+import pytest
+
+from config import TestingConfig
+from main import create_app
+from models.connection import UserConnection, CONNECTION_ACCEPTED
+from models.counters import ChangeCounter
+from models.user import db
+from utils.follow_graph import FOLLOW_GRAPH_VERSION
+from utils.skill_match import SKILL_PROFILES_VERSION
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # The rebuild thread needs its own connection, which the in-memory database cannot give it
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'prok.db'}")
+    monkeypatch.setattr(TestingConfig, 'INDEX_REBUILD_IN_BACKGROUND', True)
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def post_job(client, headers, company_id, title, job_type='full-time'):
+    fields = {'company_id': company_id, 'title': title, 'description': 'We use Python daily.',
+              'location': 'Remote', 'job_type': job_type}
+    return client.post('/api/jobs', headers=headers, json=fields).get_json()['job']['id']
+
+
+def job_types(response):
+    return {entry['value']: entry['count'] for entry in response.get_json()['facets']['job_type']}
+
+
+def test_stale_facets_are_served_while_the_index_rebuilds(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('employer'))
+    company_id = client.post('/api/companies', headers=headers, json={'name': 'Acme'}).get_json()['company']['id']
+    post_job(client, headers, company_id, 'Python developer')
+    assert job_types(client.get('/api/jobs', headers=headers)) == {'full-time': 1}  # First load, in the request
+    holder = app.extensions['job_facets']
+    assert holder.rebuild_thread is None
+
+    post_job(client, headers, company_id, 'Data engineer', job_type='contract')
+    stale = client.get('/api/jobs', headers=headers)
+    assert len(stale.get_json()['jobs']) == 2 and job_types(stale) == {'full-time': 1}
+    holder.rebuild_thread.join(timeout=5)
+
+    # The ETag and the cached first page followed the index, not only the jobs table
+    fresh = client.get('/api/jobs', headers={**headers, 'If-None-Match': stale.headers['ETag']})
+    assert fresh.status_code == 200 and job_types(fresh) == {'full-time': 1, 'contract': 1}
+
+
+def test_skill_changes_from_other_processes_reload_in_the_background(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user('employer'))
+    company_id = client.post('/api/companies', headers=headers, json={'name': 'Acme'}).get_json()['company']['id']
+    job_id = post_job(client, headers, company_id, 'Python developer')
+    seeker = make_user('seeker', skills='Python,SQL')
+
+    def candidates():
+        body = client.get(f'/api/jobs/{job_id}/candidates', headers=headers).get_json()
+        return [candidate['user']['id'] for candidate in body['candidates']]
+
+    assert candidates() == [seeker]
+    holder = app.extensions['skill_matcher']
+    matcher = holder.matcher
+
+    # Written straight to the table, as another worker would, so only the counter tells this one
+    other = make_user('other', skills='Python')
+    ChangeCounter.bump(SKILL_PROFILES_VERSION)
+    db.session.commit()
+
+    assert candidates() == [seeker]
+    holder.rebuild_thread.join(timeout=5)
+    assert sorted(candidates()) == sorted([seeker, other])
+    assert holder.matcher is not matcher and holder.matcher.jobs is matcher.jobs
+
+
+def test_follow_graph_changes_from_other_processes_reload_in_the_background(app, client, make_user, auth_headers):
+    alice, bob, carol = make_user('alice'), make_user('bob'), make_user('carol')
+    db.session.add_all([UserConnection(alice, bob, status=CONNECTION_ACCEPTED),
+                        UserConnection(bob, carol, status=CONNECTION_ACCEPTED)])
+    db.session.commit()
+
+    def suggested():
+        body = client.get('/api/connections/suggestions', headers=auth_headers(alice)).get_json()
+        return [suggestion['user']['id'] for suggestion in body['suggestions']]
+
+    assert suggested() == [carol]  # First load, in the request
+    holder = app.extensions['follow_graph']
+    graph = holder.graph
+
+    # Written straight to the table, as another worker would, so only the counter tells this one
+    dave = make_user('dave')
+    db.session.add(UserConnection(bob, dave, status=CONNECTION_ACCEPTED))
+    ChangeCounter.bump(FOLLOW_GRAPH_VERSION)
+    db.session.commit()
+
+    assert suggested() == [carol]
+    holder.rebuild_thread.join(timeout=5)
+    assert sorted(suggested()) == sorted([carol, dave])
+    assert holder.graph is not graph
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Test script for the job board: full-text search, disjunctive facets and keyset pagination
+"""
+
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models.job import Job, JOB_TYPES, JOB_FACETS
+from models.user import db
+
+LOCATIONS = ['Berlin', 'Austin, TX', 'Remote', 'Lisbon']
+TITLES = ['Python developer', 'Data engineer', 'Product designer', 'Backend engineer (Python)']
+
+
+@pytest.fixture
+def board(client, make_user, auth_headers):
+    """Two employers, 60 jobs with spread-out created_at, some closed"""
+    rng = random.Random(11)
+    owner = make_user('employer')
+    headers = auth_headers(owner)
+    company_ids = [client.post('/api/companies', headers=headers, json={'name': name}).get_json()['company']['id']
+                   for name in ('Acme', 'Globex')]
+    jobs = []
+    for i in range(60):
+        fields = {
+            'company_id': rng.choice(company_ids),
+            'title': rng.choice(TITLES),
+            'description': f'Job number {i}. ' + rng.choice(['Kubernetes a plus.', 'Figma daily.', 'SQL heavy.']),
+            'location': rng.choice(LOCATIONS),
+            'job_type': rng.choice(JOB_TYPES),
+            'status': 'closed' if i % 5 == 0 else 'open'
+        }
+        job_id = client.post('/api/jobs', headers=headers, json=fields).get_json()['job']['id']
+        jobs.append({'id': job_id, **fields})
+    base = datetime(2024, 1, 1)
+    for i, job in enumerate(jobs):
+        db.session.get(Job, job['id']).created_at = base + timedelta(hours=i // 2)  # pairs share a timestamp
+    db.session.commit()
+    return headers, company_ids, jobs
+
+
+def expected_facets(jobs, filters):
+    """Brute-force disjunctive facet counts; selected values are listed even at 0"""
+    facets = {}
+    for facet in JOB_FACETS:
+        others = {f: values for f, values in filters.items() if f != facet}
+        counts = Counter(job[facet] for job in jobs if all(job[f] in values for f, values in others.items()))
+        facets[facet] = {**{value: 0 for value in filters.get(facet, ())}, **counts}
+    return facets
+
+
+def fetch_all(client, headers, query):
+    ids, cursor, first = [], None, None
+    while True:
+        url = f'/api/jobs?{query}&per_page=7' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=headers).get_json()
+        first = first or body
+        ids += [job['id'] for job in body['jobs']]
+        cursor = body['pagination']['next_cursor']
+        if not cursor:
+            return ids, first
+
+
+@pytest.mark.parametrize('query, filters', [
+    ('', {}),
+    ('status=open', {'status': {'open'}}),
+    ('job_type=contract&job_type=internship&location=Austin%2C+TX', {
+        'job_type': {'contract', 'internship'}, 'location': {'Austin, TX'}}),
+])
+def test_filters_facets_and_keyset_pages_match_brute_force(client, board, query, filters):
+    headers, company_ids, jobs = board
+    query += f'&company_id={company_ids[0]}' if filters else ''
+    if filters:
+        filters['company_id'] = {company_ids[0]}
+
+    ids, first = fetch_all(client, headers, query)
+    matching = [job for job in jobs if all(job[f] in values for f, values in filters.items())]
+    # Newest first, ties on created_at broken by id
+    assert ids == sorted((job['id'] for job in matching), key=lambda job_id: (-(job_id - jobs[0]['id']) // 2, -job_id))
+
+    facets = {facet: {entry['value']: entry['count'] for entry in entries}
+              for facet, entries in first['facets'].items()}
+    assert facets == expected_facets(jobs, filters)
+    assert {entry['name'] for entry in first['facets']['company_id']} <= {'Acme', 'Globex'}
+
+
+def test_search_matches_all_terms_ranks_titles_and_counts_facets(client, board):
+    headers, _, jobs = board
+    ids, first = fetch_all(client, headers, 'search=python+engin&facets=true')
+    matching = [job for job in jobs if job['title'] == 'Backend engineer (Python)']
+    assert sorted(ids) == sorted(job['id'] for job in matching)
+    facets = {facet: {entry['value']: entry['count'] for entry in entries}
+              for facet, entries in first['facets'].items()}
+    assert facets == expected_facets(matching, {})
+
+    # Location and description terms match too; title hits rank first
+    assert client.get('/api/jobs?search=lisbon', headers=headers).get_json()['jobs'][0]['location'] == 'Lisbon'
+    client.post('/api/jobs', headers=headers, json={**jobs[0], 'title': 'Analyst', 'description': 'Some Python.'})
+    ranked = client.get('/api/jobs?search=python&per_page=50', headers=headers).get_json()['jobs']
+    assert [job['title'] for job in ranked][-1] == 'Analyst'
+    assert {job['title'] for job in ranked[:-1]} == {'Python developer', 'Backend engineer (Python)'}
+    assert client.get('/api/jobs?search=%21%21', headers=headers).get_json()['jobs'] == []
+
+
+def test_search_facets_count_only_the_best_matches_beyond_the_cap(app, client, board):
+    headers, _, jobs = board
+    matching = [job for job in jobs if 'Python' in job['title']]
+    assert client.get('/api/jobs?search=python', headers=headers).get_json()['facets_approximate'] is False
+
+    app.config['JOB_FACETS_MAX_MATCHES'] = 5
+    first = client.get('/api/jobs?search=python&per_page=50', headers=headers).get_json()
+    assert first['facets_approximate'] is True
+    assert len(first['jobs']) == len(matching)
+    # Equal scores make which five arbitrary, but every facet counts five of the matches
+    everything = expected_facets(matching, {})
+    for facet, entries in first['facets'].items():
+        assert sum(entry['count'] for entry in entries) == 5
+        assert all(entry['count'] <= everything[facet][entry['value']] for entry in entries)
+
+
+def facets_of(client, headers, query=''):
+    body = client.get(f'/api/jobs?{query}', headers=headers).get_json()
+    return {facet: {entry['value']: entry['count'] for entry in entries} for facet, entries in body['facets'].items()}
+
+
+def test_writes_reach_search_and_facets(app, client, board, make_user, auth_headers):
+    headers, company_ids, jobs = board
+    client.put(f'/api/jobs/{jobs[1]["id"]}', headers=headers, json={'status': 'closed', 'location': 'Remote'})
+    client.put(f'/api/jobs/{jobs[2]["id"]}', headers=headers, json={'title': 'Renamed'})
+    client.delete(f'/api/jobs/{jobs[3]["id"]}', headers=headers)
+    assert client.put(f'/api/jobs/{jobs[4]["id"]}', headers=headers, json={'job_type': 'gig'}).status_code == 400
+
+    stranger = auth_headers(make_user('not_the_owner'))
+    assert client.delete(f'/api/jobs/{jobs[4]["id"]}', headers=stranger).status_code == 403
+    assert client.post('/api/jobs', headers=stranger, json={'company_id': company_ids[0]}).status_code == 403
+
+    jobs[1].update(status='closed', location='Remote')
+    del jobs[3]
+    assert facets_of(client, headers) == expected_facets(jobs, {})
+    assert client.get('/api/jobs?search=renamed', headers=headers).get_json()['jobs'][0]['id'] == jobs[2]['id']
+
+    # Within the staleness window the loaded index is reused, even though the version moved
+    app.config['JOB_FACETS_MAX_STALENESS_SECONDS'] = 3600
+    client.put(f'/api/jobs/{jobs[5]["id"]}', headers=headers, json={'status': 'closed'})
+    assert facets_of(client, headers) == expected_facets(jobs, {})
+
+
+def test_applications(client, board, make_user, auth_headers):
+    headers, _, jobs = board
+    applicant = auth_headers(make_user('applicant', first_name='Ada', last_name='L'))
+    open_job, closed_job = jobs[1]['id'], jobs[0]['id']
+
+    response = client.post(f'/api/jobs/{open_job}/apply', headers=applicant, json={'resume_link': 'https://cv'})
+    assert response.status_code == 201
+    assert response.get_json()['application']['applicant_name'] == 'Ada L'
+    assert client.post(f'/api/jobs/{open_job}/apply', headers=applicant, json={}).status_code == 409
+    assert client.post(f'/api/jobs/{closed_job}/apply', headers=applicant, json={}).status_code == 400
+
+    applications = client.get(f'/api/jobs/{open_job}/applications', headers=headers).get_json()['applications']
+    assert [a['applicant_email'] for a in applications] == ['applicant@example.com']
+    assert client.get(f'/api/jobs/{open_job}/applications', headers=applicant).status_code == 403
+
+
+def test_filtered_listing_reads_an_index(client, board):
+    headers, _, _ = board
+    db.session.execute(db.text('ANALYZE'))
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM jobs' in statement and 'LIMIT' in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        client.get('/api/jobs?status=open&cursor=', headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    with db.engine.connect() as connection:
+        plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statements[0][0]}',
+                                                              statements[0][1])]
+    assert any('ix_jobs_status_created_at_id' in step for step in plan), plan
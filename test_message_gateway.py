@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the message push gateway: WebSocket and SSE delivery fed by the send path
+"""
+
+import base64
+import json
+import os
+import socket
+import struct
+import time
+
+import pytest
+
+from utils.jwt_utils import create_token
+from utils.message_gateway import GATEWAY_PATH, message_gateway
+
+
+@pytest.fixture
+def gateway(app):
+    gateway = message_gateway()
+    gateway.start('127.0.0.1', 0)
+    yield gateway
+    gateway.stop()
+
+
+class Stream:
+    """Blocking test client for one gateway connection"""
+
+    def __init__(self, port, token, websocket=False, path=GATEWAY_PATH):
+        self.websocket = websocket
+        self.sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+        headers = [f'GET {path} HTTP/1.1', 'Host: localhost']
+        if token:
+            headers.append(f'Authorization: Bearer {token}')
+        if websocket:
+            headers += ['Upgrade: websocket', 'Connection: Upgrade', 'Sec-WebSocket-Version: 13',
+                        f'Sec-WebSocket-Key: {base64.b64encode(os.urandom(16)).decode()}']
+        else:
+            headers.append('Accept: text/event-stream')
+        self.sock.sendall(('\r\n'.join(headers) + '\r\n\r\n').encode())
+        self.file = self.sock.makefile('rb')
+        self.status = int(self.file.readline().split()[1])
+        while self.file.readline() not in (b'\r\n', b''):
+            pass
+
+    def event(self):
+        """Next (event, data), skipping keep-alives"""
+        if self.websocket:
+            while True:
+                first, second = self.file.read(2)
+                length = second & 0x7F
+                if length == 126:
+                    length, = struct.unpack('!H', self.file.read(2))
+                payload = self.file.read(length)
+                if first & 0x0F == 0x1:
+                    message = json.loads(payload)
+                    return message['event'], message['data']
+        fields = {}
+        while True:
+            line = self.file.readline().decode().rstrip('\n')
+            if not line and fields:
+                return fields['event'], json.loads(fields['data'])
+            if line and not line.startswith(':'):
+                name, _, value = line.partition(': ')
+                fields[name] = value
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def test_messages_reach_both_participants_over_websocket_and_sse(client, gateway, make_user, auth_headers):
+    alice, bob, carol = (make_user(name) for name in ('alice', 'bob', 'carol'))
+    streams = {name: Stream(gateway.port, create_token(user_id), websocket=websocket)
+               for name, user_id, websocket in [('bob_ws', bob, True), ('bob_sse', bob, False),
+                                                 ('alice_sse', alice, False), ('carol_ws', carol, True)]}
+    try:
+        for name, stream in streams.items():
+            assert stream.status == (101 if stream.websocket else 200)
+            assert stream.event()[0] == 'ready'
+        assert gateway.stats()['connections'] == 4 and gateway.stats()['users'] == 3
+
+        started = time.perf_counter()
+        sent = client.post('/api/messaging/messages', headers=auth_headers(alice),
+                           json={'recipient_id': bob, 'content': 'hello'}).get_json()['sent']
+        for name in ('bob_ws', 'bob_sse', 'alice_sse'):
+            assert streams[name].event() == ('message', sent), name
+        assert time.perf_counter() - started < 1
+
+        # Carol saw nothing: her next event is a message sent to her
+        sent = client.post('/api/messaging/messages', headers=auth_headers(bob),
+                           json={'recipient_id': carol, 'content': 'hi carol'}).get_json()['sent']
+        assert streams['carol_ws'].event() == ('message', sent)
+    finally:
+        for stream in streams.values():
+            stream.close()
+
+    deadline = time.monotonic() + 2
+    while gateway.stats()['connections'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert gateway.stats()['connections'] == 0
+
+
+def test_gateway_rejects_bad_requests_and_answers_pings(app, gateway, make_user):
+    assert Stream(gateway.port, None).status == 401
+    assert Stream(gateway.port, 'not-a-token', websocket=True).status == 401
+    assert Stream(gateway.port, create_token(make_user('alice')), path='/elsewhere').status == 404
+
+    stream = Stream(gateway.port, create_token(make_user('bob')), websocket=True)
+    stream.event()
+    mask = os.urandom(4)
+    stream.sock.sendall(bytes([0x89, 0x80 | 4]) + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(b'ping')))
+    first, second = stream.file.read(2)
+    assert first == 0x8A and stream.file.read(second & 0x7F) == b'ping'
+    stream.sock.sendall(bytes([0x88, 0x80]) + mask)
+    assert stream.file.read(2)[0] == 0x88
+    stream.close()
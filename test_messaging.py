@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for messaging: conversations, keyset thread reads and the last-message pointer
+"""
+
+import random
+
+from sqlalchemy import event
+
+from models.message import Conversation, ConversationSummary, Message
+from models.user import db
+
+
+def send(client, headers, recipient_id, content):
+    response = client.post('/api/messaging/messages', headers=headers,
+                           json={'recipient_id': recipient_id, 'content': content})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['sent']
+
+
+def all_pages(client, url, headers, key):
+    items, cursor = [], None
+    while True:
+        body = client.get(url + (f'&cursor={cursor}' if cursor else ''), headers=headers).get_json()
+        items += body[key]
+        cursor = body['pagination']['next_cursor']
+        if not cursor:
+            return items
+
+
+def test_threads_page_through_one_conversation_newest_first(client, make_user, auth_headers):
+    users = [make_user(name) for name in ('alice', 'bob', 'carol', 'dave')]
+    headers = {user_id: auth_headers(user_id) for user_id in users}
+    rng = random.Random(4)
+    sent = []
+    for i in range(120):
+        sender, recipient = rng.sample(users, 2)
+        sent.append(send(client, headers[sender], recipient, f'message {i}'))
+
+    alice, bob = users[:2]
+    pair = [m for m in sent if {m['sender_id'], m['recipient_id']} == {alice, bob}]
+    assert len({m['conversation_id'] for m in pair}) == 1
+    conversation_id = pair[0]['conversation_id']
+    url = f'/api/messaging/conversations/{conversation_id}/messages?per_page=7'
+    thread = all_pages(client, url, headers[bob], 'messages')
+    assert [m['id'] for m in thread] == [m['id'] for m in reversed(pair)]
+
+    # The inbox is ordered by the last-message pointer and shows the other side
+    conversations = all_pages(client, '/api/messaging/conversations?per_page=2', headers[alice], 'conversations')
+    mine = [m for m in sent if alice in (m['sender_id'], m['recipient_id'])]
+    latest = {}
+    for message in mine:
+        latest[message['conversation_id']] = message
+    expected = sorted(latest.values(), key=lambda m: m['id'], reverse=True)
+    assert [c['last_message']['id'] for c in conversations] == [m['id'] for m in expected]
+    assert {c['other_user']['id'] for c in conversations} == set(users) - {alice}
+
+
+def test_thread_reads_use_the_conversation_index(client, make_user, auth_headers):
+    alice, bob, carol = (make_user(name) for name in ('alice', 'bob', 'carol'))
+    for i in range(5):
+        send(client, auth_headers(alice), bob, f'hi {i}')
+        send(client, auth_headers(carol), alice, f'hey {i}')
+    conversation_id = Conversation.query.filter_by(first_user_id=alice, second_user_id=bob).one().id
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM messages' in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        body = client.get(f'/api/messaging/conversations/{conversation_id}/messages?per_page=3',
+                          headers=auth_headers(bob)).get_json()
+        client.get(f'/api/messaging/conversations/{conversation_id}/messages?per_page=3&cursor='
+                   f'{body["pagination"]["next_cursor"]}', headers=auth_headers(bob))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    assert [m['content'] for m in body['messages']] == ['hi 4', 'hi 3', 'hi 2']
+    assert len(statements) == 2
+    with db.engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = ' '.join(str(row[-1]) for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}',
+                                                                              parameters))
+            assert 'ix_messages_conversation_created_at_id' in plan and 'TEMP B-TREE' not in plan
+
+
+def test_last_message_pointer_and_access_rules(client, make_user, auth_headers):
+    alice, bob, mallory = (make_user(name) for name in ('alice', 'bob', 'mallory'))
+    first = send(client, auth_headers(alice), bob, 'hello')
+    conversation_id = first['conversation_id']
+    response = client.post(f'/api/messaging/conversations/{conversation_id}/messages', headers=auth_headers(bob),
+                           json={'content': 'hi back'})
+    reply = response.get_json()['sent']
+    assert reply['recipient_id'] == alice and reply['conversation_id'] == conversation_id
+
+    conversation = db.session.get(Conversation, conversation_id)
+    assert conversation.last_message_id == reply['id']
+    # A slower concurrent sender finishing later cannot move the pointer back
+    conversation.record_message(db.session.get(Message, first['id']))
+    db.session.commit()
+    db.session.refresh(conversation)
+    assert conversation.last_message_id == reply['id']
+
+    assert client.get(f'/api/messaging/conversations/{conversation_id}/messages',
+                      headers=auth_headers(mallory)).status_code == 404
+    assert client.post(f'/api/messaging/conversations/{conversation_id}/messages', headers=auth_headers(mallory),
+                       json={'content': 'let me in'}).status_code == 404
+    assert client.get('/api/messaging/conversations', headers=auth_headers(mallory)).get_json()['conversations'] == []
+    for body, status in [({'recipient_id': alice, 'content': 'me'}, 404), ({'recipient_id': 999, 'content': 'x'}, 404),
+                         ({'recipient_id': bob, 'content': '  '}, 400), ({'recipient_id': bob, 'content': 'x' * 5001}, 400)]:
+        assert client.post('/api/messaging/messages', headers=auth_headers(alice), json=body).status_code == status
+    assert client.get(f'/api/messaging/conversations/{conversation_id}/messages?cursor=bad',
+                      headers=auth_headers(alice)).status_code == 400
+    assert Message.query.count() == 2
+
+
+def test_inbox_summaries_count_unread_and_mark_read_only_touches_unread(client, make_user, auth_headers):
+    alice, bob, carol = (make_user(name) for name in ('alice', 'bob', 'carol'))
+    for i in range(3):
+        send(client, auth_headers(bob), alice, f'from bob {i}')
+    conversation_id = send(client, auth_headers(carol), alice, 'from carol')['conversation_id']
+    send(client, auth_headers(alice), carol, 'reply')
+    send(client, auth_headers(carol), alice, 'again')
+
+    inbox = client.get('/api/messaging/conversations', headers=auth_headers(alice)).get_json()['conversations']
+    assert [(c['other_user']['username'], c['unread_count'], c['last_message']['content']) for c in inbox] == [
+        ('carol', 2, 'again'), ('bob', 3, 'from bob 2')]
+    carol_inbox = client.get('/api/messaging/conversations', headers=auth_headers(carol)).get_json()
+    assert carol_inbox['conversations'][0]['unread_count'] == 1
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('UPDATE', 'SELECT')):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = client.put(f'/api/messaging/conversations/{conversation_id}/read', headers=auth_headers(alice))
+        client.get('/api/messaging/conversations', headers=auth_headers(alice))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    assert response.get_json()['updated'] == 2
+    assert any(statement.lstrip().startswith('UPDATE messages') for statement, _ in statements)
+    with db.engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = ' '.join(str(row[-1]) for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}',
+                                                                              parameters))
+            if statement.lstrip().startswith('UPDATE messages'):
+                assert 'ix_messages_conversation_recipient_unread' in plan
+            if 'FROM conversation_summaries' in statement:
+                assert 'ix_conversation_summaries_user_last_message' in plan and 'TEMP B-TREE' not in plan
+
+    inbox = client.get('/api/messaging/conversations', headers=auth_headers(alice)).get_json()['conversations']
+    assert [c['unread_count'] for c in inbox] == [0, 3]
+    assert Message.query.filter_by(conversation_id=conversation_id, recipient_id=alice, is_read=False).count() == 0
+    assert Message.query.filter_by(conversation_id=conversation_id, recipient_id=carol, is_read=False).count() == 1
+    assert client.put(f'/api/messaging/conversations/{conversation_id}/read',
+                      headers=auth_headers(alice)).get_json()['updated'] == 0
+    assert client.put(f'/api/messaging/conversations/{conversation_id}/read',
+                      headers=auth_headers(bob)).status_code == 404
+    assert db.session.get(ConversationSummary, (carol, conversation_id)).unread_count == 1
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the first-page cache and its version-based invalidation
+"""
+
+import pytest
+
+from models.counters import ChangeCounter
+from utils.page_cache import PageCache, page_cache
+from utils.timeline import timeline_version_name
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_ttl_expiry():
+    clock = FakeClock()
+    cache = PageCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1      # a is now most recently used
+    cache.set('c', 3)               # evicts b
+    assert cache.get('b') is None
+    clock.now = 11
+    assert cache.get('a') is None   # expired
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['expirations']) == (1, 2, 1, 1)
+    assert stats['entries'] == 1
+
+
+@pytest.fixture
+def people(make_user, auth_headers):
+    ids = [make_user(f'cache_{name}') for name in ('author', 'follower', 'stranger')]
+    author, follower, stranger = [(user_id, auth_headers(user_id)) for user_id in ids]
+    return author, follower, stranger
+
+
+def stats(client):
+    return client.get('/health/page-cache').get_json()
+
+
+def test_posts_first_page_is_served_from_cache_until_a_write(client, people):
+    author, _, _ = people
+    client.post('/api/posts', headers=author[1], json={'content': 'first'})
+    before = stats(client)
+
+    first = client.get('/api/posts', headers=author[1])
+    second = client.get('/api/posts', headers=author[1])
+    assert second.data == first.data
+    assert stats(client)['hits'] == before['hits'] + 1
+
+    # Later pages are never cached
+    client.get('/api/posts?page=2', headers=author[1])
+    client.get('/api/posts?page=2', headers=author[1])
+    assert stats(client)['hits'] == before['hits'] + 1
+
+    client.post('/api/posts', headers=author[1], json={'content': 'second'})
+    third = client.get('/api/posts', headers=author[1])
+    assert [p['content'] for p in third.get_json()['posts']] == ['second', 'first']
+    assert stats(client)['hits'] == before['hits'] + 1
+
+
+def test_feed_cache_is_invalidated_only_by_relevant_writes(app, client, people):
+    # Keep the feed's time bucket from rolling over mid-test
+    app.config['PAGE_CACHE_TTL_SECONDS'] = 3600
+    author, follower, stranger = people
+    client.post(f'/api/connections/{author[0]}', headers=follower[1])
+    client.post(f'/api/connections/{follower[0]}/accept', headers=author[1])
+
+    client.get('/api/feed', headers=follower[1])
+    hits = stats(client)['hits']
+
+    # A post by someone the follower does not follow leaves their page cached
+    client.post('/api/posts', headers=stranger[1], json={'content': 'unrelated'})
+    assert client.get('/api/feed', headers=follower[1]).get_json()['posts'] == []
+    assert stats(client)['hits'] == hits + 1
+
+    # A followed author's post bumps the follower's timeline version
+    response = client.post('/api/posts', headers=author[1], json={'content': 'for followers'})
+    post_id = response.get_json()['post']['id']
+    assert [p['id'] for p in client.get('/api/feed', headers=follower[1]).get_json()['posts']] == [post_id]
+    assert stats(client)['hits'] == hits + 1
+
+    version = ChangeCounter.current(timeline_version_name(follower[0]))
+    client.delete(f'/api/posts/{post_id}', headers=author[1])
+    assert ChangeCounter.current(timeline_version_name(follower[0]))[0] == version[0] + 1
+    assert client.get('/api/feed', headers=follower[1]).get_json()['posts'] == []
+
+
+def test_cache_is_keyed_by_viewer_and_filters(app, client, people):
+    author, follower, _ = people
+    client.post('/api/posts', headers=author[1], json={'content': 'tech post', 'category': 'tech'})
+    page_cache().clear()
+
+    client.get('/api/posts', headers=author[1])
+    client.get('/api/posts', headers=follower[1])
+    client.get('/api/posts?category=tech', headers=author[1])
+    assert stats(client)['entries'] == 3
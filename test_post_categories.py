@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for the incrementally maintained category counts
+"""
+
+from models.post import Post, PostCategoryStat
+from models.user import db
+
+
+def categories(client, headers):
+    response = client.get('/api/posts/categories', headers=headers)
+    assert response.status_code == 200
+    return {c['name']: c['count'] for c in response.get_json()['categories']}
+
+
+def test_counts_follow_create_and_delete(client, make_user, auth_headers):
+    user_id = make_user('category_user')
+    headers = auth_headers(user_id)
+
+    ids = []
+    for category in ['tech', 'tech', 'design', None, '']:
+        response = client.post('/api/posts', headers=headers, json={'content': 'hi', 'category': category})
+        assert response.status_code == 201
+        ids.append(response.get_json()['post']['id'])
+
+    assert categories(client, headers) == {'tech': 2, 'design': 1, 'Uncategorized': 2}
+
+    client.delete(f'/api/posts/{ids[2]}', headers=headers)
+    client.delete(f'/api/posts/{ids[0]}', headers=headers)
+    assert categories(client, headers) == {'tech': 1, 'Uncategorized': 2}
+
+
+def test_reconcile_fixes_drift(client, make_user, auth_headers):
+    user_id = make_user('category_drift')
+    headers = auth_headers(user_id)
+    # Posts written behind the API's back are invisible until reconciliation
+    db.session.add_all([Post(user_id, 'a', category='ops'), Post(user_id, 'b', category='ops')])
+    db.session.add(PostCategoryStat(category='ghost', post_count=3))
+    db.session.commit()
+
+    assert categories(client, headers) == {'ghost': 3}
+    assert PostCategoryStat.reconcile() == 2
+    assert categories(client, headers) == {'ops': 2}
+    assert PostCategoryStat.reconcile() == 0
+
+
+def test_reconcile_invalidates_conditional_gets(client, make_user, auth_headers):
+    user_id = make_user('category_etag')
+    headers = auth_headers(user_id)
+    db.session.add(Post(user_id, 'a', category='ops'))
+    db.session.commit()
+    etag = client.get('/api/posts/categories', headers=headers).headers['ETag']
+    assert client.get('/api/posts/categories', headers={**headers, 'If-None-Match': etag}).status_code == 304
+
+    assert PostCategoryStat.reconcile() == 1
+    response = client.get('/api/posts/categories', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert {c['name']: c['count'] for c in response.get_json()['categories']} == {'ops': 1}
+
+
+def test_reconcile_cli(app, make_user):
+    user_id = make_user('category_cli')
+    db.session.add(Post(user_id, 'a', category='cli'))
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['reconcile-category-stats'])
+    assert '1 categories corrected' in result.output
+    assert db.session.get(PostCategoryStat, 'cli').post_count == 1
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for post likes and engagement-counter sorting
+"""
+
+from models.post import Post, PostLike
+from models.user import db
+
+
+def add_post(user_id, content):
+    post = Post(user_id, content)
+    db.session.add(post)
+    db.session.commit()
+    return post.id
+
+
+def test_like_is_idempotent_and_counted(client, make_user, auth_headers):
+    author = make_user('engage_author')
+    fan = make_user('engage_fan')
+    post_id = add_post(author, 'Like me')
+
+    for _ in range(2):
+        response = client.post(f'/api/posts/{post_id}/like', headers=auth_headers(fan))
+        assert response.status_code == 200
+        assert response.get_json()['likes_count'] == 1
+
+    response = client.post(f'/api/posts/{post_id}/like', headers=auth_headers(author))
+    assert response.get_json()['likes_count'] == 2
+
+    response = client.delete(f'/api/posts/{post_id}/like', headers=auth_headers(fan))
+    assert response.get_json()['likes_count'] == 1
+    response = client.delete(f'/api/posts/{post_id}/like', headers=auth_headers(fan))
+    assert response.get_json()['likes_count'] == 1
+    assert PostLike.query.filter_by(post_id=post_id).count() == 1
+
+
+def test_sort_by_likes_count(client, make_user, auth_headers):
+    author = make_user('sort_author')
+    fans = [make_user(f'sort_fan_{i}') for i in range(3)]
+    quiet = add_post(author, 'quiet')
+    loud = add_post(author, 'loud')
+    medium = add_post(author, 'medium')
+    for fan in fans:
+        client.post(f'/api/posts/{loud}/like', headers=auth_headers(fan))
+    client.post(f'/api/posts/{medium}/like', headers=auth_headers(fans[0]))
+
+    response = client.get('/api/posts?sort_by=likes_count', headers=auth_headers(author))
+    posts = response.get_json()['posts']
+    assert [post['id'] for post in posts] == [loud, medium, quiet]
+    assert [post['likes_count'] for post in posts] == [3, 1, 0]
+
+    response = client.get('/api/posts?sort_by=likes_count&sort_order=asc&cursor=&per_page=2',
+                          headers=auth_headers(author))
+    data = response.get_json()
+    assert [post['id'] for post in data['posts']] == [quiet, medium]
+    response = client.get('/api/posts', headers=auth_headers(author), query_string={
+        'sort_by': 'likes_count', 'sort_order': 'asc', 'per_page': 2,
+        'cursor': data['pagination']['next_cursor']})
+    assert [post['id'] for post in response.get_json()['posts']] == [loud]
+
+
+def test_deleting_post_removes_likes(client, make_user, auth_headers):
+    author = make_user('delete_author')
+    post_id = add_post(author, 'short lived')
+    client.post(f'/api/posts/{post_id}/like', headers=auth_headers(author))
+
+    assert client.delete(f'/api/posts/{post_id}', headers=auth_headers(author)).status_code == 200
+    assert PostLike.query.filter_by(post_id=post_id).count() == 0
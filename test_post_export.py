@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming NDJSON post export
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from models.post import Post
+from models.user import db
+
+
+def seed_posts(user_id, count):
+    base = datetime(2024, 1, 1)
+    for i in range(count):
+        post = Post(user_id, f'export {i}')
+        post.created_at = base + timedelta(days=i // 2)
+        db.session.add(post)
+    db.session.commit()
+    return [p.id for p in Post.query.order_by(Post.created_at, Post.id)]
+
+
+def export(client, headers, **params):
+    response = client.get('/api/posts/export', headers=headers, query_string=params)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data().splitlines()]
+
+
+def test_export_streams_all_posts_in_order(client, make_user, auth_headers):
+    user_id = make_user('export_user')
+    expected = seed_posts(user_id, 7)
+
+    records = export(client, auth_headers(user_id), batch_size=3)
+    assert [r['post']['id'] for r in records] == expected
+    assert records[0]['post'] == db.session.get(Post, expected[0]).to_dict()
+
+
+def test_export_resumes_after_cursor(client, make_user, auth_headers):
+    user_id = make_user('export_resume')
+    expected = seed_posts(user_id, 7)
+    headers = auth_headers(user_id)
+
+    first = export(client, headers, batch_size=2)[:3]
+    rest = export(client, headers, batch_size=2, after=first[-1]['cursor'])
+    assert [r['post']['id'] for r in first + rest] == expected
+
+
+def test_export_filters_by_created_at_range(client, make_user, auth_headers):
+    user_id = make_user('export_range')
+    expected = seed_posts(user_id, 8)
+
+    records = export(client, auth_headers(user_id), since='2024-01-02', until='2024-01-04')
+    assert [r['post']['id'] for r in records] == expected[2:6]
+
+
+def test_export_converts_offset_bounds_to_utc(client, make_user, auth_headers):
+    user_id = make_user('export_offsets')
+    expected = seed_posts(user_id, 8)
+
+    records = export(client, auth_headers(user_id), since='2024-01-02T05:00:00+05:00',
+                     until='2024-01-03T19:00:00-05:00')
+    assert [r['post']['id'] for r in records] == expected[2:6]
+
+
+def test_export_requires_auth_and_valid_params(client, make_user, auth_headers):
+    assert client.get('/api/posts/export').status_code == 401
+    headers = auth_headers(make_user('export_bad'))
+    assert client.get('/api/posts/export?since=yesterday', headers=headers).status_code == 400
+    assert client.get('/api/posts/export?after=nope', headers=headers).status_code == 400
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script asserting post listings issue a fixed number of SQL statements
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from models.post import Post
+from models.user import db
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+
+@pytest.fixture
+def viewer(make_user):
+    # One author per post so a lazy author load would show up as N extra queries
+    author_ids = [make_user(f'count_author_{i}') for i in range(60)]
+    for author_id in author_ids:
+        db.session.add(Post(author_id, f'post by {author_id}'))
+    db.session.commit()
+    db.session.remove()
+    return author_ids[0]
+
+
+@pytest.mark.parametrize('params, expected', [
+    ({}, 3),                # ETag version + page query + COUNT(*)
+    ({'cursor': ''}, 2),    # keyset mode skips the count
+])
+def test_listing_query_count_is_independent_of_page_size(client, auth_headers, viewer, params, expected):
+    headers = auth_headers(viewer)
+    for per_page in (5, 50):
+        with count_statements() as statements:
+            response = client.get('/api/posts', headers=headers, query_string={'per_page': per_page, **params})
+        assert response.status_code == 200
+        assert len(response.get_json()['posts']) == per_page
+        assert len(statements) == expected, statements
+
+
+def test_export_issues_one_query_per_batch(client, auth_headers, viewer):
+    with count_statements() as statements:
+        response = client.get('/api/posts/export?batch_size=25', headers=auth_headers(viewer))
+        lines = response.get_data().splitlines()
+    assert len(lines) == 60
+    # 25 + 25 + 10: the short last batch ends the export without another query
+    assert len(statements) == 3, statements
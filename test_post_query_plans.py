@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script that EXPLAINs the post listing queries and fails on full table scans
+"""
+
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models.post import Post
+from models.user import db
+
+# "SCAN post" without an index means SQLite reads the whole table
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+# Tables that hold one row per category etc. and are meant to be read whole
+SMALL_TABLES = {'post_category_stats'}
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+@contextmanager
+def captured_post_selects():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and ' post' in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def query_plan(statement, parameters):
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    return [row[-1] for row in rows]
+
+
+@pytest.fixture
+def seeded(make_user):
+    user_ids = [make_user(f'plan_user_{i}') for i in range(5)]
+    base = datetime(2024, 1, 1)
+    for i in range(200):
+        post = Post(user_ids[i % 5], f'post {i}', visibility='public' if i % 4 else 'connections',
+                    category=f'cat{i % 7}')
+        post.created_at = base + timedelta(hours=i)
+        db.session.add(post)
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    return user_ids[0]
+
+
+@pytest.mark.parametrize('url', [
+    '/api/posts',
+    '/api/posts?category=cat3',
+    '/api/posts?visibility=public',
+    '/api/posts?sort_order=asc',
+    '/api/posts?sort_by=likes_count',
+    '/api/posts?sort_by=likes_count&cursor=',
+    '/api/posts?cursor=',
+    '/api/posts?category=cat3&cursor=',
+    '/api/posts/categories',
+    '/api/feed',
+])
+def test_listing_queries_use_indexes(client, auth_headers, seeded, url):
+    with captured_post_selects() as statements:
+        response = client.get(url, headers=auth_headers(seeded))
+    assert response.status_code == 200
+    assert statements
+
+    for statement, parameters in statements:
+        plan = query_plan(statement, parameters)
+        scans = [step for step in plan
+                 if FULL_SCAN.match(step) and FULL_SCAN.match(step).group(1) not in SMALL_TABLES]
+        assert not scans, f'{url} falls back to a full table scan: {plan}\n{statement}'
+        if 'ORDER BY' in statement and 'LIMIT' in statement:
+            assert TEMP_SORT not in plan, f'{url} sorts in a temp b-tree: {plan}\n{statement}'
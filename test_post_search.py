@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the full-text post search index
+"""
+
+from models.post import Post
+from models.user import User, db
+
+
+def search(client, headers, term, **params):
+    response = client.get('/api/posts', headers=headers, query_string={'search': term, **params})
+    assert response.status_code == 200
+    return [post['id'] for post in response.get_json()['posts']]
+
+
+def add_post(user_id, content):
+    post = Post(user_id, content)
+    db.session.add(post)
+    db.session.commit()
+    return post.id
+
+
+def test_search_ranks_by_relevance(client, make_user, auth_headers):
+    user_id = make_user('search_ranker')
+    headers = auth_headers(user_id)
+    weak = add_post(user_id, 'Shipping a small python script today')
+    strong = add_post(user_id, 'Python tips: python packaging and python typing')
+    add_post(user_id, 'Nothing relevant here')
+
+    assert search(client, headers, 'python') == [strong, weak]
+    # Prefix matching keeps typeahead working
+    assert search(client, headers, 'pyth') == [strong, weak]
+
+
+def test_search_without_searchable_terms_matches_nothing(client, make_user, auth_headers):
+    user_id = make_user('search_punctuation')
+    headers = auth_headers(user_id)
+    add_post(user_id, 'Shipping a small python script today')
+
+    assert search(client, headers, '!!!') == []
+    assert search(client, headers, '!!!', sort_by='created_at') == []
+
+
+def test_search_follows_post_delete_and_name_changes(client, make_user, auth_headers):
+    user_id = make_user('search_author', first_name='Ada')
+    headers = auth_headers(user_id)
+    post_id = add_post(user_id, 'Hello network')
+
+    assert search(client, headers, 'ada') == [post_id]
+
+    user = db.session.get(User, user_id)
+    user.first_name = 'Grace'
+    db.session.commit()
+    assert search(client, headers, 'ada') == []
+    assert search(client, headers, 'grace') == [post_id]
+
+    response = client.delete(f'/api/posts/{post_id}', headers=headers)
+    assert response.status_code == 200
+    assert search(client, headers, 'network') == []
+
+
+def test_search_cursor_pages_in_relevance_order(client, make_user, auth_headers):
+    user_id = make_user('search_cursor')
+    headers = auth_headers(user_id)
+    for i in range(5):
+        add_post(user_id, 'design ' * (i + 1))
+
+    expected = search(client, headers, 'design')
+    seen, cursor = [], ''
+    while cursor is not None:
+        response = client.get('/api/posts', headers=headers,
+                              query_string={'search': 'design', 'cursor': cursor, 'per_page': 2})
+        data = response.get_json()
+        seen.extend(post['id'] for post in data['posts'])
+        cursor = data['pagination']['next_cursor']
+    assert seen == expected
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Test script for hashtag extraction, tag filtering and popular tags
+"""
+
+from models.post import extract_hashtags
+
+
+def test_extract_hashtags():
+    assert extract_hashtags('#Python and #react, #python again; not#this or ##that #über') == \
+        ['python', 'react', 'über']
+    assert extract_hashtags(None) == []
+
+
+def test_tag_filter_and_popular_tags(client, make_user, auth_headers):
+    user_id = make_user('tag_user')
+    headers = auth_headers(user_id)
+
+    def create(content):
+        response = client.post('/api/posts', headers=headers, json={'content': content})
+        assert response.status_code == 201
+        return response.get_json()['post']['id']
+
+    a = create('Learning #python with #flask')
+    b = create('More #python tips')
+    c = create('A #design post')
+
+    def filtered(tags):
+        response = client.get('/api/posts', headers=headers, query_string={'tags': tags})
+        return [post['id'] for post in response.get_json()['posts']]
+
+    assert filtered('python') == [b, a]
+    assert filtered('#Flask, design') == [c, a]
+    assert filtered('missing') == []
+
+    tags = client.get('/api/posts/popular-tags', headers=headers).get_json()['tags']
+    assert tags[0] == {'name': 'python', 'count': 2}
+    assert {t['name'] for t in tags} == {'python', 'flask', 'design'}
+
+    client.delete(f'/api/posts/{a}', headers=headers)
+    tags = client.get('/api/posts/popular-tags', headers=headers).get_json()['tags']
+    assert {t['name']: t['count'] for t in tags} == {'python': 1, 'design': 1}
+    assert filtered('python') == [b]
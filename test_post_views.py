@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the write-behind post view counter
+"""
+
+import pytest
+from sqlalchemy import event
+
+from models.counters import ChangeCounter
+from models.post import Post, POSTS_VERSION
+from models.user import db
+from utils.page_cache import page_cache
+from utils.view_counter import view_counter
+
+
+@pytest.fixture
+def author(make_user, auth_headers):
+    user_id = make_user('views_author')
+    return user_id, auth_headers(user_id)
+
+
+def views(post_ids):
+    db.session.expire_all()
+    return [db.session.get(Post, post_id).views_count for post_id in post_ids]
+
+
+def test_listed_posts_count_views_after_a_flush(client, author):
+    _, headers = author
+    post_ids = [client.post('/api/posts', headers=headers, json={'content': f'post {i}'}).get_json()['post']['id']
+                for i in range(3)]
+
+    client.get('/api/posts', headers=headers)
+    client.get('/api/posts', headers=headers)  # served from the page cache, still a view
+    etag = client.get('/api/posts?per_page=1', headers=headers).headers['ETag']
+    client.get('/api/feed', headers=headers)
+    assert views(post_ids) == [0, 0, 0]
+
+    version = ChangeCounter.current(POSTS_VERSION)[0]
+    assert view_counter().flush() == 10
+    assert views(post_ids) == [3, 3, 4]
+    assert view_counter().stats()['flushed_views'] == 10
+
+    # Flushes leave listing ETags and cached pages valid; counts catch up once the cached page expires
+    assert ChangeCounter.current(POSTS_VERSION)[0] == version
+    assert client.get('/api/posts?per_page=1', headers={**headers, 'If-None-Match': etag}).status_code == 304
+    page_cache().clear()
+    assert client.get('/api/posts?per_page=1', headers=headers).get_json()['posts'][0]['views_count'] == 4
+
+
+def test_flush_writes_coalesced_counts_in_one_statement(app, author):
+    user_id, _ = author
+    posts = [Post(user_id, f'post {i}') for i in range(50)]
+    db.session.add_all(posts)
+    db.session.commit()
+    post_ids = [post.id for post in posts]
+
+    buffer = view_counter()
+    for _ in range(20):
+        buffer.record(post_ids)
+    assert buffer.stats()['pending_views'] == 1000
+
+    updates = []
+
+    def count_updates(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE post'):
+            updates.append(len(parameters) if executemany else 1)
+
+    event.listen(db.engine, 'before_cursor_execute', count_updates)
+    try:
+        assert buffer.flush() == 1000
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_updates)
+    assert updates == [50]
+    assert set(views(post_ids)) == {20}
+    assert buffer.stats()['pending_posts'] == 0
+
+
+def test_failed_flush_keeps_the_counts(app, author, monkeypatch):
+    user_id, _ = author
+    post = Post(user_id, 'post')
+    db.session.add(post)
+    db.session.commit()
+
+    buffer = view_counter()
+    buffer.record([post.id, post.id])
+
+    def fail():
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr(db.session, 'commit', fail)
+    assert buffer.flush() == 0
+    assert views([post.id]) == [0]
+    assert buffer.stats()['pending_views'] == 2
+
+    monkeypatch.undo()
+    buffer.record([post.id])
+    assert buffer.flush() == 3
+    assert views([post.id]) == [3]
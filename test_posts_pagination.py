@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for keyset (cursor) pagination on GET /api/posts
+"""
+
+from datetime import datetime, timedelta
+
+from models.post import Post
+from models.user import db
+
+
+def create_posts(user_id, count, same_timestamp_every=3):
+    base = datetime(2024, 1, 1)
+    for i in range(count):
+        post = Post(user_id, f'post {i}')
+        # Several posts share a timestamp so the id tie-breaker matters
+        post.created_at = base + timedelta(minutes=i // same_timestamp_every)
+        db.session.add(post)
+    db.session.commit()
+
+
+def walk_cursor(client, headers, **params):
+    seen = []
+    cursor = ''
+    while True:
+        response = client.get('/api/posts', headers=headers, query_string={'cursor': cursor, 'per_page': 4, **params})
+        assert response.status_code == 200
+        data = response.get_json()
+        seen.extend(post['id'] for post in data['posts'])
+        if not data['pagination']['has_next']:
+            assert data['pagination']['next_cursor'] is None
+            return seen
+        cursor = data['pagination']['next_cursor']
+
+
+def test_cursor_pages_cover_every_post_once(client, make_user, auth_headers):
+    user_id = make_user('cursor_user')
+    create_posts(user_id, 10)
+    headers = auth_headers(user_id)
+
+    expected = [p.id for p in Post.query.order_by(Post.created_at.desc(), Post.id.desc())]
+    assert walk_cursor(client, headers) == expected
+    assert walk_cursor(client, headers, sort_order='asc') == list(reversed(expected))
+
+
+def test_cursor_mode_skips_total_unless_requested(client, make_user, auth_headers):
+    user_id = make_user('cursor_total')
+    create_posts(user_id, 5)
+    headers = auth_headers(user_id)
+
+    data = client.get('/api/posts?cursor=', headers=headers).get_json()
+    assert 'total' not in data['pagination']
+
+    data = client.get('/api/posts?cursor=&include_total=true', headers=headers).get_json()
+    assert data['pagination']['total'] == 5
+
+
+def test_invalid_cursor_is_rejected(client, make_user, auth_headers):
+    user_id = make_user('cursor_bad')
+    response = client.get('/api/posts?cursor=not-a-cursor', headers=auth_headers(user_id))
+    assert response.status_code == 400
+
+
+def test_listing_rows_match_to_dict(client, make_user, auth_headers):
+    user_id = make_user('listing_shape', first_name='Zoë', last_name='O"Neil')
+    db.session.add(Post(user_id, 'Quotes " and \\ backslashes, emoji 🚀\nnew line', category='tech'))
+    db.session.add(Post(user_id, 'plain', media_url='/static/posts/x.jpg'))
+    db.session.commit()
+
+    posts = client.get('/api/posts', headers=auth_headers(user_id)).get_json()['posts']
+    expected = [p.to_dict() for p in Post.query.order_by(Post.created_at.desc(), Post.id.desc())]
+    assert posts == expected
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script for saved job searches: percolating new jobs into job_match notifications
+"""
+
+import random
+from urllib.parse import urlencode
+
+import pytest
+from sqlalchemy import event
+
+from models.job import JOB_TYPES
+from models.user import db
+from utils import percolator
+
+LOCATIONS = ['Berlin', 'Austin', 'Remote', 'São Paulo']
+WORDS = ['python', 'pythonic', 'data', 'database', 'designer', 'engineer', 'react', 'cafe', 'ops']
+
+
+@pytest.fixture
+def employer(client, make_user, auth_headers):
+    headers = auth_headers(make_user('employer'))
+    company_ids = [client.post('/api/companies', headers=headers, json={'name': name}).get_json()['company']['id']
+                   for name in ('Acme', 'Globex')]
+    return headers, company_ids
+
+
+def random_job(rng, company_ids):
+    return {
+        'company_id': rng.choice(company_ids),
+        'title': ' '.join(rng.sample(WORDS, 2)).title(),
+        'description': ' '.join(rng.choice(WORDS) for _ in range(6)) + (' Café culture.' if rng.random() < 0.2 else ''),
+        'location': rng.choice(LOCATIONS),
+        'job_type': rng.choice(JOB_TYPES),
+        'status': 'open'
+    }
+
+
+def random_saved_search(rng, company_ids):
+    search = ' '.join(rng.choice(WORDS)[:rng.randint(2, 8)] for _ in range(rng.randint(0, 2)))
+    filters = {}
+    for facet, values in (('job_type', JOB_TYPES), ('location', LOCATIONS), ('company_id', company_ids)):
+        if rng.random() < 0.4:
+            filters[facet] = rng.sample(list(values), rng.randint(1, 2))
+    return search, filters or {'location': [rng.choice(LOCATIONS)]}
+
+
+def test_notifications_match_rerunning_the_saved_searches(client, employer, make_user, auth_headers):
+    headers, company_ids = employer
+    rng = random.Random(3)
+    seekers = []
+    for i in range(8):
+        seeker = auth_headers(make_user(f'seeker{i}'))
+        saved = []
+        for j in range(rng.randint(1, 3)):
+            search, filters = random_saved_search(rng, company_ids)
+            response = client.post('/api/jobs/saved-searches', headers=seeker,
+                                   json={'name': f'alert {j}', 'search': search, 'filters': filters})
+            assert response.status_code == 201, response.get_json()
+            saved.append((search, filters))
+        seekers.append((seeker, saved))
+
+    job_ids = [client.post('/api/jobs', headers=headers, json=random_job(rng, company_ids)).get_json()['job']['id']
+               for _ in range(40)]
+
+    for seeker, saved in seekers:
+        # What the saved searches find when run through /api/jobs now
+        expected = set()
+        for search, filters in saved:
+            query = urlencode([('search', search), ('per_page', 50), ('facets', 'false')] +
+                              [(facet, value) for facet, values in filters.items() for value in values])
+            expected.update(job['id'] for job in client.get(f'/api/jobs?{query}', headers=seeker).get_json()['jobs'])
+        body = client.get('/api/notifications?per_page=50', headers=seeker).get_json()
+        assert sorted(n['reference_id'] for n in body['notifications']) == sorted(expected & set(job_ids))
+        assert {n['type'] for n in body['notifications']} <= {'job_match'}
+        assert body['unread_count'] == len(expected)
+
+
+def test_a_new_job_checks_only_candidates_and_inserts_once(client, employer, make_user, auth_headers, monkeypatch):
+    headers, company_ids = employer
+    seekers = {}
+    for i, word in enumerate(['kotlin', 'swift', 'haskell', 'erlang', 'elixir', 'fortran', 'cobol']):
+        seeker = seekers[word] = auth_headers(make_user(f'seeker{i}'))
+        client.post('/api/jobs/saved-searches', headers=seeker, json={'name': word, 'search': word})
+        client.post('/api/jobs/saved-searches', headers=seeker,
+                    json={'name': 'berlin', 'filters': {'location': ['Berlin'], 'job_type': ['contract']}})
+    seekers['develop'] = auth_headers(make_user('developer'))
+    client.post('/api/jobs/saved-searches', headers=seekers['develop'], json={'name': 'devs', 'search': 'develop'})
+
+    checked = []
+    search_matches = percolator.search_matches
+    monkeypatch.setattr(percolator, 'search_matches', lambda search, *args: checked.append(search) or
+                        search_matches(search, *args))
+    inserts = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO notifications'):
+            inserts.append(parameters)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        job = {**random_job(random.Random(1), company_ids), 'title': 'Elixir developer', 'description': 'Phoenix',
+               'location': 'Berlin', 'job_type': 'full-time'}
+        job_id = client.post('/api/jobs', headers=headers, json=job).get_json()['job']['id']
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    # Only the searches anchored on "eli", "dev" and Berlin are candidates; job_type rules out the Berlin ones
+    assert sorted(checked) == [''] * 7 + ['develop', 'elixir']
+    assert len(inserts) == 1 and len(inserts[0]) == 2
+    for word in ('elixir', 'develop'):
+        notifications = client.get('/api/notifications', headers=seekers[word]).get_json()['notifications']
+        assert [n['reference_id'] for n in notifications] == [job_id]
+
+
+def test_long_descriptions_look_keys_up_in_bounded_batches(client, employer, make_user, auth_headers):
+    headers, company_ids = employer
+    seeker = auth_headers(make_user('seeker'))
+    client.post('/api/jobs/saved-searches', headers=seeker, json={'name': 'zebra', 'search': 'zebra'})
+    lookups = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'saved_search_keys' in statement and statement.startswith('SELECT'):
+            lookups.append(len(parameters))
+
+    # Thousands of distinct words, up to ten prefix keys each
+    description = ' '.join(f'word{i:05d}' for i in range(4000)) + ' zebras'
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        job = {**random_job(random.Random(2), company_ids), 'description': description}
+        job_id = client.post('/api/jobs', headers=headers, json=job).get_json()['job']['id']
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    assert len(lookups) > 1 and max(lookups) <= percolator.KEY_LOOKUP_BATCH
+    notifications = client.get('/api/notifications', headers=seeker).get_json()['notifications']
+    assert [n['reference_id'] for n in notifications] == [job_id]
+
+
+def test_saved_search_validation_delete_and_mark_read(client, employer, make_user, auth_headers):
+    headers, company_ids = employer
+    seeker = auth_headers(make_user('seeker'))
+    assert client.post('/api/jobs/saved-searches', headers=seeker, json={'name': 'empty'}).status_code == 400
+    assert client.post('/api/jobs/saved-searches', headers=seeker,
+                       json={'name': 'x', 'filters': {'salary': ['lots']}}).status_code == 400
+    assert client.post('/api/jobs/saved-searches', headers=seeker,
+                       json={'name': 'x', 'filters': {'company_id': ['acme']}}).status_code == 400
+    saved = client.post('/api/jobs/saved-searches', headers=seeker,
+                        json={'name': 'remote', 'filters': {'location': ['Remote']}}).get_json()['saved_search']
+    assert client.get('/api/jobs/saved-searches', headers=seeker).get_json()['saved_searches'] == [saved]
+
+    first = client.post('/api/jobs', headers=headers, json={
+        **random_job(random.Random(2), company_ids), 'location': 'Remote'}).get_json()['job']['id']
+    second = client.post('/api/jobs', headers=headers, json={
+        **random_job(random.Random(2), company_ids), 'location': 'Remote'}).get_json()['job']['id']
+    notifications = client.get('/api/notifications', headers=seeker).get_json()['notifications']
+    assert [n['reference_id'] for n in notifications] == [second, first]
+
+    response = client.put('/api/notifications/read', headers=seeker, json={'ids': [notifications[1]['id']]})
+    assert response.get_json()['updated'] == 1
+    unread = client.get('/api/notifications?unread=true', headers=seeker).get_json()
+    assert [n['reference_id'] for n in unread['notifications']] == [second] and unread['unread_count'] == 1
+    assert client.put('/api/notifications/read', headers=seeker, json={'all': True}).get_json()['updated'] == 1
+
+    assert client.delete(f'/api/jobs/saved-searches/{saved["id"]}', headers=headers).status_code == 404
+    assert client.delete(f'/api/jobs/saved-searches/{saved["id"]}', headers=seeker).status_code == 200
+    client.post('/api/jobs', headers=headers, json={**random_job(random.Random(2), company_ids), 'location': 'Remote'})
+    assert client.get('/api/notifications?unread=true', headers=seeker).get_json()['notifications'] == []
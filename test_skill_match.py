@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for skill-based matching: TF-IDF job recommendations, candidate ranking and incremental updates
+"""
+
+import math
+import random
+
+import pytest
+
+from utils import skill_match
+from utils.skill_match import SkillMatcher, skill_terms, tokenize
+
+SKILLS = ['Python', 'SQL', 'Machine Learning', 'React', 'Node.js', 'C++', 'Kubernetes', 'Figma', 'Go', 'Rust']
+
+
+def reference_scores(jobs, users):
+    """Brute-force cosines: {(user_id, job_id): score} from the definitions in utils/skill_match.py"""
+    vocabulary = sorted({term for _, skills, _ in users for term in skill_terms(skills)})
+    counts = {}
+    for job_id, text, _ in jobs:
+        tokens = tokenize(text)
+        grams = [' '.join(tokens[i:i + n]) for n in (1, 2, 3) for i in range(len(tokens) - n + 1)]
+        counts[job_id] = {term: grams.count(term) for term in vocabulary if term in grams}
+    idf = {term: math.log((1 + len(jobs)) / (1 + sum(term in c for c in counts.values()))) + 1 for term in vocabulary}
+
+    def unit(vector, extra=0.0):
+        length = math.sqrt(sum(w * w for w in vector.values()) + extra) or 1
+        return {term: w / length for term, w in vector.items()}
+
+    job_vectors = {job_id: unit({t: (1 + math.log(n)) * idf[t] for t, n in c.items()}) for job_id, c in counts.items()}
+    scores = {}
+    for user_id, skills, _ in users:
+        terms = skill_terms(skills)
+        vector = unit({t: idf[t] for t in terms})
+        for job_id, job_vector in job_vectors.items():
+            scores[user_id, job_id] = sum(w * job_vector.get(t, 0) for t, w in vector.items())
+    return scores
+
+
+@pytest.fixture
+def market(client, make_user, auth_headers):
+    """12 job seekers with 3-5 skills each and 15 jobs asking for 3, one closed"""
+    rng = random.Random(5)
+    employer = make_user('employer')
+    headers = auth_headers(employer)
+    company_id = client.post('/api/companies', headers=headers, json={'name': 'Acme'}).get_json()['company']['id']
+    users = []
+    for i in range(12):
+        skills = rng.sample(SKILLS, rng.randint(3, 5))
+        user_id = make_user(f'seeker{i}', skills=','.join(skills))
+        users.append((user_id, skills, True))
+    jobs = []
+    for i in range(15):
+        wanted = rng.sample(SKILLS, 3)
+        fields = {'company_id': company_id, 'title': f'{wanted[0]} developer', 'location': 'Remote',
+                  'job_type': 'full-time', 'description': f'We use {wanted[1]} and {wanted[2]} daily. {wanted[1]}!',
+                  'status': 'closed' if i == 3 else 'open'}
+        job_id = client.post('/api/jobs', headers=headers, json=fields).get_json()['job']['id']
+        jobs.append((job_id, f"{fields['title']}\n{fields['description']}", fields['status'] == 'open'))
+    return headers, jobs, users
+
+
+def test_recommendations_and_candidates_match_brute_force(client, market, auth_headers):
+    headers, jobs, users = market
+    expected = reference_scores(jobs, users)
+    open_jobs = {job_id for job_id, _, is_open in jobs if is_open}
+
+    for user_id, _, _ in users[:4]:
+        body = client.get('/api/jobs/recommended?limit=5', headers=auth_headers(user_id)).get_json()
+        ranked = sorted(((-expected[user_id, job_id], job_id) for job_id in open_jobs
+                         if expected[user_id, job_id] > 0))[:5]
+        assert [job['id'] for job in body['jobs']] == [job_id for _, job_id in ranked]
+        for job in body['jobs']:
+            assert job['match_score'] == pytest.approx(expected[user_id, job['id']], abs=1e-4)
+            assert job['matched_skills']
+
+    job_id = jobs[0][0]
+    body = client.get(f'/api/jobs/{job_id}/candidates?limit=4', headers=headers).get_json()
+    ranked = sorted((-expected[user_id, job_id], user_id) for user_id, _, _ in users if expected[user_id, job_id] > 0)
+    assert [c['user']['id'] for c in body['candidates']] == [user_id for _, user_id in ranked[:4]]
+    assert client.get(f'/api/jobs/{job_id}/candidates', headers=auth_headers(users[0][0])).status_code == 403
+
+
+def test_skill_edits_update_the_loaded_matcher_in_place(app, client, market, auth_headers):
+    headers, jobs, users = market
+    seeker = auth_headers(users[0][0])
+    app.config['SKILL_MATCH_MAX_STALENESS_SECONDS'] = 3600
+    client.get('/api/jobs/recommended', headers=seeker)
+    matcher = app.extensions['skill_matcher'].matcher
+
+    response = client.put('/api/profile/skills', headers=seeker, json={'skills': ['Rust', 'Go', 'Knitting']})
+    assert response.status_code == 200
+    users[0] = (users[0][0], ['Rust', 'Go', 'Knitting'], True)
+    expected = reference_scores(jobs, users)
+    body = client.get('/api/jobs/recommended?limit=50', headers=seeker).get_json()
+    assert app.extensions['skill_matcher'].matcher is matcher
+    assert {job['id'] for job in body['jobs']} == {job_id for job_id, _, is_open in jobs
+                                                   if is_open and expected[users[0][0], job_id] > 0}
+    # Knitting is new to the vocabulary, so no loaded job mentions it, but it still lengthens the vector
+    assert matcher.unknown_terms == {'knitting'}
+    for job in body['jobs']:
+        assert job['match_score'] == pytest.approx(expected[users[0][0], job['id']], abs=1e-4)
+        assert set(job['matched_skills']) <= {'rust', 'go'}
+
+    # Hiding a profile drops it from candidate lists
+    client.put('/api/profile', headers=seeker, json={'is_public': False})
+    for job_id, _, _ in jobs:
+        candidates = client.get(f'/api/jobs/{job_id}/candidates?limit=50', headers=headers).get_json()['candidates']
+        assert users[0][0] not in {c['user']['id'] for c in candidates}
+
+
+def test_overlay_compaction_matches_a_fresh_build(monkeypatch):
+    rng = random.Random(9)
+    jobs = [(i, ' '.join(rng.sample(SKILLS, 4)), i % 7 != 0) for i in range(1, 80)]
+    users = [(i, rng.sample(SKILLS, 3), i % 5 != 0) for i in range(1, 60)]
+    monkeypatch.setattr(skill_match, 'COMPACT_MIN_USERS', 8)
+    matcher = SkillMatcher(jobs, users)
+    for _ in range(20):
+        user_id = rng.randint(1, 70)
+        skills, public = rng.sample(SKILLS, 3), rng.random() < 0.8
+        matcher.update_user(user_id, skills, public)
+        users = [user for user in users if user[0] != user_id] + [(user_id, skills, public)]
+        fresh = SkillMatcher(jobs, users)
+        assert matcher.top_jobs([1, 2, user_id], 5) == fresh.top_jobs([1, 2, user_id], 5)
+        rows = [fresh.job_row(job_id) for job_id in (1, 2, 3)]
+        assert matcher.top_candidates(rows, 5) == fresh.top_candidates(rows, 5)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for group commit: concurrent message and like writes sharing transactions
+"""
+
+import threading
+
+import pytest
+
+from config import TestingConfig
+from main import create_app
+from models.message import Conversation, Message
+from models.post import Post
+from models.user import db
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # The committer needs its own connection, which the in-memory database cannot give it
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'prok.db'}")
+    monkeypatch.setattr(TestingConfig, 'WRITE_QUEUE_ENABLED', True)
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def run_concurrently(app, requests):
+    """POST every (path, headers, body) from its own thread; returns the responses in order"""
+    responses = [None] * len(requests)
+    start = threading.Barrier(len(requests))
+
+    def send(i, path, headers, body):
+        client = app.test_client()
+        start.wait()
+        responses[i] = client.post(path, headers=headers, json=body)
+
+    threads = [threading.Thread(target=send, args=(i, *request)) for i, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def test_concurrent_messages_are_committed_in_shared_batches(app, make_user, auth_headers):
+    alice, bob = make_user('alice'), make_user('bob')
+    app.extensions['write_queue'].max_delay = 0.05
+    requests = [('/api/messaging/messages', auth_headers(sender), {'recipient_id': recipient, 'content': f'm{i}'})
+                for i, (sender, recipient) in enumerate([(alice, bob), (bob, alice)] * 10)]
+
+    responses = run_concurrently(app, requests)
+
+    assert [response.status_code for response in responses] == [201] * 20
+    ids = {response.get_json()['sent']['id'] for response in responses}
+    db.session.expire_all()
+    assert len(ids) == 20 and Message.query.count() == 20
+    conversation = Conversation.query.one()
+    assert conversation.last_message_id == max(ids)
+    stats = app.test_client().get('/health/write-queue').get_json()
+    assert stats['writes'] == 20 and stats['batches'] < 20
+
+
+def test_a_failing_write_only_fails_its_own_caller(app, client, make_user, auth_headers):
+    alice, bob = make_user('alice'), make_user('bob')
+    post = Post(alice, 'hello', None, 'public', 'general')
+    db.session.add(post)
+    db.session.commit()
+    app.extensions['write_queue'].max_delay = 0.2
+    path = f'/api/posts/{post.id}/like'
+
+    # Alice's second like hits the unique constraint inside the shared batch
+    responses = run_concurrently(app, [(path, auth_headers(alice), None), (path, auth_headers(alice), None),
+                                       (path, auth_headers(bob), None)])
+
+    assert [response.status_code for response in responses] == [200] * 3
+    db.session.expire_all()
+    assert db.session.get(Post, post.id).likes_count == 2
+    assert app.extensions['write_queue'].replayed_batches == 1
+
+    response = client.delete(path, headers=auth_headers(bob))
+    assert response.get_json()['likes_count'] == 1